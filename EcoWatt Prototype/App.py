@@ -1,9 +1,31 @@
+import time
+import uuid
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import plotly.express as px
 
+from ecowatt.annual import MONTHS, SEASONS, annual_summary, project_annual
+from ecowatt.batch import score_file
+from ecowatt.core import (
+    aggregate_weekly_to_monthly_Homes,
+    aggregate_weekly_to_monthly_Offices,
+    aggregate_weekly_to_monthly_Shops,
+    classify_usage,
+    get_appliance_recommendations,
+    rule_based_cost_calculator,
+    rule_based_cost_calculator_LT_2,
+    show_recommendations,
+)
+from ecowatt.history import history
+from ecowatt.optimizer import optimize_savings
+from ecowatt.options import SELECT_OPTIONS
+from ecowatt.portfolio import GROUP_COLUMNS, Portfolio
+from ecowatt.registry import registry
+from ecowatt.simulator import DEFAULT_STEPS, MAX_STEPS, default_profile, sweep, sweep_columns, sweep_range
+from ecowatt.timing import TIMING_FILE, stage, timings
+
 # APP CONFIGURATION
 
 st.set_page_config(
@@ -12,275 +34,161 @@ st.set_page_config(
     page_icon="⚡"
 )
 
+# Load the segment models once per process, in the background
+registry.prewarm()
+
 st.title("⚡ EcoWatt Suite")
 st.subheader("A Non-AI Based Electricity Consumption and Cost Analyzer")
 
 st.sidebar.title("🔧 Navigation Panel")
-app_mode = st.sidebar.radio("Select Module", ["🏠 EcoWatt Homes", "🏬 EcoWatt Shops", "🏢 EcoWatt Offices",'EcoWatt Simulator'])
-
-
-# COMMON UTILITY FUNCTIONS
-
-def get_appliance_recommendations(module, user_inputs):
-    """Generate appliance-specific recommendations based on usage patterns."""
-    recs = []
-
-    if module == "🏠 EcoWatt Homes":
-        if user_inputs["Monthly_AC_Usage_Hours"] > 150:
-            recs.append("❄️ **AC:** Clean filters regularly and maintain 24°C for better efficiency.")
-        if user_inputs["Refrigerator_Type"] != "None" and user_inputs["Monthly_Refrigerator_Usage_Hours"] > 160:
-            recs.append("🧊 **Refrigerator:** Ensure good ventilation and avoid frequent door openings.")
-        if user_inputs["Monthly_TV_Usage_Hours"] > 100:
-            recs.append("📺 **TV:** Turn off completely instead of standby to save energy.")
-        if user_inputs["Monthly_Geyser_Usage_Minutes"] > 300:
-            recs.append("🚿 **Geyser:** Install a timer to limit unnecessary heating time.")
-        if user_inputs["Monthly_Washing_Machine_Usage_Cycles"] > 20:
-            recs.append("👕 **Washing Machine:** Use full loads and prefer cold water cycles.")
-
-    elif module == "🏬 EcoWatt Shops":
-        if user_inputs["Monthly_AC_Usage_Hours"] > 200:
-            recs.append("❄️ **AC:** Maintain 24–26°C and clean filters weekly for optimal performance.")
-        if user_inputs["Monthly_Refrigerator_Usage_Hours_Type_1"] > 250:
-            recs.append("🧊 **Refrigerator_Type_1:** Defrost regularly and keep 6 inches away from walls.")
-        if user_inputs["Monthly_Refrigerator_Usage_Hours_Type_2"] > 250:
-            recs.append("🧊 **Refrigerator_Type_2:** Defrost regularly and keep 6 inches away from walls.")
-        if user_inputs["Monthly_Light_Usage_Hours"] > 250:
-            recs.append("💡 **Lighting:** Replace old bulbs with LEDs or motion sensors.")
-        if user_inputs["Monthly_PC_Usage_Hours"] > 200:
-            recs.append("🖥️ **Billing PC:** Enable sleep mode and shut down after hours.")
-
-    elif module == "🏢 EcoWatt Offices":
-        if user_inputs["Monthly_AC_Usage_Hours"] > 300:
-            recs.append("❄️ **AC:** Use centralized scheduling or smart thermostats.")
-        if user_inputs["Monthly_Lights_Usage_Hours"] > 300:
-            recs.append("💡 **Lighting:** Utilize daylight and motion-based lighting.")
-        if user_inputs["Monthly_PC_Usage_Hours"] > 400:
-            recs.append("💻 **Computers:** Enable sleep mode after 10 minutes of inactivity.")
-        if user_inputs["Monthly_Printer_Usage_Minutes"] > 500:
-            recs.append("🖨️ **Printer:** Use duplex printing and turn off when idle.")
-        if user_inputs["Monthly_Projector_Usage_Hours"] > 100:
-            recs.append("📽️ **Projector:** Use Eco Mode and power off when not needed.")
-
-    if not recs:
-        recs.append("🌿 Your energy usage looks efficient across all appliances. Great job!")
-
-    return recs
-
-
-def aggregate_weekly_to_monthly_Homes(df):
-    """
-    Convert weekly data to monthly data by multiplying selected columns by 4.3
-    This avoids affecting non-relevant numeric columns.
-    """
-    df_monthly = df.copy()
-
-    #Specify only the usage columns that should be scaled
-    cols_to_multiply = [
-        "Monthly_AC_Usage_Hours",
-        "Monthly_Fan_Usage_Hours",
-        'Refrigerator_Usage_Hrs_Monthly',
-        "Monthly_TV_Usage_Hours",
-        "Monthly_Geyser_Usage_Minutes",
-        "Monthly_Washing_Machine_Usage_Cycles"
-    ]
-
-    # Multiply the selected columns by 4.5
-    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * 4.3
-
-    return df_monthly
-
-
-def aggregate_weekly_to_monthly_Shops(df):
-    """
-    Convert weekly data to monthly data by multiplying selected columns by 4.3
-    This avoids affecting non-relevant numeric columns.
-    """
-    df_monthly = df.copy()
-
-    # Specify only the usage columns that should be scaled
-    cols_to_multiply = [
-            'Avg_Working_Hours_Monthly',
-            'Monthly_AC_Usage_Hours',
-            'Monthly_Fan_Usage_Hours',
-            'Monthly_Refrigerator_Usage_Hours_Type_1',
-            'Monthly_Refrigerator_Usage_Hours_Type_2',
-            'Monthly_Lights_Usage_Hours',
-            'Monthly_PC_Usage_Hours'
-    ]
-
-    # Multiply the selected columns by 4
-    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * 4.3
-
-    return df_monthly
+app_mode = st.sidebar.radio("Select Module", ["🏠 EcoWatt Homes", "🏬 EcoWatt Shops", "🏢 EcoWatt Offices",'EcoWatt Simulator',"📂 EcoWatt Batch","🕑 EcoWatt History"])
+
+# Optional; assessments with a Site ID can be followed over time in the History module
+tracked_site_id = st.sidebar.text_input("🏷️ Site ID (optional)").strip()
+
+# Homes / Shops: also bill all 12 months, each with its season in the chosen State
+annual_mode = st.sidebar.checkbox("📅 Annual Projection")
+season_multipliers = {}
+if annual_mode:
+    for season in SEASONS:
+        season_multipliers[season] = st.sidebar.slider(f"{season} appliance usage ×", 0.0, 2.0, 1.0, 0.05)
+
+# Homes / Shops: search appliance changes for the biggest bill cut, within these comfort limits
+savings_mode = st.sidebar.checkbox("💡 Savings Optimizer")
+if savings_mode:
+    max_cut = st.sidebar.slider("Largest usage cut (%)", 10, 80, 30, 10)
+    allow_upgrades = st.sidebar.checkbox("Allow appliance upgrades (Inverter AC, LED, 5★)", value=True)
+
+# Stage timings are recorded process-wide while any session has this ticked (or ECOWATT_TIMING is set)
+show_diagnostics = st.sidebar.checkbox("🩺 Show Diagnostics")
+diagnostics_id = st.session_state.setdefault("diagnostics_id", uuid.uuid4().hex)
+timings.enable_for(diagnostics_id, show_diagnostics)
+
+
+# HELPERS
+
+def save_result(segment, **result):
+    """Keep a module's last analysis until its form is submitted again."""
+    st.session_state.setdefault("results", {})[segment] = result
+
+
+def show_result(segment, recs_title):
+    """Redraw the last analysis of a module (no model or tariff work on reruns)."""
+    result = st.session_state.get("results", {}).get(segment)
+    if result is None:
+        return
+
+    if result.get("demo_kwh"):
+        st.success(f"🔋 Estimated Monthly Consumption: {result['kwh_pred']:.2f} kWh")
+    st.info(f" 🔋 Estimated Monthly kWh Consumption is: {round(result['kwh_pred'])} units")
+    st.info(f"💰 Estimated Monthly Cost: ₹ {result['cost_est']}")
+    if result.get("kwh_range"):
+        (kwh_low, kwh_high), (cost_low, cost_high) = result["kwh_range"], result["cost_range"]
+        st.caption(f"📏 Likely range (10th–90th percentile): {round(kwh_low)} – {round(kwh_high)} units, "
+                   f"₹ {cost_low} – ₹ {cost_high}")
+    st.write(f"🏷️ Usage Category: **{result['usage_type']}**")
+    st.write(show_recommendations(result["usage_type"]))
+
+    st.info(recs_title)
+    for rec in result["appliance_recs"]:
+        st.write("-", rec)
 
-def aggregate_weekly_to_monthly_Offices(df):
+    savings = result.get("savings")
+    if savings is not None:
+        st.markdown("### 💡 Biggest Savings")
+        if savings["suggestions"]:
+            st.dataframe(
+                pd.DataFrame(savings["suggestions"])[["description", "rupees_saved", "kwh_saved", "Estimated_Cost"]]
+                .rename(columns={"description": "Change", "rupees_saved": "Saves (₹ / month)",
+                                 "kwh_saved": "Saves (kWh)", "Estimated_Cost": "New Monthly Cost (₹)"})
+                .round(2),
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("No change within your comfort limits lowers the predicted bill.")
+
+    monthly = result.get("annual")
+    if monthly is not None:
+        summary = annual_summary(monthly).iloc[0]
+        st.markdown("### 📅 Annual Projection")
+        st.info(f"💰 Projected Annual Cost: ₹ {summary['Annual_Cost']:,.2f} ({summary['Annual_kWh']:,.0f} kWh), "
+                f"₹ {summary['Average_Monthly_Cost']:,.2f} a month on average; "
+                f"costliest month {summary['Peak_Month']} (₹ {summary['Peak_Month_Cost']:,.2f})")
+        fig = px.bar(
+            monthly.assign(Month=[MONTHS[m - 1] for m in monthly["Month"]]),
+            x="Month",
+            y="Estimated_Cost",
+            color="Weather/Season",
+            hover_data=["Predicted_kWh"],
+            labels={"Estimated_Cost": "Monthly Cost (₹)"},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def find_savings(segment, user_data):
+    """Top appliance changes of the submitted profile when the sidebar asks for them."""
+    if not savings_mode:
+        return None
+    with stage("optimize", segment):
+        return optimize_savings(user_data.iloc[0].to_dict(), segment, max_reduction=max_cut / 100,
+                                switches=allow_upgrades)
+
+
+def project_year(segment, user_data):
+    """12-month projection of the submitted profile when the sidebar asks for one."""
+    if not annual_mode:
+        return None
+    with stage("annual", segment):
+        return project_annual(user_data, segment, multipliers=season_multipliers)
+
+
+def record_assessment(segment, user_data, monthly_data, model_version):
+    """Append the module's last analysis to the assessment history (written in batches)."""
+    result = st.session_state["results"][segment]
+    history.record(segment, result["kwh_pred"], result["cost_est"], result["usage_type"],
+                   inputs=user_data.iloc[0].to_dict(), features=monthly_data.iloc[0].to_dict(),
+                   site_id=tracked_site_id, model_version=model_version)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def simulate(profile, segment, x_column, x_values, y_column, y_values, model_version):
     """
-    Convert weekly data to monthly data by multiplying selected columns by 4.3
-    This avoids affecting non-relevant numeric columns.
+    Sweep grid and its figure, reused while the simulator inputs stay the
+    same; model_version is only part of the cache key (retrained models miss).
     """
-    df_monthly = df.copy()
-
-    #Specify only the usage columns that should be scaled
-    cols_to_multiply = [
-       "Avg_Working_Hours_Monthly",
-       "Monthly_AC_Usage_Hours",
-       "Monthly_Fan_Usage_Hours",
-       "Monthly_Lights_Usage_Hours",
-       "Monthly_PC_Usage_Hours",
-       "Monthly_Refrigerator_Usage_Hours",
-       "Monthly_Printer_Usage_Minutes",
-       "Monthly_Projector_Usage_Hours"
-    ]
-
-    # Multiply the selected columns by 4
-    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * 4.3
-
-    return df_monthly
-
-
-def rule_based_cost_calculator(kwh):
-    rate = 0
-    cost = 0
-
-    if State == "Maharashtra":
-        if kwh <= 100:
-            rate = 6.5
-        elif kwh <= 300:
-            rate = 8.2
-        else:
-            rate = 10.5
-
-    elif State == "Gujarat":
-        if kwh <= 100:
-            rate = 6.0
-        elif kwh <= 300:
-            rate = 7.8
-        else:
-            rate = 9.8
-
-    elif State == "Karnataka":
-        if kwh <= 100:
-            rate = 5.8
-        elif kwh <= 300:
-            rate = 7.5
-        else:
-            rate = 9.2
-
-    elif State == "Tamil Nadu":
-        if kwh <= 100:
-            rate = 5.5
-        elif kwh <= 300:
-            rate = 7.0
-        else:
-            rate = 8.8
-
-    elif State == "Delhi":
-        if kwh <= 100:
-            rate = 5.2
-        elif kwh <= 300:
-            rate = 6.8
-        else:
-            rate = 8.5
-
-    elif State == "West Bengal":
-        if kwh <= 100:
-            rate = 6.0
-        elif kwh <= 300:
-            rate = 7.5
-        else:
-            rate = 9.0
-
-    else:  # 'Others'
-        if kwh <= 100:
-            rate = 6.0
-        elif kwh <= 300:
-            rate = 7.5
-        else:
-            rate = 9.5
-
-    cost = kwh * rate
-    fixed_charge = 120
-    total_cost = round(cost + fixed_charge, 2)
-
-    return total_cost
-
-def rule_based_cost_calculator_LT_2(kwh):
-    rate = 0
-    cost = 0
-
-    if State == "Maharashtra":
-        if kwh <= 100:
-            rate = 8.5
-        elif kwh <= 300:
-            rate = 10.0
-        else:
-            rate = 12.0
-
-    elif State == "Gujarat":
-        if kwh <= 100:
-            rate = 8.0
-        elif kwh <= 300:
-            rate = 9.5
-        else:
-            rate = 11.0
-
-    elif State == "Karnataka":
-        if kwh <= 100:
-            rate = 7.8
-        elif kwh <= 300:
-            rate = 9.0
-        else:
-            rate = 10.5
-
-    elif State == "Tamil Nadu":
-        if kwh <= 100:
-            rate = 7.5
-        elif kwh <= 300:
-            rate = 8.8
-        else:
-            rate = 10.0
-
-    elif State == "Delhi":
-        if kwh <= 100:
-            rate = 7.2
-        elif kwh <= 300:
-            rate = 8.5
-        else:
-            rate = 9.8
-
-    elif State == "West Bengal":
-        if kwh <= 100:
-            rate = 7.8
-        elif kwh <= 300:
-            rate = 9.0
+    # Whole grid in one batch prediction
+    with stage("sweep", segment):
+        result = sweep(profile, segment, x_column, np.asarray(x_values), y_column,
+                       None if y_values is None else np.asarray(y_values))
+
+    with stage("render", segment):
+        if y_column is None:
+            fig = px.line(
+                x=result["x"],
+                y=result["cost"][0],
+                title=f"Monthly Cost vs. {x_column}",
+                labels={"x": f"{x_column} (weekly)", "y": "Monthly Cost (₹)"},
+                markers=True,
+            )
+            fig.update_traces(customdata=result["kwh"][0], hovertemplate="%{x}: ₹%{y:,.2f} (%{customdata:,.0f} kWh)")
         else:
-            rate = 10.8
+            fig = px.imshow(
+                result["cost"],
+                x=result["x"],
+                y=result["y"],
+                origin="lower",
+                aspect="auto",
+                color_continuous_scale="YlOrRd",
+                labels={"x": f"{x_column} (weekly)", "y": y_column, "color": "Monthly Cost (₹)"},
+                title=f"Monthly Cost over {x_column} × {y_column}",
+            )
+    return result, fig
 
-    else:  # 'Others'
-        if kwh <= 100:
-            rate = 8.0
-        elif kwh <= 300:
-            rate = 9.2
-        else:
-            rate = 11.0
-
-    # Cost calculation
-    cost = kwh * rate
-    fixed_charge = 200  # Commercial connections generally have higher base charge
-    total_cost = round(cost + fixed_charge, 2)
-
-    return total_cost
-
-
-def show_recommendations(usage_type):
-    """Provide personalized recommendations."""
-    if usage_type == "Low Usage":
-        return "✅ Great job! Keep maintaining your efficient energy usage."
-    elif usage_type == "Medium Usage":
-        return "⚠️ Moderate consumption. Try using appliances more efficiently."
-    else:
-        return "🚨 High energy consumption! Consider using power-saving devices or scheduling usage."
 
+@st.cache_data(max_entries=4, show_spinner=False)
+def results_csv(results):
+    return results.to_csv(index=False).encode("utf-8")
 
 
 # MODULES
@@ -290,90 +198,94 @@ if app_mode == "🏠 EcoWatt Homes":
 
     st.write("### Enter your appliance usage details below:")
 
-    State = st.selectbox("Choose Your State ??",['Delhi', 'Gujarat', 'Maharashtra', 'Karnataka', 'Tamil Nadu',"West Bengal","Others"])
-    City = st.selectbox("Choose Your City ??",['Mumbai', 'Bengaluru', 'Ahmedabad', 'Chennai', 'Delhi', 'Pune',"Kolkata","Others"])
-    Weather = st.selectbox("Choose the Weather ??",['Monsoon', 'Summer', 'Winter'])
-    Number_of_Residents = st.number_input("Enter the Number of Residents in your House ??",min_value = 0)
-    Home_Type = st.selectbox("Choose Your Home Type ??",['Apartment', 'Row House', 'Bungalow'])
-    Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",['LT-1'])
-    AC_Type = st.selectbox("Choose Your AC Type ??",['None', 'Split AC', 'Window AC',"Inverter AC"])
-    Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC in a Combined manner on a Weekly Basis ??",min_value = 0)
-    Fan_Type = st.selectbox("Choose Your Fan Type ?? ",['Crompton', 'Bajaj', 'Polycab', 'Havells', 'None'])
-    Monthly_Fan_Usage_Hours = st.number_input("For How many Hours You use Fan in a Combined manner on a Weekly Basis ??",min_value=0)
-    Refrigerator_Type = st.selectbox("Choose Your Refrgerator Type ??",['Double Door 3★', 'Double Door 4★', 'Side-by-Side 5★', 'None','Single Door 5★', 'Side-by-Side 4★', 'Single Door 4★','Single Door 3★', 'Double Door 5★'])
-    Monthly_Refrigerator_Usage_Hours = st.number_input("For How many hours you use Refrigerator on a weekly basis ??",min_value = 0 )
-    TV_Type = st.selectbox("Choose your TV Type ??",['LCD', 'SmartTV', 'LED', 'None'])
-    Monthly_TV_Usage_Hours = st.number_input("For how many hours you use TV on a weekly basis ??",min_value=0)
-    Geyser_Type = st.selectbox("Choose your Geyser Type ??",['15-25L', '30+L', 'None', '6-10L'])
-    Monthly_Geyser_Usage_Minutes = st.number_input("For how many minutes you use geyser on a weekly basis ??",min_value=0)
-    Washing_Machine_Type = st.selectbox("Choose your washing machine Type ??",['12kg', '6kg', '7kg', '8kg', 'None', '10kg'])
-    Monthly_Washing_Machine_Usage_Cycles = st.number_input("How many Washing Machine usage cycles you have weekly ??",min_value=0)
-    Washing_Machine_Age = st.selectbox("Choose your washing machine age category ?? (New -> 1-3yrs) (Mid -> 4-7yrs) (old -> 7+yrs)",['Mid', 'New', 'Old', 'None'])
+    # Widgets inside the form only trigger a rerun when it is submitted
+    with st.form("homes_form"):
+        State = st.selectbox("Choose Your State ??",SELECT_OPTIONS["Homes"]["State"])
+        City = st.selectbox("Choose Your City ??",SELECT_OPTIONS["Homes"]["City"])
+        Weather = st.selectbox("Choose the Weather ??",SELECT_OPTIONS["Homes"]["Weather/Season"])
+        Number_of_Residents = st.number_input("Enter the Number of Residents in your House ??",min_value = 0)
+        Home_Type = st.selectbox("Choose Your Home Type ??",SELECT_OPTIONS["Homes"]["Home_Type"])
+        Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",SELECT_OPTIONS["Homes"]["Electricity_Tariff_Type"])
+        AC_Type = st.selectbox("Choose Your AC Type ??",SELECT_OPTIONS["Homes"]["AC_Type"])
+        Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC in a Combined manner on a Weekly Basis ??",min_value = 0)
+        Fan_Type = st.selectbox("Choose Your Fan Type ?? ",SELECT_OPTIONS["Homes"]["Fan_Type"])
+        Monthly_Fan_Usage_Hours = st.number_input("For How many Hours You use Fan in a Combined manner on a Weekly Basis ??",min_value=0)
+        Refrigerator_Type = st.selectbox("Choose Your Refrgerator Type ??",SELECT_OPTIONS["Homes"]["Refrigerator_Type"])
+        Monthly_Refrigerator_Usage_Hours = st.number_input("For How many hours you use Refrigerator on a weekly basis ??",min_value = 0 )
+        TV_Type = st.selectbox("Choose your TV Type ??",SELECT_OPTIONS["Homes"]["TV_Type"])
+        Monthly_TV_Usage_Hours = st.number_input("For how many hours you use TV on a weekly basis ??",min_value=0)
+        Geyser_Type = st.selectbox("Choose your Geyser Type ??",SELECT_OPTIONS["Homes"]["Geyser_Type"])
+        Monthly_Geyser_Usage_Minutes = st.number_input("For how many minutes you use geyser on a weekly basis ??",min_value=0)
+        Washing_Machine_Type = st.selectbox("Choose your washing machine Type ??",SELECT_OPTIONS["Homes"]["Washing_Machine_Type"])
+        Monthly_Washing_Machine_Usage_Cycles = st.number_input("How many Washing Machine usage cycles you have weekly ??",min_value=0)
+        Washing_Machine_Age = st.selectbox("Choose your washing machine age category ?? (New -> 1-3yrs) (Mid -> 4-7yrs) (old -> 7+yrs)",SELECT_OPTIONS["Homes"]["Washing_Machine_Age"])
+        submitted = st.form_submit_button("🔍 Analyze Usage")
     
     
-    if st.button("🔍 Analyze Usage"):
-        User_data = pd.DataFrame({
+    if submitted:
+        with stage("build_frame", "Homes"):
+            User_data = pd.DataFrame({
                
-               'State':[State],
-               "City" :[City],
-               "Weather/Season":[Weather],
-               "No_Of_Residents":[Number_of_Residents],
-               "Home_Type":[Home_Type],
-               "Electricity_Tariff_Type":[Electricity_Tariff_Type],
-               "AC_Type":[AC_Type],
-               "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
-               "Fan_Type":[Fan_Type],
-               "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
-               "Refrigerator_Type":[Refrigerator_Type],
-               'Refrigerator_Usage_Hrs_Monthly':[Monthly_Refrigerator_Usage_Hours],
-               "TV_Type":[TV_Type],
-               "Monthly_TV_Usage_Hours":[Monthly_TV_Usage_Hours],
-               "Geyser_Type":[Geyser_Type],
-               "Monthly_Geyser_Usage_Minutes":[Monthly_Geyser_Usage_Minutes],
-               "Washing_Machine_Type":[Washing_Machine_Type],
-               "Monthly_Washing_Machine_Usage_Cycles":[Monthly_Washing_Machine_Usage_Cycles],
-               "Washing_Machine_Age":[Washing_Machine_Age]
- })
-
-
+                   'State':[State],
+                   "City" :[City],
+                   "Weather/Season":[Weather],
+                   "No_Of_Residents":[Number_of_Residents],
+                   "Home_Type":[Home_Type],
+                   "Electricity_Tariff_Type":[Electricity_Tariff_Type],
+                   "AC_Type":[AC_Type],
+                   "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
+                   "Fan_Type":[Fan_Type],
+                   "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
+                   "Refrigerator_Type":[Refrigerator_Type],
+                   'Refrigerator_Usage_Hrs_Monthly':[Monthly_Refrigerator_Usage_Hours],
+                   "TV_Type":[TV_Type],
+                   "Monthly_TV_Usage_Hours":[Monthly_TV_Usage_Hours],
+                   "Geyser_Type":[Geyser_Type],
+                   "Monthly_Geyser_Usage_Minutes":[Monthly_Geyser_Usage_Minutes],
+                   "Washing_Machine_Type":[Washing_Machine_Type],
+                   "Monthly_Washing_Machine_Usage_Cycles":[Monthly_Washing_Machine_Usage_Cycles],
+                   "Washing_Machine_Age":[Washing_Machine_Age]
+     })
+
+
+
+        # Remembered for the what-if Simulator
+        st.session_state.setdefault("profiles", {})["Homes"] = User_data.iloc[0].to_dict()
 
         # Step 1: Aggregate Weekly -> Monthly
-        monthly_data = aggregate_weekly_to_monthly_Homes(User_data)
+        with stage("aggregate", "Homes"):
+            monthly_data = aggregate_weekly_to_monthly_Homes(User_data)
 
         # Step 2: Predict kWh using regression model
-        model_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Models\Best_Model_EcoWatt_Homes (1).pkl")
-        preprocessor_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Preprocessing_Models\Preprocessing_EcoWatt_Homes (1).pkl")
-        transformed_data = preprocessor_reg.transform(monthly_data)
-        kwh_pred = model_reg.predict(transformed_data)[0]
+        segment_pipeline = registry.get("Homes")
+        # Point estimate plus the 10th-90th percentile range of the trees, one pass
+        kwh_pred, kwh_low, kwh_high = (values[0] for values in segment_pipeline.predict_interval(monthly_data))
     
         # Step 3: Cost Calculation
-        st.info(f" 🔋 Estimated Monthly kWh Consumption is: {round(kwh_pred)} units")
-        cost_est = rule_based_cost_calculator(kwh_pred)
-        st.info(f"💰 Estimated Monthly Cost: ₹ {cost_est}")
+        with stage("cost", "Homes"):
+            cost_est = rule_based_cost_calculator(kwh_pred, State)
+            cost_range = (rule_based_cost_calculator(kwh_low, State), rule_based_cost_calculator(kwh_high, State))
 
         # Step 4: Classification (Usage Type)
-        if kwh_pred < 180 :
-            usage_type = "Low Usage"
-        elif kwh_pred < 300 :
-            usage_type = "Medium Usage"
-        else:
-            usage_type = "High Usage"
-
-        st.write(f"🏷️ Usage Category: **{usage_type}**")
-        st.write(show_recommendations(usage_type))
-
-         # Step 5: Recommendations (AFTER cost evaluation)
-    st.info("### 🌟 Personalized Appliance Recommendations:")
-    appliance_recs = get_appliance_recommendations("🏠 EcoWatt Homes", {
-        "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
-        "Refrigerator_Type": Refrigerator_Type,
-        "Monthly_Refrigerator_Usage_Hours": Monthly_Refrigerator_Usage_Hours,
-        "Monthly_TV_Usage_Hours": Monthly_TV_Usage_Hours,
-        "Monthly_Geyser_Usage_Minutes": Monthly_Geyser_Usage_Minutes,
-        "Monthly_Washing_Machine_Usage_Cycles": Monthly_Washing_Machine_Usage_Cycles
-         })
-    for rec in appliance_recs:
-        st.write("-", rec)
+        usage_type = classify_usage(kwh_pred, "Homes")
+
+        # Step 5: Recommendations (AFTER cost evaluation)
+        with stage("recommendations", "Homes"):
+            appliance_recs = get_appliance_recommendations("🏠 EcoWatt Homes", {
+                "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
+                "Refrigerator_Type": Refrigerator_Type,
+                "Monthly_Refrigerator_Usage_Hours": Monthly_Refrigerator_Usage_Hours,
+                "Monthly_TV_Usage_Hours": Monthly_TV_Usage_Hours,
+                "Monthly_Geyser_Usage_Minutes": Monthly_Geyser_Usage_Minutes,
+                "Monthly_Washing_Machine_Usage_Cycles": Monthly_Washing_Machine_Usage_Cycles
+                 })
+
+        save_result("Homes", kwh_pred=kwh_pred, cost_est=cost_est, usage_type=usage_type,
+                    appliance_recs=appliance_recs, kwh_range=(kwh_low, kwh_high), cost_range=cost_range,
+                    annual=project_year("Homes", User_data), savings=find_savings("Homes", User_data))
+        record_assessment("Homes", User_data, monthly_data, segment_pipeline.version)
+
+    show_result("Homes", "### 🌟 Personalized Appliance Recommendations:")
 
 
        
@@ -383,267 +295,396 @@ elif app_mode == "🏬 EcoWatt Shops":
     st.header("EcoWatt - Commercial Entities 🏬")
     st.write("### Enter your appliance usage details below:")
    
-    State = st.selectbox("Choose Your State ??",['Maharashtra', 'Others', 'Delhi', 'West Bengal', 'Karnataka','Tamil Nadu', 'Gujarat'])
-    City = st.selectbox("Choose Your City ??",['Kolhapur', 'Others', 'Mumbai', 'Pune', 'Bengaluru', 'Aurangabad','Nagpur', 'Chennai', 'Solapur', 'Delhi', 'Ahmedabad', 'Kolkata','Nashik'])
-    Weather = st.selectbox("Choose the Weather ??",['Monsoon', 'Summer', 'Winter'])
-    Shop_Type = st.selectbox("Choose Your Type Of Shop ??",['Bakery/SweetShop', 'Medicals', 'Clothing/Footwear', 'Grocery'])
-    Shop_Scale = st.selectbox("Choose Your Shop Scale ??",['Large', 'Small', 'Medium'])
-    Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",['LT-2'])
-    Avg_Working_Hours_Monthly = st.number_input("Enter Your Weekly working Hours ??",min_value = 0)
-    No_of_AC = st.number_input("Enter the No.of AC you have in your Shop ??",min_value = 0)
-    AC_Type = st.selectbox("Choose Your AC Type ??",['Split AC', 'None', 'Window AC', 'Inverter AC'])
-    Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC on a Weekly Basis ??",min_value = 0)
-    No_of_Fans = st.number_input("Enter the No.of Fan you have in your Shop ??",min_value = 0)
-    Fan_Type = st.selectbox("Choose Your Fan Type ??",['Crompton', 'Bajaj', 'Havells', 'None', 'Polycab'])
-    Monthly_Fan_Usage_Hours = st.number_input("For How Many Hours You Use Fan on a Weekly Basis ??",min_value = 0)
-    No_of_Refrigerators_Type_1 = st.number_input("Enter the No.of Refrigerator_Type_1 You have in Your Shop ??",min_value = 0)
-    Refrigerator_Type_1 = st.selectbox("Choose Your Refrgerator Type ??",['Display Cooler (Double Door)', 'None','Display Cooler (Single Door)'])
-    Monthly_Refrigerator_Usage_Hours_Type_1 = st.number_input("For How many hours you use Refrigerator_Type_1 on a weekly basis ??",min_value = 0 )
-    No_of_Refrigerators_Type_2 = st.number_input("Enter the No.of Refrigerator_Type_2 You have in Your Shop ??",min_value = 0)
-    Refrigerator_Type_2 = st.selectbox("Choose Your Refrgerator Type ??",['Deep Freezer (Single Lid)', 'Deep Freezer (Double Lid)', 'None'])
-    Monthly_Refrigerator_Usage_Hours_Type_2 = st.number_input("For How many hours you use Refrigerator_Type_2 on a weekly basis ??",min_value = 0 )
-    No_of_Lights = st.number_input("Enter the No.of Lights You Have in your Shop ??", min_value = 0)
-    Light_Type = st.selectbox("Choose your Light Type ??",['Tube Light', 'LED', 'CFL'])
-    Monthly_Light_Usage_Hours = st.number_input("For how many hours you use Light on a weekly basis ??",min_value=0)
-    PC_Type = st.selectbox("Choose your PC Type ??",['HP', 'Dell', 'None', 'Lenovo'])
-    Monthly_PC_Usage_Hours = st.number_input("For how many Hours you use PC/Billing_System on a weekly basis ??",min_value=0)
-
-
-
-    if st.button("🔍 Analyze Usage"):
-        user_data = pd.DataFrame({
-               'State':[State],
-               "City" :[City],
-               "Weather/Season":[Weather],
-               "Shop_Type":[Shop_Type],
-               "Shop_Scale":[Shop_Scale],
-               "Electricity_Tariff_Type":[Electricity_Tariff_Type],
-               "Avg_Working_Hours_Monthly":[Avg_Working_Hours_Monthly],
-               "No_of_AC":[No_of_AC],
-               "AC_Type":[AC_Type],
-               "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
-               "No_of_Fans":[No_of_Fans],
-               "Fan_Type":[Fan_Type],
-               "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
-               "No_of_Refrigerators_Type_1":[No_of_Refrigerators_Type_1],
-               "Refrigerator_Type_1":[Refrigerator_Type_1],
-               "Monthly_Refrigerator_Usage_Hours_Type_1":[Monthly_Refrigerator_Usage_Hours_Type_1],
-               "No_of_Refrigerators_Type_2":[No_of_Refrigerators_Type_2],
-               "Refrigerator_Type_2":[Refrigerator_Type_2],
-               "Monthly_Refrigerator_Usage_Hours_Type_2":[Monthly_Refrigerator_Usage_Hours_Type_2],
-               "No_of_Lights":[No_of_Lights],
-               "Lights_Type":[Light_Type],
-               "Monthly_Lights_Usage_Hours":[Monthly_Light_Usage_Hours],
-               "Billing_System/PC_Type":[PC_Type],
-               "Monthly_PC_Usage_Hours":[Monthly_PC_Usage_Hours]
- })
-
-
+    # Widgets inside the form only trigger a rerun when it is submitted
+    with st.form("shops_form"):
+        State = st.selectbox("Choose Your State ??",SELECT_OPTIONS["Shops"]["State"])
+        City = st.selectbox("Choose Your City ??",SELECT_OPTIONS["Shops"]["City"])
+        Weather = st.selectbox("Choose the Weather ??",SELECT_OPTIONS["Shops"]["Weather/Season"])
+        Shop_Type = st.selectbox("Choose Your Type Of Shop ??",SELECT_OPTIONS["Shops"]["Shop_Type"])
+        Shop_Scale = st.selectbox("Choose Your Shop Scale ??",SELECT_OPTIONS["Shops"]["Shop_Scale"])
+        Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",SELECT_OPTIONS["Shops"]["Electricity_Tariff_Type"])
+        Avg_Working_Hours_Monthly = st.number_input("Enter Your Weekly working Hours ??",min_value = 0)
+        No_of_AC = st.number_input("Enter the No.of AC you have in your Shop ??",min_value = 0)
+        AC_Type = st.selectbox("Choose Your AC Type ??",SELECT_OPTIONS["Shops"]["AC_Type"])
+        Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC on a Weekly Basis ??",min_value = 0)
+        No_of_Fans = st.number_input("Enter the No.of Fan you have in your Shop ??",min_value = 0)
+        Fan_Type = st.selectbox("Choose Your Fan Type ??",SELECT_OPTIONS["Shops"]["Fan_Type"])
+        Monthly_Fan_Usage_Hours = st.number_input("For How Many Hours You Use Fan on a Weekly Basis ??",min_value = 0)
+        No_of_Refrigerators_Type_1 = st.number_input("Enter the No.of Refrigerator_Type_1 You have in Your Shop ??",min_value = 0)
+        Refrigerator_Type_1 = st.selectbox("Choose Your Refrgerator Type ??",SELECT_OPTIONS["Shops"]["Refrigerator_Type_1"])
+        Monthly_Refrigerator_Usage_Hours_Type_1 = st.number_input("For How many hours you use Refrigerator_Type_1 on a weekly basis ??",min_value = 0 )
+        No_of_Refrigerators_Type_2 = st.number_input("Enter the No.of Refrigerator_Type_2 You have in Your Shop ??",min_value = 0)
+        Refrigerator_Type_2 = st.selectbox("Choose Your Refrgerator Type ??",SELECT_OPTIONS["Shops"]["Refrigerator_Type_2"])
+        Monthly_Refrigerator_Usage_Hours_Type_2 = st.number_input("For How many hours you use Refrigerator_Type_2 on a weekly basis ??",min_value = 0 )
+        No_of_Lights = st.number_input("Enter the No.of Lights You Have in your Shop ??", min_value = 0)
+        Light_Type = st.selectbox("Choose your Light Type ??",SELECT_OPTIONS["Shops"]["Lights_Type"])
+        Monthly_Light_Usage_Hours = st.number_input("For how many hours you use Light on a weekly basis ??",min_value=0)
+        PC_Type = st.selectbox("Choose your PC Type ??",SELECT_OPTIONS["Shops"]["Billing_System/PC_Type"])
+        Monthly_PC_Usage_Hours = st.number_input("For how many Hours you use PC/Billing_System on a weekly basis ??",min_value=0)
+        submitted = st.form_submit_button("🔍 Analyze Usage")
+
+
+
+    if submitted:
+        with stage("build_frame", "Shops"):
+            user_data = pd.DataFrame({
+                   'State':[State],
+                   "City" :[City],
+                   "Weather/Season":[Weather],
+                   "Shop_Type":[Shop_Type],
+                   "Shop_Scale":[Shop_Scale],
+                   "Electricity_Tariff_Type":[Electricity_Tariff_Type],
+                   "Avg_Working_Hours_Monthly":[Avg_Working_Hours_Monthly],
+                   "No_of_AC":[No_of_AC],
+                   "AC_Type":[AC_Type],
+                   "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
+                   "No_of_Fans":[No_of_Fans],
+                   "Fan_Type":[Fan_Type],
+                   "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
+                   "No_of_Refrigerators_Type_1":[No_of_Refrigerators_Type_1],
+                   "Refrigerator_Type_1":[Refrigerator_Type_1],
+                   "Monthly_Refrigerator_Usage_Hours_Type_1":[Monthly_Refrigerator_Usage_Hours_Type_1],
+                   "No_of_Refrigerators_Type_2":[No_of_Refrigerators_Type_2],
+                   "Refrigerator_Type_2":[Refrigerator_Type_2],
+                   "Monthly_Refrigerator_Usage_Hours_Type_2":[Monthly_Refrigerator_Usage_Hours_Type_2],
+                   "No_of_Lights":[No_of_Lights],
+                   "Lights_Type":[Light_Type],
+                   "Monthly_Lights_Usage_Hours":[Monthly_Light_Usage_Hours],
+                   "Billing_System/PC_Type":[PC_Type],
+                   "Monthly_PC_Usage_Hours":[Monthly_PC_Usage_Hours]
+     })
+
+
+
+        # Remembered for the what-if Simulator
+        st.session_state.setdefault("profiles", {})["Shops"] = user_data.iloc[0].to_dict()
 
         # Step 1: Aggregate Weekly -> Monthly
-        monthly_data = aggregate_weekly_to_monthly_Shops(user_data)
+        with stage("aggregate", "Shops"):
+            monthly_data = aggregate_weekly_to_monthly_Shops(user_data)
 
         # Step 2: Predict kWh using regression model
-        model_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Models\Best_Model_EcoWatt_Shops.pkl")
-        preprocessor_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Preprocessing_Models\Preprocessing_EcoWatt_Shops.pkl")
-        transformed_data = preprocessor_reg.transform(monthly_data)
-        kwh_pred = model_reg.predict(transformed_data)[0]
+        segment_pipeline = registry.get("Shops")
+        # Point estimate plus the 10th-90th percentile range of the trees, one pass
+        kwh_pred, kwh_low, kwh_high = (values[0] for values in segment_pipeline.predict_interval(monthly_data))
 
         # Step 3: Cost Calculation
-        st.info(f" 🔋 Estimated Monthly kWh Consumption is: {round(kwh_pred)} units")
-        cost_est = rule_based_cost_calculator_LT_2(kwh_pred)
-        st.info(f"💰 Estimated Monthly Cost: ₹ {cost_est}")
+        with stage("cost", "Shops"):
+            cost_est = rule_based_cost_calculator_LT_2(kwh_pred, State)
+            cost_range = (rule_based_cost_calculator_LT_2(kwh_low, State), rule_based_cost_calculator_LT_2(kwh_high, State))
 
         # Step 4: Classification (Usage Type)
-        if kwh_pred < 350 :
-            usage_type = "Low Usage"
-        elif kwh_pred < 600 :
-            usage_type = "Medium Usage"
-        else:
-            usage_type = "High Usage"
+        usage_type = classify_usage(kwh_pred, "Shops")
 
-        st.write(f"🏷️ Usage Category: **{usage_type}**")
-        st.write(show_recommendations(usage_type))
+        # Step 4: Recommendations (AFTER cost evaluation)
+        with stage("recommendations", "Shops"):
+            shop_recs = get_appliance_recommendations("🏬 EcoWatt Shops", {
+                "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
+                "Monthly_Refrigerator_Usage_Hours_Type_1": Monthly_Refrigerator_Usage_Hours_Type_1,
+                "Monthly_Refrigerator_Usage_Hours_Type_2": Monthly_Refrigerator_Usage_Hours_Type_2,
+                "Monthly_Light_Usage_Hours": Monthly_Light_Usage_Hours,
+                "Monthly_PC_Usage_Hours": Monthly_PC_Usage_Hours
+            })
 
+        save_result("Shops", kwh_pred=kwh_pred, cost_est=cost_est, usage_type=usage_type,
+                    appliance_recs=shop_recs, kwh_range=(kwh_low, kwh_high), cost_range=cost_range,
+                    annual=project_year("Shops", user_data), savings=find_savings("Shops", user_data))
+        record_assessment("Shops", user_data, monthly_data, segment_pipeline.version)
 
-        # Step 4: Recommendations (AFTER cost evaluation)
-    st.info("### 🌟 Appliance Efficiency Tips:")
-    shop_recs = get_appliance_recommendations("🏬 EcoWatt Shops", {
-        "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
-        "Monthly_Refrigerator_Usage_Hours_Type_1": Monthly_Refrigerator_Usage_Hours_Type_1,
-        "Monthly_Refrigerator_Usage_Hours_Type_2": Monthly_Refrigerator_Usage_Hours_Type_2,
-        "Monthly_Light_Usage_Hours": Monthly_Light_Usage_Hours,
-        "Monthly_PC_Usage_Hours": Monthly_PC_Usage_Hours
-    })
-    for rec in shop_recs:
-        st.write("-", rec)
+    show_result("Shops", "### 🌟 Appliance Efficiency Tips:")
 
 
 elif app_mode == "🏢 EcoWatt Offices":
     st.header("EcoWatt Offices 🏢")
     st.write("### Enter your appliance usage details below:")
    
-    State = st.selectbox("Choose Your State ??",['Delhi', 'Karnataka', 'Gujarat', 'Maharashtra', 'Others','Tamil Nadu',"West Bengal"])
-    City = st.selectbox("Choose Your City ??",['New Delhi', 'Mysuru', 'Surat', 'Pune', 'Others', 'Ahmedabad','Bengaluru', 'Nagpur', 'Mumbai', 'Coimbatore', 'Chennai',"Kolkata"])
-    Weather = st.selectbox("Choose the Weather ??",['Winter', 'Summer', 'Monsoon'])
-    Office_Type = st.selectbox("Choose Your Office Type ??",['Startup', 'IT/Corporate', 'Government_Office'])
-    Office_Scale = st.selectbox("Choose Your Office Scale ??",['Medium', 'Small', 'Large'])
-    Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",['LT-2 (Commercial)'])
-    Avg_Working_Hours_Monthly = st.number_input("Enter Your Weekly working Hours ??",min_value = 0)
-    No_of_AC = st.number_input("Enter the No.of ACs you have in your Office ??",min_value = 0)
-    AC_Type = st.selectbox("Choose Your AC Type ??",['Split AC', 'Inverter AC', 'Window AC', 'None'])
-    Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC on a Weekly Basis ??",min_value = 0)
-    No_of_Fan = st.number_input("Enter the No.of Fans you have in your Office ??",min_value = 0)
-    Fan_Type = st.selectbox("Choose Your Fan Type ??",['Bajaj', 'Crompton', 'Havells', 'None', 'Polycab'])
-    Monthly_Fan_Usage_Hours = st.number_input("For How Many Hours You Use Fan on a Weekly Basis ??",min_value = 0)
-    No_Of_Lights = st.number_input("Enter How Many Lights you have in Your Office ??",min_value = 0)
-    Lights_Type = st.selectbox("Choose the Type of Light ??",['CFL', 'LED', 'Tube Light'])
-    Monthly_Lights_Usage_Hours = st.number_input("For How Many Hours You use Lights On a Weekly Basis ??" , min_value=0)
-    No_Of_PCs = st.number_input("Enter the No.of PCs You have in Your Office ??",min_value = 0)
-    PC_Type = st.selectbox("Choose Your PCs Type ??",['Laptop', 'Desktop'])
-    Monthly_PCs_Usage_Hours = st.number_input("For How many hours you use PCs on a weekly basis ??",min_value = 0 )
-    No_Of_Refrigerators = st.number_input("Enter the No.of Refrigerators You Have in your Office ??", min_value = 0)
-    Refrigerators_Type = st.selectbox("Choose your Refrigerator Type ??",['Double Door 3★', 'Double Door 4★', 'Side-by-Side 5★', 'None','Single Door 5★', 'Side-by-Side 4★', 'Single Door 4★','Single Door 3★', 'Double Door 5★'])
-    Monthly_Refrigerator_Usage_Hours = st.number_input("For how many hours you use Refrigerator on a weekly basis ??",min_value=0)
-    No_Of_Printers = st.number_input("How many Printer You have in your Office ??",min_value = 0)
-    Printer_Type = st.selectbox("Choose the Printer Type ??",['Sony', 'HP', 'Canon'])
-    Monthly_Printer_Usage_Minutes = st.number_input("For how many Minutes You Use Printers on a weekly basis ??",min_value=0)
-    No_Of_Projectors = st.number_input("Enter the No.Of Projectors You Have in your Office ??",min_value = 0)
-    Projector_Type = st.selectbox("Choose Projector Type ??",['Sony', 'Epson'])
-    Monthly_Projector_Usage_Hours = st.number_input("For How many Hours You use Projector in your Office On a Weekly Basis ??",min_value=0)
-
-
-
-    if st.button("🔍 Analyze Usage"):
-        user_data = pd.DataFrame({
-               'State':[State],
-               "City" :[City],
-               "Weather/Season":[Weather],
-               "Office_Type":[Office_Type],
-               "Office_Scale":[Office_Scale],
-               "Electricity_Tariff_Type":[Electricity_Tariff_Type],
-               "Avg_Working_Hours_Monthly":[Avg_Working_Hours_Monthly],
-               "No_Of_ACs":[No_of_AC],
-               "AC_Type":[AC_Type],
-               "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
-               "No_Of_Fans":[No_of_Fan],
-               "Fan_Type":[Fan_Type],
-               "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
-               "No_Of_Lights":[No_Of_Lights],
-               "Lights_Type":[Lights_Type],
-               "Monthly_Lights_Usage_Hours":[Monthly_Lights_Usage_Hours],
-               "No_Of_PCs":[No_Of_PCs],
-               "PC_Type":[PC_Type],
-               "Monthly_PC_Usage_Hours":[Monthly_PCs_Usage_Hours],
-               "No_Of_Refrigerators":[No_Of_Refrigerators],
-               "Refrigerator_Type":[Refrigerators_Type],
-               "Monthly_Refrigerator_Usage_Hours":[Monthly_Refrigerator_Usage_Hours],
-               "No_Of_Printers":[No_Of_Printers],
-               "Printer_Type":[Printer_Type],
-               "Monthly_Printer_Usage_Minutes":[Monthly_Printer_Usage_Minutes],
-               "No_Of_Projectors":[No_Of_Projectors],
-               "Projector_Type":[Projector_Type],
-               "Monthly_Projector_Usage_Hours":[Monthly_Projector_Usage_Hours]
- })
-
-
+    # Widgets inside the form only trigger a rerun when it is submitted
+    with st.form("offices_form"):
+        State = st.selectbox("Choose Your State ??",SELECT_OPTIONS["Offices"]["State"])
+        City = st.selectbox("Choose Your City ??",SELECT_OPTIONS["Offices"]["City"])
+        Weather = st.selectbox("Choose the Weather ??",SELECT_OPTIONS["Offices"]["Weather/Season"])
+        Office_Type = st.selectbox("Choose Your Office Type ??",SELECT_OPTIONS["Offices"]["Office_Type"])
+        Office_Scale = st.selectbox("Choose Your Office Scale ??",SELECT_OPTIONS["Offices"]["Office_Scale"])
+        Electricity_Tariff_Type = st.selectbox("Choose Your Electricity Tariff Type ??",SELECT_OPTIONS["Offices"]["Electricity_Tariff_Type"])
+        Avg_Working_Hours_Monthly = st.number_input("Enter Your Weekly working Hours ??",min_value = 0)
+        No_of_AC = st.number_input("Enter the No.of ACs you have in your Office ??",min_value = 0)
+        AC_Type = st.selectbox("Choose Your AC Type ??",SELECT_OPTIONS["Offices"]["AC_Type"])
+        Monthly_AC_Usage_Hours = st.number_input("For How Many Hours You Use AC on a Weekly Basis ??",min_value = 0)
+        No_of_Fan = st.number_input("Enter the No.of Fans you have in your Office ??",min_value = 0)
+        Fan_Type = st.selectbox("Choose Your Fan Type ??",SELECT_OPTIONS["Offices"]["Fan_Type"])
+        Monthly_Fan_Usage_Hours = st.number_input("For How Many Hours You Use Fan on a Weekly Basis ??",min_value = 0)
+        No_Of_Lights = st.number_input("Enter How Many Lights you have in Your Office ??",min_value = 0)
+        Lights_Type = st.selectbox("Choose the Type of Light ??",SELECT_OPTIONS["Offices"]["Lights_Type"])
+        Monthly_Lights_Usage_Hours = st.number_input("For How Many Hours You use Lights On a Weekly Basis ??" , min_value=0)
+        No_Of_PCs = st.number_input("Enter the No.of PCs You have in Your Office ??",min_value = 0)
+        PC_Type = st.selectbox("Choose Your PCs Type ??",SELECT_OPTIONS["Offices"]["PC_Type"])
+        Monthly_PCs_Usage_Hours = st.number_input("For How many hours you use PCs on a weekly basis ??",min_value = 0 )
+        No_Of_Refrigerators = st.number_input("Enter the No.of Refrigerators You Have in your Office ??", min_value = 0)
+        Refrigerators_Type = st.selectbox("Choose your Refrigerator Type ??",SELECT_OPTIONS["Offices"]["Refrigerator_Type"])
+        Monthly_Refrigerator_Usage_Hours = st.number_input("For how many hours you use Refrigerator on a weekly basis ??",min_value=0)
+        No_Of_Printers = st.number_input("How many Printer You have in your Office ??",min_value = 0)
+        Printer_Type = st.selectbox("Choose the Printer Type ??",SELECT_OPTIONS["Offices"]["Printer_Type"])
+        Monthly_Printer_Usage_Minutes = st.number_input("For how many Minutes You Use Printers on a weekly basis ??",min_value=0)
+        No_Of_Projectors = st.number_input("Enter the No.Of Projectors You Have in your Office ??",min_value = 0)
+        Projector_Type = st.selectbox("Choose Projector Type ??",SELECT_OPTIONS["Offices"]["Projector_Type"])
+        Monthly_Projector_Usage_Hours = st.number_input("For How many Hours You use Projector in your Office On a Weekly Basis ??",min_value=0)
+        submitted = st.form_submit_button("🔍 Analyze Usage")
+
+
+
+    if submitted:
+        with stage("build_frame", "Offices"):
+            user_data = pd.DataFrame({
+                   'State':[State],
+                   "City" :[City],
+                   "Weather/Season":[Weather],
+                   "Office_Type":[Office_Type],
+                   "Office_Scale":[Office_Scale],
+                   "Electricity_Tariff_Type":[Electricity_Tariff_Type],
+                   "Avg_Working_Hours_Monthly":[Avg_Working_Hours_Monthly],
+                   "No_Of_ACs":[No_of_AC],
+                   "AC_Type":[AC_Type],
+                   "Monthly_AC_Usage_Hours":[Monthly_AC_Usage_Hours],
+                   "No_Of_Fans":[No_of_Fan],
+                   "Fan_Type":[Fan_Type],
+                   "Monthly_Fan_Usage_Hours":[Monthly_Fan_Usage_Hours],
+                   "No_Of_Lights":[No_Of_Lights],
+                   "Lights_Type":[Lights_Type],
+                   "Monthly_Lights_Usage_Hours":[Monthly_Lights_Usage_Hours],
+                   "No_Of_PCs":[No_Of_PCs],
+                   "PC_Type":[PC_Type],
+                   "Monthly_PC_Usage_Hours":[Monthly_PCs_Usage_Hours],
+                   "No_Of_Refrigerators":[No_Of_Refrigerators],
+                   "Refrigerator_Type":[Refrigerators_Type],
+                   "Monthly_Refrigerator_Usage_Hours":[Monthly_Refrigerator_Usage_Hours],
+                   "No_Of_Printers":[No_Of_Printers],
+                   "Printer_Type":[Printer_Type],
+                   "Monthly_Printer_Usage_Minutes":[Monthly_Printer_Usage_Minutes],
+                   "No_Of_Projectors":[No_Of_Projectors],
+                   "Projector_Type":[Projector_Type],
+                   "Monthly_Projector_Usage_Hours":[Monthly_Projector_Usage_Hours]
+     })
+
+
+
+        # Remembered for the what-if Simulator
+        st.session_state.setdefault("profiles", {})["Offices"] = user_data.iloc[0].to_dict()
 
         # Step 1: Aggregate Weekly -> Monthly
-        monthly_data = aggregate_weekly_to_monthly_Offices(user_data)
+        with stage("aggregate", "Offices"):
+            monthly_data = aggregate_weekly_to_monthly_Offices(user_data)
 
         # Step 2: Predict kWh using regression model
-        model_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Models\Best_Model_EcoWatt_Office.pkl")
-        preprocessor_reg = joblib.load(r"C:\Users\Atharva Uttekar\Desktop\EcoWatt Prototype\Preprocessing_Models\Preprocessing_EcoWatt_Office.pkl")
-        transformed_data = preprocessor_reg.transform(monthly_data)
-        kwh_pred = model_reg.predict(transformed_data)[0]
+        segment_pipeline = registry.get("Offices")
+        kwh_pred = segment_pipeline.predict(monthly_data)[0]
 
-        # Simulated prediction for demo
+        # Simulated prediction for demo (drawn once per submit, not on every rerun)
         kwh_pred = np.random.uniform(100, 600)
-        st.success(f"🔋 Estimated Monthly Consumption: {kwh_pred:.2f} kWh")
 
         # Step 3: Cost Calculation
-        st.info(f" 🔋 Estimated Monthly kWh Consumption is: {round(kwh_pred)} units")
-        cost_est = rule_based_cost_calculator_LT_2(kwh_pred)
-        st.info(f"💰 Estimated Monthly Cost: ₹ {cost_est}")
+        with stage("cost", "Offices"):
+            cost_est = rule_based_cost_calculator_LT_2(kwh_pred, State)
 
         # Step 4: Classification (Usage Type)
-        if kwh_pred < 800 :
-            usage_type = "Low Usage"
-        elif kwh_pred < 1600 :
-            usage_type = "Medium Usage"
-        else:
-            usage_type = "High Usage"
-
-        st.write(f"🏷️ Usage Category: **{usage_type}**")
-        st.write(show_recommendations(usage_type))
+        usage_type = classify_usage(kwh_pred, "Offices")
 
         # Step 4: Recommendations (AFTER cost evaluation)
-    st.info("### 🌟 Appliance Efficiency Insights:")
-    office_recs = get_appliance_recommendations("🏢 EcoWatt Offices", {
-        "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
-        "Monthly_Lights_Usage_Hours": Monthly_Lights_Usage_Hours,
-        "Monthly_PC_Usage_Hours": Monthly_PCs_Usage_Hours,
-        "Monthly_Printer_Usage_Minutes": Monthly_Printer_Usage_Minutes,
-        "Monthly_Projector_Usage_Hours": Monthly_Projector_Usage_Hours
-    })
-    for rec in office_recs:
-        st.write("-", rec)
+        with stage("recommendations", "Offices"):
+            office_recs = get_appliance_recommendations("🏢 EcoWatt Offices", {
+                "Monthly_AC_Usage_Hours": Monthly_AC_Usage_Hours,
+                "Monthly_Lights_Usage_Hours": Monthly_Lights_Usage_Hours,
+                "Monthly_PC_Usage_Hours": Monthly_PCs_Usage_Hours,
+                "Monthly_Printer_Usage_Minutes": Monthly_Printer_Usage_Minutes,
+                "Monthly_Projector_Usage_Hours": Monthly_Projector_Usage_Hours
+            })
+
+        save_result("Offices", kwh_pred=kwh_pred, cost_est=cost_est, usage_type=usage_type,
+                    appliance_recs=office_recs, demo_kwh=True)
+        # Not recorded in the history: the kWh shown is the demo draw, not the model's
+
+    show_result("Offices", "### 🌟 Appliance Efficiency Insights:")
 
 
 elif app_mode =="EcoWatt Simulator":
-    st.write("Use this simulator to explore how your monthly cost changes with different consumption levels.")
+    st.write("Use this simulator to explore how your predicted consumption and monthly cost change "
+             "when one or two of your appliance inputs change.")
 
     st.sidebar.markdown("---")
-    st.sidebar.subheader("⚙️ Consumption Controls")
-
-    # Base electricity rate (₹ per kWh)
-    base_rate = 8.5   # Change as per LT-2 or other tariff type
-
-    # Sidebar slider for user input
-    kwh_input = st.sidebar.slider(
-        "Adjust your Monthly Consumption (in kWh):",
-        min_value=50,
-        max_value=1000,
-        value=300,
-        step=10,
-        help="Slide to see how cost changes with usage."
-    )
+    st.sidebar.subheader("⚙️ Simulation Controls")
 
-    # Cost calculation
-    fixed_charge = 100  # Optional fixed charge per month
-    cost = kwh_input * base_rate + fixed_charge
+    segment = st.sidebar.selectbox("Choose the Segment ??", ["Homes", "Shops", "Offices"])
 
-    # Visualization in main area
-    st.markdown("### 📊 Monthly Cost Simulation")
-    st.write("This chart shows how your electricity cost increases with higher consumption.")
+    # Start from the profile last analyzed in that module, else the module's default inputs
+    saved_profile = st.session_state.get("profiles", {}).get(segment)
+    profile = dict(saved_profile or default_profile(segment))
+    if saved_profile is None:
+        st.caption(f"No {segment} profile analyzed yet in this session, using the module's default inputs.")
 
-    import plotly.express as px
+    profile["State"] = st.sidebar.selectbox(
+        "Bill with the tariff of ??",
+        SELECT_OPTIONS[segment]["State"],
+        index=SELECT_OPTIONS[segment]["State"].index(profile["State"]),
+    )
 
-    # Create data for visualization
-    kwh_values = list(range(50, 1001, 50))
-    cost_values = [kwh * base_rate + fixed_charge for kwh in kwh_values]
+    numeric_columns = sweep_columns(segment)
+    x_column = st.sidebar.selectbox("Vary (X axis)", numeric_columns,
+                                    index=numeric_columns.index("Monthly_AC_Usage_Hours"))
+    y_choice = st.sidebar.selectbox("And (Y axis)", ["None"] + [c for c in numeric_columns if c != x_column])
+    y_column = None if y_choice == "None" else y_choice
+    steps = st.sidebar.slider("Grid points per axis", 5, MAX_STEPS, DEFAULT_STEPS)
+
+    x_range = st.sidebar.slider(f"{x_column} range (weekly)", 0, 2 * sweep_range(x_column)[1], sweep_range(x_column))
+    x_values = np.linspace(x_range[0], x_range[1], steps)
+    y_values = None
+    if y_column is not None:
+        y_range = st.sidebar.slider(f"{y_column} range (weekly)", 0, 2 * sweep_range(y_column)[1], sweep_range(y_column))
+        y_values = np.linspace(y_range[0], y_range[1], steps)
+        if y_column.lower().startswith("no_of"):
+            # Counts only make sense as whole numbers
+            y_values = np.unique(np.round(y_values))
+
+    # Same inputs as the last rerun -> the cached grid and figure, no sweep or Plotly work
+    result, fig = simulate(profile, segment, x_column, tuple(x_values), y_column,
+                           None if y_values is None else tuple(y_values), registry.get(segment).version)
+
+    st.markdown("### 📊 What-if Simulation")
+    st.plotly_chart(fig, use_container_width=True)
 
-    # Plot the line chart
-    fig = px.line(
-        x=kwh_values,
-        y=cost_values,
-        title="Electricity Cost vs. Consumption",
-        labels={"x": "Consumption (kWh)", "y": "Monthly Cost (₹)"},
-        markers=True
+    st.markdown(
+        f"### 💰 Monthly Cost Range: *₹ {result['cost'].min():,.2f} – ₹ {result['cost'].max():,.2f}* "
+        f"({result['kwh'].min():,.0f} – {result['kwh'].max():,.0f} kWh)"
     )
 
-    # Highlight selected point
-    fig.add_scatter(
-        x=[kwh_input],
-        y=[cost],
-        mode='markers+text',
-        text=[f"₹{cost:,.0f}"],
-        textposition="top center",
-        marker=dict(size=12, color='orange', symbol='circle')
-    )
 
-    st.plotly_chart(fig, use_container_width=True)
+elif app_mode == "📂 EcoWatt Batch":
+    st.header("EcoWatt Batch Scoring 📂")
+    st.write("Upload a CSV or Parquet file with one row per home, shop or office. "
+             "Use the same columns as the single-entry modules (weekly usage values).")
+
+    segment = st.selectbox("Choose the Segment ??", ["Homes", "Shops", "Offices"])
+    uploaded_file = st.file_uploader("Upload your portfolio file", type=["csv", "parquet"])
+    save_history = st.checkbox("🕑 Save the scored rows to the assessment history (Site_ID column optional)")
+
+    if uploaded_file is not None and st.button("🔍 Score Portfolio"):
+        with st.spinner("Scoring portfolio..."):
+            with stage("score_file", segment):
+                results = score_file(uploaded_file, segment)
+            if save_history:
+                with stage("history_write", segment):
+                    history.record_frame(results, segment)
+        # Kept so the download button's rerun does not drop (or rescore) the results
+        st.session_state["batch_results"] = (segment, results)
+        st.session_state["portfolio"] = Portfolio.from_scored(results, segment) if segment in GROUP_COLUMNS else None
+
+    if "batch_results" in st.session_state:
+        scored_segment, results = st.session_state["batch_results"]
+        st.success(f"✅ Scored {len(results)} {scored_segment} rows")
+        st.dataframe(results, use_container_width=True)
+        st.download_button(
+            "⬇️ Download Results (CSV)",
+            results_csv(results),
+            file_name=f"EcoWatt_{scored_segment}_Results.csv",
+            mime="text/csv"
+        )
+
+    portfolio = st.session_state.get("portfolio")
+    if portfolio is not None:
+        st.markdown("### 🗂️ Portfolio Rollup")
+        group_column = st.selectbox("Group sites by ??", portfolio.group_columns)
+
+        # Only the edited site is re-scored; only the groups it left / joined change
+        with st.form("portfolio_update_form"):
+            st.write("#### ✏️ Update One Site")
+            site_id = st.selectbox("Site ??", portfolio.sites.index)
+            column = st.selectbox("Input to change ??", sweep_columns(portfolio.segment))
+            value = st.number_input("New weekly value ??", min_value=0.0)
+            if st.form_submit_button("🔁 Re-score Site"):
+                with stage("portfolio_update", portfolio.segment):
+                    row = portfolio.update_site(site_id, {column: value})
+                st.success(f"✅ {site_id}: {row['Predicted_kWh']:,.0f} kWh, ₹ {row['Estimated_Cost']:,.2f} "
+                           f"({row['Usage_Category']}); {portfolio.rescored} sites re-scored so far")
+
+        st.dataframe(portfolio.rollup(group_column).round(2), use_container_width=True)
+
+
+elif app_mode == "🕑 EcoWatt History":
+    st.header("EcoWatt History 🕑")
+    st.write("Every analysis is kept here. Give a Site ID in the sidebar to follow one home, shop or office "
+             "over time.")
+
+    segment = st.selectbox("Choose the Segment ??", ["Homes", "Shops", "Offices"])
+    days = st.slider("Look back (days)", 1, 365, 90)
+    since = time.time() - days * 86400
+
+    st.markdown("### 📈 Site Trend")
+    site_ids = history.recent_sites(segment)
+    if site_ids:
+        default_site = site_ids.index(tracked_site_id) if tracked_site_id in site_ids else 0
+        trend_site = st.selectbox("Site ??", site_ids, index=default_site)
+        with stage("history_site_trend", segment):
+            trend = history.site_trend(trend_site, segment, since=since)
+        if len(trend):
+            fig = px.line(
+                trend,
+                x="created",
+                y="predicted_kwh",
+                markers=True,
+                hover_data=["estimated_cost", "usage_category", "model_version"],
+                title=f"Predicted Monthly kWh of {trend_site}",
+                labels={"created": "Assessed", "predicted_kwh": "Predicted kWh"},
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.caption(f"No assessments of {trend_site} in the last {days} days.")
+    else:
+        st.caption(f"No {segment} assessment with a Site ID yet.")
+
+    st.markdown("### 🏆 Leaderboard")
+    by = st.radio("Rank by ??", ["site", "city", "state"], horizontal=True)
+    lowest = st.checkbox("Lowest consumption first")
+    with stage("history_leaderboard", segment):
+        leaderboard = history.leaderboard(segment, by=by, n=10, since=since, lowest=lowest)
+    st.dataframe(leaderboard.round(2), use_container_width=True, hide_index=True)
+
+    st.markdown("### 🗺️ Area Trend")
+    state = st.selectbox("State ??", ["All"] + list(SELECT_OPTIONS[segment]["State"]))
+    city = st.selectbox("City ??", ["All"] + list(SELECT_OPTIONS[segment]["City"]))
+    with stage("history_area_trend", segment):
+        area = history.area_trend(segment, state=None if state == "All" else state,
+                                  city=None if city == "All" else city, since=since)
+    if len(area):
+        fig = px.bar(
+            area,
+            x="day",
+            y="avg_kwh",
+            hover_data=["assessments", "avg_cost"],
+            title="Average Predicted kWh per Assessment",
+            labels={"day": "Day", "avg_kwh": "Average kWh"},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.caption("No assessments for that area and period.")
 
-# Display result
-    st.markdown(f"### 💰 Estimated Monthly Cost: *₹ {cost:,.2f}*")
 
+# DIAGNOSTICS
+
+if show_diagnostics:
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🩺 Stage Timings (ms)")
+    timing_rows = timings.snapshot()
+    if timing_rows:
+        st.sidebar.dataframe(
+            pd.DataFrame(timing_rows)[["segment", "stage", "count", "p50_ms", "p95_ms", "p99_ms"]].round(3),
+            hide_index=True,
+        )
+    else:
+        st.sidebar.caption("Nothing timed yet, run an analysis.")
+    st.sidebar.download_button(
+        "⬇️ Prometheus Metrics",
+        timings.prometheus_text(),
+        file_name="ecowatt_stage_timings.prom",
+        mime="text/plain"
+    )
+
+if TIMING_FILE and timings.enabled:
+    timings.write_prometheus(TIMING_FILE)
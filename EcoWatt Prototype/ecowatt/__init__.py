@@ -0,0 +1,51 @@
+"""
+EcoWatt Suite core package.
+
+Holds the pieces of the analyzer that are shared between the Streamlit app,
+the `python -m ecowatt` command line and anything else that wants to score
+Homes, Shops or Offices. Nothing in here imports Streamlit or Plotly.
+
+Submodules are only imported when one of the names below is first used, so
+`import ecowatt` stays cheap for cron jobs and worker processes. The shared
+model registry itself is `ecowatt.registry.registry` (`ecowatt.registry` is
+the module).
+"""
+
+import importlib
+
+
+_EXPORTS = {
+    "ModelRegistry": "ecowatt.registry",
+    "SegmentPipeline": "ecowatt.registry",
+    "get_pipeline": "ecowatt.registry",
+    "normalize_segment": "ecowatt.registry",
+    "score_one": "ecowatt.core",
+    "predict_kwh": "ecowatt.core",
+    "predict_kwh_interval": "ecowatt.core",
+    "score_frame": "ecowatt.batch",
+    "score_file": "ecowatt.batch",
+    "score_record_batch": "ecowatt.columnar",
+    "read_results": "ecowatt.columnar",
+    "PredictionCache": "ecowatt.cache",
+    "ingest_readings": "ecowatt.ingest",
+    "Portfolio": "ecowatt.portfolio",
+    "HistoryStore": "ecowatt.history",
+    "project_annual": "ecowatt.annual",
+    "optimize_savings": "ecowatt.optimizer",
+    "bill": "ecowatt.tariffs",
+    "TARIFFS": "ecowatt.tariffs",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'ecowatt' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
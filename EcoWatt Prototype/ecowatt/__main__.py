@@ -0,0 +1,4 @@
+from ecowatt.cli import main
+
+
+raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""
+Twelve-month bill projections.
+
+The modules predict one month for the season the user picks. An annual
+projection expands each profile into its 12 calendar months, gives every month
+the season it has in the profile's State (SEASON_CALENDAR), optionally scales
+the appliance usage per season, and predicts and bills all the profiles in one
+batch, the way the simulator scores a grid. Months of one season are the same
+model input, so each profile is scored once per season and the results are
+spread over its months:
+
+    monthly = project_annual(profile, "homes", multipliers={"Summer": 1.3, "Winter": 0.8})
+    annual_summary(monthly)
+
+For a portfolio of n sites that is one transform/predict call over 3 x n rows
+instead of 12 x n single-row calls. Every month is billed on its own with the
+segment's state tariff; months are the model's months (4 weeks of the weekly
+inputs), not calendar day counts.
+"""
+
+import numpy as np
+
+from ecowatt.core import classify_usage_batch, estimate_cost_batch, monthly_features
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+SEASONS = ("Monsoon", "Summer", "Winter")
+
+
+def _calendar(summer, monsoon):
+    """12 season labels, month 1 first; months in neither tuple are Winter."""
+    return tuple("Summer" if m in summer else "Monsoon" if m in monsoon else "Winter" for m in range(1, 13))
+
+
+# Broad IMD seasons per state; the north-east monsoon gives Tamil Nadu its wet months late in the year
+SEASON_CALENDAR = {
+    "Maharashtra": _calendar(summer=(3, 4, 5), monsoon=(6, 7, 8, 9)),
+    "Gujarat": _calendar(summer=(3, 4, 5, 6), monsoon=(7, 8, 9)),
+    "Karnataka": _calendar(summer=(3, 4, 5), monsoon=(6, 7, 8, 9, 10)),
+    "Tamil Nadu": _calendar(summer=(3, 4, 5, 6, 7, 8, 9), monsoon=(10, 11, 12)),
+    "Delhi": _calendar(summer=(3, 4, 5, 6, 10), monsoon=(7, 8, 9)),
+    "West Bengal": _calendar(summer=(3, 4, 5), monsoon=(6, 7, 8, 9)),
+    "Others": _calendar(summer=(3, 4, 5), monsoon=(6, 7, 8, 9)),
+}
+
+def usage_columns(segment, registry=None):
+    """Appliance usage inputs (hours, minutes, cycles) that season multipliers scale."""
+    from ecowatt.simulator import sweep_columns
+
+    return [c for c in sweep_columns(segment, registry) if "Usage" in c or "Hrs" in c]
+
+
+def season_table(states):
+    """(n, 12) season labels for an array of states (unknown states use Others)."""
+    states = np.asarray(states, dtype=object)
+    table = np.empty((len(states), 12), dtype=object)
+    for state in np.unique(states):
+        table[states == state] = SEASON_CALENDAR.get(state, SEASON_CALENDAR["Others"])
+    return table
+
+
+def _factors(multipliers, seasons, columns):
+    """(n_rows, n_columns) usage multipliers for an array of season labels."""
+    factors = np.ones((len(seasons), len(columns)))
+    for season, multiplier in (multipliers or {}).items():
+        if season not in SEASONS:
+            raise ValueError(f"Unknown season {season!r} (use {', '.join(SEASONS)})")
+        if not isinstance(multiplier, dict):
+            multiplier = dict.fromkeys(columns, multiplier)
+        unknown = [c for c in multiplier if c not in columns]
+        if unknown:
+            raise ValueError(f"Season multipliers only apply to usage columns {columns}, not {unknown}")
+        rows = seasons == season
+        for column, value in multiplier.items():
+            factors[rows, columns.index(column)] = float(value)
+    return factors
+
+
+def season_variants(frame, segment, multipliers=None, registry=None):
+    """
+    3 rows per profile (weekly inputs), one per season in SEASONS order, with
+    the season's usage multipliers applied. Months of the same season are
+    identical model inputs, so this is all an annual projection has to score.
+    """
+    segment = normalize_segment(segment)
+    n = len(frame)
+    variants = frame.iloc[np.repeat(np.arange(n), len(SEASONS))].reset_index(drop=True)
+    seasons = np.tile(np.asarray(SEASONS, dtype=object), n)
+    variants["Weather/Season"] = seasons
+
+    columns = usage_columns(segment, registry)
+    variants[columns] = variants[columns].to_numpy(dtype=np.float64) * _factors(multipliers, seasons, columns)
+    return variants
+
+
+def project_annual(profiles, segment, multipliers=None, registry=None, telescopic=False):
+    """
+    Predicted kWh and bill for each of the 12 months of every profile.
+
+    `profiles` is one profile dict or a DataFrame of them (the module columns,
+    weekly values); `multipliers` maps a season to a factor for every usage
+    column or to {column: factor}. Returns a long DataFrame (Profile, Month,
+    Weather/Season, Predicted_kWh, Estimated_Cost, Usage_Category), 12 rows
+    per profile in month order.
+    """
+    import pandas as pd
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    frame = pd.DataFrame([profiles]) if isinstance(profiles, dict) else profiles.reset_index(drop=True)
+    n = len(frame)
+
+    # One transform / predict / bill pass over the 3 x n season variants
+    variants = season_variants(frame, segment, multipliers=multipliers, registry=registry)
+    kwh = pipeline.predict(monthly_features(variants, segment, pipeline))
+    cost = estimate_cost_batch(kwh, variants["State"].to_numpy(), segment, telescopic=telescopic)
+    category = classify_usage_batch(kwh, segment)
+
+    # Each month takes its profile's variant for the season it has in that State
+    seasons = season_table(frame["State"].to_numpy())
+    season_index = {season: i for i, season in enumerate(SEASONS)}
+    rows = (np.arange(n)[:, None] * len(SEASONS)
+            + np.vectorize(season_index.__getitem__, otypes=[np.intp])(seasons)).ravel()
+    return pd.DataFrame({
+        "Profile": np.repeat(np.arange(n), 12),
+        "Month": np.tile(np.arange(1, 13), n),
+        "Weather/Season": seasons.ravel(),
+        "Predicted_kWh": np.asarray(kwh)[rows],
+        "Estimated_Cost": np.asarray(cost, dtype=np.float64)[rows],
+        "Usage_Category": category[rows],
+    })
+
+
+def annual_summary(monthly):
+    """Per-profile annual kWh and bill, monthly average and the most expensive month."""
+    grouped = monthly.groupby("Profile", sort=True)
+    summary = grouped[["Predicted_kWh", "Estimated_Cost"]].sum().rename(
+        columns={"Predicted_kWh": "Annual_kWh", "Estimated_Cost": "Annual_Cost"}
+    )
+    summary["Average_Monthly_Cost"] = summary["Annual_Cost"] / 12
+    peak = monthly.loc[grouped["Estimated_Cost"].idxmax()]
+    summary["Peak_Month"] = [MONTHS[m - 1] for m in peak["Month"]]
+    summary["Peak_Month_Cost"] = peak["Estimated_Cost"].to_numpy()
+    return summary
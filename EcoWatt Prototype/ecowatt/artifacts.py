@@ -0,0 +1,116 @@
+"""
+Compiled, memory-mappable artifacts for the segment models.
+
+`python -m ecowatt compile-artifacts` converts each Models/ +
+Preprocessing_Models/ pickle pair into a directory
+
+    Compiled_Models/EcoWatt_<Segment>/
+        manifest.json     format and model versions, encoder tables
+        feature.npy       PackedForest arrays, one raw .npy each
+        threshold.npy
+        children.npy
+        value.npy
+        roots.npy         (int32 / float32 arrays with compile-artifacts --float32)
+
+The .npy files are opened with mmap_mode='r': the tree arrays are mapped
+read-only, so every Streamlit or batch worker on the machine shares the same
+page-cache pages instead of holding its own unpickled copy, and loading does
+not import sklearn at all. The pickles stay the source of truth: a bundle is
+only used when its recorded model_version equals the content hash of the
+current pickles and its format_version is the one this code writes.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+
+
+class StaleArtifact(ValueError):
+    """The compiled bundle does not match the pickles or this code."""
+
+
+def bundle_path(base_dir, segment):
+    return base_dir / "Compiled_Models" / f"EcoWatt_{segment}"
+
+
+def write_bundle(pipeline, directory):
+    """
+    Write the compiled forest and encoder of a loaded SegmentPipeline.
+
+    The bundle is built next to `directory` and renamed into place, so a
+    reader never sees half a bundle.
+    """
+    import sklearn
+
+    if pipeline.forest is None or pipeline.encoder is None:
+        raise ValueError(f"{pipeline.segment}: only tree models with a fast encoder can be compiled")
+
+    directory = os.fspath(directory)
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    forest = pipeline.forest
+    for name, array in forest.arrays().items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "segment": pipeline.segment,
+        "model_version": pipeline.version,
+        "model": type(pipeline.model).__name__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sklearn_version": sklearn.__version__,
+        "numpy_version": np.__version__,
+        "forest": {"max_depth": forest.max_depth, "n_features": forest.n_features, "n_trees": forest.n_trees,
+                   "float32": bool(forest.compact_dtypes)},
+        "encoder": pipeline.encoder.to_state(),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=1)
+
+    # Processes that still map the old files keep them until they let go
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(tmp_dir, directory)
+    return directory
+
+
+def read_manifest(directory):
+    with open(os.path.join(os.fspath(directory), MANIFEST_NAME), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def load_bundle(directory, model_version):
+    """
+    (forest, encoder, manifest) from a compiled bundle, with the tree arrays
+    memory-mapped read-only. Raises StaleArtifact if the bundle was written
+    for other pickles or by another format version.
+    """
+    from ecowatt.encoder import FastEncoder
+    from ecowatt.forest import PackedForest
+
+    manifest = read_manifest(directory)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise StaleArtifact(
+            f"{directory}: artifact format {manifest.get('format_version')}, expected {ARTIFACT_FORMAT_VERSION}"
+        )
+    if manifest.get("model_version") != model_version:
+        raise StaleArtifact(
+            f"{directory}: compiled from model version {manifest.get('model_version')}, pickles are {model_version}"
+        )
+
+    arrays = {
+        name: np.load(os.path.join(os.fspath(directory), f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+        for name in PackedForest.ARRAYS
+    }
+    forest = PackedForest.from_arrays(arrays, **{k: manifest["forest"][k] for k in ("max_depth", "n_features")})
+    encoder = FastEncoder.from_state(manifest["encoder"])
+    return forest, encoder, manifest
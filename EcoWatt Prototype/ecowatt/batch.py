@@ -0,0 +1,249 @@
+"""
+Batch scoring for whole portfolios of homes, shops or offices.
+
+The input is a CSV or Parquet file with the same columns the Streamlit
+modules build for a single user (weekly usage values). Rows are scored in
+chunks: one aggregate / transform / predict call per chunk instead of one
+Streamlit rerun per row.
+
+Parquet and Arrow (.arrow IPC stream) output goes through ecowatt.columnar:
+the results are built as Arrow record batches with the monthly features and
+rule IDs in place of the recommendation text, and streamed to the file.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from ecowatt.core import classify_usage_batch, estimate_cost_batch, monthly_features
+from ecowatt.recommendations import expand_batch, rule_bits, usage_messages_batch
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+DEFAULT_CHUNKSIZE = 50_000
+
+RESULT_COLUMNS = [
+    "Predicted_kWh",
+    "Estimated_Cost",
+    "Usage_Category",
+    "Usage_Recommendation",
+    "Recommendation_Bits",
+    "Appliance_Recommendations",
+]
+
+# Added by score_frame(intervals=True): 10th / 90th percentile of the trees and their bills
+INTERVAL_COLUMNS = [
+    "Predicted_kWh_Low",
+    "Predicted_kWh_High",
+    "Estimated_Cost_Low",
+    "Estimated_Cost_High",
+]
+
+# Separator used to keep the per-row appliance tips in one text column
+RECOMMENDATION_SEPARATOR = " | "
+
+
+def _file_format(source, fmt):
+    if fmt:
+        return fmt.lower()
+    name = getattr(source, "name", source)
+    suffix = Path(str(name)).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    return "arrow" if suffix in (".arrow", ".arrows") else "csv"
+
+
+def read_chunks(source, fmt=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield DataFrames of at most `chunksize` rows from a CSV or Parquet source.
+
+    `source` can be a path or a file-like object (e.g. a Streamlit upload).
+    """
+    import pandas as pd
+
+    fmt = _file_format(source, fmt)
+
+    if fmt == "csv":
+        # 'None' is a real category (no AC, no fridge ...), not a missing value
+        yield from pd.read_csv(source, chunksize=chunksize, keep_default_na=False, na_values=[""])
+        return
+
+    if fmt != "parquet":
+        raise ValueError(f"Unsupported input format: {fmt!r} (use csv or parquet)")
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        # pandas may still read it through fastparquet, just not incrementally
+        frame = pd.read_parquet(source)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+        return
+
+    parquet_file = pq.ParquetFile(source)
+    for record_batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield record_batch.to_pandas()
+
+
+def score_frame(frame, segment, registry=None, recommendations=True, intervals=False):
+    """
+    Score every row of a DataFrame of weekly inputs.
+
+    Returns a copy of the input with Predicted_kWh, Estimated_Cost,
+    Usage_Category and the recommendation columns appended. The text
+    columns are Categoricals; Recommendation_Bits holds the fired rule IDs
+    (see ecowatt.recommendations). With `intervals` the INTERVAL_COLUMNS are
+    added too (one extra pass over the trees, no extra prediction).
+    """
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    # Step 1: Aggregate Weekly -> Monthly
+    monthly_data = monthly_features(frame, segment, pipeline)
+
+    # Step 2: Predict kWh for the whole chunk at once
+    if intervals:
+        kwh_pred, kwh_low, kwh_high = pipeline.predict_interval(monthly_data)
+    else:
+        kwh_pred = pipeline.predict(monthly_data)
+
+    # Step 3: Cost Calculation
+    states = frame["State"].to_numpy()
+    costs = estimate_cost_batch(kwh_pred, states, segment)
+
+    # Step 4: Classification (Usage Type)
+    usage_type = classify_usage_batch(kwh_pred, segment)
+
+    result = frame.copy()
+    result["Predicted_kWh"] = kwh_pred
+    result["Estimated_Cost"] = costs
+    result["Usage_Category"] = usage_type
+
+    if intervals:
+        result["Predicted_kWh_Low"] = kwh_low
+        result["Predicted_kWh_High"] = kwh_high
+        result["Estimated_Cost_Low"] = estimate_cost_batch(kwh_low, states, segment)
+        result["Estimated_Cost_High"] = estimate_cost_batch(kwh_high, states, segment)
+
+    # Step 5: Recommendations
+    if recommendations:
+        bits = rule_bits(frame, segment)
+        result["Usage_Recommendation"] = usage_messages_batch(usage_type)
+        result["Recommendation_Bits"] = bits
+        result["Appliance_Recommendations"] = expand_batch(bits, segment, RECOMMENDATION_SEPARATOR)
+
+    return result
+
+
+class _ResultWriter:
+    """Appends scored chunks (DataFrames, or record batches for Parquet/Arrow) to a CSV, Parquet or Arrow file."""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = _file_format(path, fmt)
+        self._arrow_writer = None
+        self._started = False
+        if self.fmt not in ("csv", "parquet", "arrow"):
+            raise ValueError(f"Unsupported output format: {self.fmt!r} (use csv, parquet or arrow)")
+        if path == "-" and self.fmt != "csv":
+            raise ValueError("Only CSV output can be written to stdout")
+
+    @property
+    def columnar(self):
+        return self.fmt != "csv"
+
+    def write(self, chunk):
+        if self.path == "-":
+            chunk.to_csv(sys.stdout, header=not self._started, index=False)
+        elif self.fmt == "csv":
+            chunk.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        else:
+            from ecowatt.columnar import ArrowResultWriter
+
+            if self._arrow_writer is None:
+                self._arrow_writer = ArrowResultWriter(self.path, self.fmt)
+            self._arrow_writer.write(chunk)
+        self._started = True
+
+    def close(self):
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+
+
+def score_file(source, segment, output=None, fmt=None, output_fmt=None,
+               chunksize=DEFAULT_CHUNKSIZE, registry=None, recommendations=True, workers=1, intervals=False,
+               history=None):
+    """
+    Score a CSV/Parquet file chunk by chunk.
+
+    With `output` the results are streamed to that file ('-' for stdout) and a
+    summary dict is returned; without it the scored rows come back as one
+    DataFrame. workers > 1 scores the chunks on a process pool (same output,
+    same order); workers=None uses every CPU. With a HistoryStore as
+    `history` every scored chunk is also appended to it.
+
+    Parquet/Arrow output is scored straight into Arrow record batches
+    (ecowatt.columnar), whatever the worker count; `history` then records
+    each batch's rows.
+    """
+    segment = normalize_segment(segment)
+    started = time.perf_counter()
+    rows = 0
+
+    writer = _ResultWriter(output, output_fmt) if output is not None else None
+    columnar = writer is not None and writer.columnar
+    chunks = read_chunks(source, fmt=fmt, chunksize=chunksize)
+    if workers == 1 and columnar:
+        from ecowatt.columnar import score_record_batches
+
+        results = score_record_batches(chunks, segment, registry=registry, recommendations=recommendations,
+                                       intervals=intervals)
+    elif workers == 1:
+        results = (
+            score_frame(chunk, segment, registry=registry, recommendations=recommendations, intervals=intervals)
+            for chunk in chunks
+        )
+    else:
+        from ecowatt.parallel import default_workers, score_chunks_parallel
+
+        if registry is not None:
+            raise ValueError("Parallel scoring uses the process-wide model registry")
+        workers = workers or default_workers()
+        results = score_chunks_parallel(chunks, segment, workers=workers, recommendations=recommendations,
+                                        intervals=intervals, columnar=columnar)
+
+    scored = []
+    try:
+        for result in results:
+            rows += len(result)
+            if history is not None:
+                if columnar:
+                    from ecowatt.columnar import scored_frame
+
+                    history.record_frame(scored_frame(result), segment, registry=registry)
+                else:
+                    history.record_frame(result, segment, registry=registry)
+            if writer is not None:
+                writer.write(result)
+            else:
+                scored.append(result)
+    finally:
+        if writer is not None:
+            writer.close()
+        if history is not None:
+            history.flush()
+
+    elapsed = time.perf_counter() - started
+    if writer is None:
+        import pandas as pd
+
+        return pd.concat(scored, ignore_index=True) if scored else pd.DataFrame()
+
+    return {
+        "segment": segment,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else float("inf"),
+        "workers": workers,
+        "output": str(output),
+    }
@@ -0,0 +1,227 @@
+"""
+Reproducible benchmarks for the scoring path.
+
+    python -m ecowatt bench -o bench.json
+    python -m ecowatt bench --segment homes --sizes 1 100 10000
+
+Synthetic profiles are drawn (seeded) from the st.selectbox option lists in
+ecowatt.options and the simulator's numeric ranges. Every segment runs in a
+fresh process, so its load time is a cold start and its peak RSS belongs to
+that model alone. The prediction cache is off throughout.
+
+Per segment the JSON holds:
+- load: artifact unpickle + compile time and the RSS after it,
+- stages: single-row latency (ms, median and p95) of aggregate, transform,
+  predict, cost and recommendations, plus the pickled preprocessor/model
+  for comparison,
+- batch: score_frame throughput at each size (chunked like score_file),
+- peak_rss_mb: high-water mark of the whole run.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+DEFAULT_SIZES = (1, 100, 10_000, 1_000_000)
+DEFAULT_REPEAT = 200
+DEFAULT_SEED = 42
+
+BENCH_FORMAT_VERSION = 1
+
+
+def peak_rss_mb():
+    """High-water RSS of this process in MB (None where resource is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_profiles(segment, n_rows, seed=DEFAULT_SEED, registry=None):
+    """
+    `n_rows` random weekly input rows for a segment.
+
+    Categorical columns pick from the app's selectbox options (restricted to
+    the categories the fitted preprocessor knows); numeric columns are whole
+    numbers in the simulator's default range for that column.
+    """
+    import pandas as pd
+
+    from ecowatt.options import SELECT_OPTIONS
+    from ecowatt.registry import normalize_segment, registry as default_registry
+    from ecowatt.simulator import sweep_range
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    options = SELECT_OPTIONS[segment]
+
+    fitted = {}
+    if pipeline.encoder is not None:
+        fitted = {column: mapping for column, mapping in pipeline.encoder.onehot}
+        fitted.update({column: mapping for column, mapping, _ in pipeline.encoder.ordinal})
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column in pipeline.feature_names:
+        if column in options:
+            choices = [value for value in options[column] if column not in fitted or value in fitted[column]]
+            columns[column] = rng.choice(np.asarray(choices, dtype=object), n_rows)
+        else:
+            low, high = sweep_range(column)
+            columns[column] = rng.integers(low, high + 1, n_rows)
+    return pd.DataFrame(columns)
+
+
+def _timed(func, repeat):
+    """Median and p95 wall time of `func()` in ms."""
+    func()  # warm-up
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples[i] = time.perf_counter() - started
+    samples *= 1000
+    return {"median_ms": float(np.median(samples)), "p95_ms": float(np.percentile(samples, 95))}
+
+
+def bench_segment(segment, sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED):
+    """Benchmark one segment in this process; returns the result dict."""
+    from ecowatt.batch import DEFAULT_CHUNKSIZE, score_frame
+    from ecowatt.core import (
+        AGGREGATORS,
+        MODULE_LABELS,
+        RECOMMENDATION_FIELDS,
+        classify_usage,
+        estimate_cost,
+        get_appliance_recommendations,
+        show_recommendations,
+    )
+    from ecowatt.registry import ModelRegistry, normalize_segment
+
+    segment = normalize_segment(segment)
+    registry = ModelRegistry(cache=False)
+
+    started = time.perf_counter()
+    pipeline = registry.get(segment)
+    load_seconds = time.perf_counter() - started
+    load_rss = peak_rss_mb()
+
+    # Step 1: Single-row latency of every stage of "Analyze Usage"
+    row = synthetic_profiles(segment, 1, seed, registry)
+    monthly = AGGREGATORS[segment](row)
+    X = pipeline.transform(monthly)
+    kwh = float(pipeline.predict_transformed(X)[0])
+    state = row["State"].iloc[0]
+    rec_inputs = {key: row[column].iloc[0] for key, column in RECOMMENDATION_FIELDS[segment].items()}
+
+    stages = {
+        "aggregate": _timed(lambda: AGGREGATORS[segment](row), repeat),
+        "transform": _timed(lambda: pipeline.transform(monthly), repeat),
+        "transform_sklearn": _timed(lambda: pipeline.preprocessor.transform(monthly), repeat),
+        "predict": _timed(lambda: pipeline.predict_transformed(X), repeat),
+        "predict_sklearn": _timed(lambda: pipeline.model.predict(X), repeat),
+        "cost": _timed(lambda: estimate_cost(kwh, state, segment), repeat),
+        "recommendations": _timed(
+            lambda: (
+                show_recommendations(classify_usage(kwh, segment)),
+                get_appliance_recommendations(MODULE_LABELS[segment], rec_inputs),
+            ),
+            repeat,
+        ),
+    }
+
+    # Step 2: Batch throughput, chunked like score_file so 1M rows stay bounded
+    batch = {}
+    for size in sizes:
+        frame = synthetic_profiles(segment, size, seed, registry)
+        runs = max(1, min(repeat, 10_000 // size))
+        started = time.perf_counter()
+        for _ in range(runs):
+            for start in range(0, size, DEFAULT_CHUNKSIZE):
+                score_frame(frame.iloc[start:start + DEFAULT_CHUNKSIZE], segment, registry=registry)
+        seconds = (time.perf_counter() - started) / runs
+        batch[str(size)] = {"seconds": seconds, "rows_per_second": size / seconds}
+        del frame
+
+    return {
+        "segment": segment,
+        "model_version": pipeline.version,
+        "model": type(pipeline.model).__name__,
+        "packed_forest": pipeline.forest is not None,
+        "fast_encoder": pipeline.encoder is not None,
+        "load": {"seconds": load_seconds, "rss_mb": load_rss},
+        "stages": stages,
+        "batch": batch,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _bench_in_subprocess(args):
+    return bench_segment(*args)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(segments=None, sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, isolate=True):
+    """
+    Benchmark every segment (each in its own spawned process unless
+    isolate=False) and return the JSON-ready report.
+    """
+    import multiprocessing
+
+    import pandas as pd
+    import sklearn
+
+    from ecowatt.registry import SEGMENT_ARTIFACTS, normalize_segment
+
+    segments = [normalize_segment(s) for s in (segments or SEGMENT_ARTIFACTS)]
+    jobs = [(segment, tuple(sizes), repeat, seed) for segment in segments]
+
+    if isolate:
+        with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+            results = pool.map(_bench_in_subprocess, jobs, chunksize=1)
+    else:
+        results = [bench_segment(*job) for job in jobs]
+
+    return {
+        "format_version": BENCH_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "settings": {"sizes": list(sizes), "repeat": repeat, "seed": seed, "isolated": isolate},
+        "segments": {result["segment"]: result for result in results},
+    }
+
+
+def write_report(report, output="-"):
+    text = json.dumps(report, indent=2)
+    if output == "-":
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
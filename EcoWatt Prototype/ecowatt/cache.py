@@ -0,0 +1,121 @@
+"""
+Bounded LRU + TTL cache for kWh predictions, shared by every session.
+
+Entries are keyed on (segment, model version, monthly feature row), where the
+row is the tuple of post-aggregation feature values in the preprocessor's
+column order. Python hashes 7, 7.0 and np.float64(7.0) alike, so the same
+profile hits the same entry whether it came from a slider, a CSV or JSON.
+The model version is the artifact content hash, so a changed pickle can never
+serve an old prediction.
+
+A value is the predicted kWh, or the (kWh, low, high) triple once the row
+was predicted with an interval; predict() reads the kWh from either.
+
+Size and lifetime come from ECOWATT_PREDICTION_CACHE_SIZE (0 turns the cache
+off) and ECOWATT_PREDICTION_CACHE_TTL (seconds).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("ECOWATT_PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get("ECOWATT_PREDICTION_CACHE_TTL", 3600))
+
+# Only single sites and micro-batches go through the cache; building keys for
+# a 50k-row chunk costs more than predicting it
+CACHE_MAX_ROWS = 64
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live.
+
+    Counters: hits, misses, evictions (dropped for space), expirations
+    (dropped for age) and invalidations (dropped because the model changed).
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Cached value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, segment, keep_version=None):
+        """Drop a segment's entries (except those of `keep_version`)."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == segment and key[1] != keep_version]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def row_keys(monthly_data, feature_names):
+    """Canonical feature tuples of a dict (one row) or a DataFrame of monthly rows."""
+    if isinstance(monthly_data, dict):
+        return [tuple(monthly_data[name] for name in feature_names)]
+    # tolist() turns NumPy scalars into plain Python values
+    return list(zip(*(monthly_data[name].tolist() for name in feature_names)))
+
+
+def make_cache():
+    """The process-wide cache, or None when ECOWATT_PREDICTION_CACHE_SIZE is 0."""
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+    return PredictionCache()
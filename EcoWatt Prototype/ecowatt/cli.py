@@ -0,0 +1,432 @@
+"""
+Command line entry point:
+
+    python -m ecowatt score --segment shops input.csv
+    python -m ecowatt serve --port 8765
+    python -m ecowatt ingest --segment homes usage.csv sites.csv -o features.csv
+    python -m ecowatt bench -o bench.json
+    python -m ecowatt portfolio --segment shops sites.csv --by City
+    python -m ecowatt train --segment shops EcoWatt_Shops_Realistic_v2.xlsx --report train.json
+    python -m ecowatt loadtest --users 1 4 16 --duration 20 -o load.json
+    python -m ecowatt compact --segment homes --tolerance 0.02 -o compact.json
+    python -m ecowatt history --segment shops --leaderboard city --days 30
+    python -m ecowatt annual --segment shops sites.csv --multiplier Summer=1.3 -o annual.csv
+    python -m ecowatt optimize --segment homes homes.csv --top 3 --max-cut 0.3
+
+Only the scoring core is imported, never Streamlit or Plotly, so this starts
+fast enough for cron jobs and worker processes.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ecowatt", description="EcoWatt Suite headless scoring")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="Score a CSV/Parquet file of homes, shops or offices")
+    score.add_argument("input", help="CSV or Parquet file with the module's input columns (weekly values)")
+    score.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    score.add_argument("--output", "-o", default="-", help="Output CSV/Parquet file ('-' = stdout, the default)")
+    score.add_argument("--input-format", choices=["csv", "parquet"], help="Override input format detection")
+    score.add_argument("--output-format", choices=["csv", "parquet", "arrow"], help="Override output format detection")
+    score.add_argument("--chunksize", type=int, default=None, help="Rows scored per chunk")
+    score.add_argument("--no-recommendations", action="store_true", help="Skip the recommendation columns")
+    score.add_argument("--intervals", action="store_true", help="Add p10/p90 kWh and bill columns from the trees")
+    score.add_argument("--workers", "-j", type=int, default=1, help="Worker processes (0 = one per CPU, default 1)")
+    score.add_argument("--history", action="store_true",
+                       help="Also append the scored rows to the assessment history (ECOWATT_HISTORY_DB)")
+    score.set_defaults(handler=run_score)
+
+    serve = commands.add_parser("serve", help="Run the local HTTP/JSON scoring service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--max-batch-size", type=int, default=64, help="Flush a micro-batch at this many rows")
+    serve.add_argument("--max-wait-ms", type=float, default=5.0, help="Flush a micro-batch after this many ms")
+    serve.set_defaults(handler=run_serve)
+
+    compile_ = commands.add_parser(
+        "compile-artifacts",
+        aliases=["export-forest"],
+        help="Convert the pickles into memory-mapped Compiled_Models/ bundles",
+    )
+    compile_.add_argument("--segment", "-s", action="append", help="Segment to compile (default: all)")
+    compile_.add_argument("--float32", action="store_true",
+                          help="Store int32/float32 tree arrays (half the size, not bit-identical)")
+    compile_.set_defaults(handler=run_compile_artifacts)
+
+    check = commands.add_parser("check-encoder", help="Compare the fast encoder with the pickled preprocessors")
+    check.add_argument("--segment", "-s", action="append", help="Segment to check (default: all)")
+    check.set_defaults(handler=run_check_encoder)
+
+    ingest = commands.add_parser("ingest", help="Turn appliance-level usage logs into monthly feature rows")
+    ingest.add_argument("log", help="CSV/Parquet usage log: Site_ID, Timestamp, Appliance, Usage")
+    ingest.add_argument("sites", help="CSV/Parquet site table: Site_ID plus State, City, appliance types and counts")
+    ingest.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    ingest.add_argument("--output", "-o", default="-", help="Output CSV/Parquet file ('-' = stdout, the default)")
+    ingest.add_argument("--input-format", choices=["csv", "parquet"], help="Override usage log format detection")
+    ingest.add_argument("--output-format", choices=["csv", "parquet", "arrow"], help="Override output format detection")
+    ingest.add_argument("--chunksize", type=int, default=None, help="Log lines read per chunk")
+    ingest.add_argument("--ordered", action="store_true", help="Log is sorted by time: emit each month once complete")
+    ingest.add_argument("--ignore-unknown", action="store_true", help="Skip appliances the model has no column for")
+    ingest.add_argument("--score", action="store_true", help="Append Predicted_kWh, Estimated_Cost and Usage_Category")
+    ingest.set_defaults(handler=run_ingest)
+
+    bench = commands.add_parser("bench", help="Benchmark load time, stage latency and throughput to JSON")
+    bench.add_argument("--segment", "-s", action="append", help="Segment to benchmark (default: all)")
+    bench.add_argument("--output", "-o", default="-", help="JSON report file ('-' = stdout, the default)")
+    bench.add_argument("--sizes", type=int, nargs="+", help="Batch sizes (default: 1 100 10000 1000000)")
+    bench.add_argument("--repeat", type=int, default=None, help="Timed repetitions per single-row stage")
+    bench.add_argument("--seed", type=int, default=None, help="Seed of the synthetic profiles")
+    bench.add_argument("--no-isolate", action="store_true", help="Run every segment in this process")
+    bench.set_defaults(handler=run_bench)
+
+    portfolio = commands.add_parser("portfolio", help="Roll up a portfolio of shops or offices by group")
+    portfolio.add_argument("input", help="CSV or Parquet file with one row per site (optionally a Site_ID column)")
+    portfolio.add_argument("--segment", "-s", required=True, help="shops or offices")
+    portfolio.add_argument("--by", "-b", action="append",
+                           help="State, City, Shop_Type/Office_Type or Shop_Scale/Office_Scale (default: all)")
+    portfolio.add_argument("--input-format", choices=["csv", "parquet"], help="Override input format detection")
+    portfolio.set_defaults(handler=run_portfolio)
+
+    train = commands.add_parser("train", help="Retrain a segment model (grid search on every core)")
+    train.add_argument("data", help="Training table (.xlsx as in the notebooks, CSV or Parquet) with the target column")
+    train.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    train.add_argument("--estimator", default="random_forest", help="random_forest (default), decision_tree or linear")
+    train.add_argument("--grid", help="JSON parameter grid replacing the notebook's")
+    train.add_argument("--cv", type=int, default=None, help="Cross-validation folds (default 10)")
+    train.add_argument("--jobs", "-j", type=int, default=-1, help="Parallel search jobs (default -1 = every CPU)")
+    train.add_argument("--cache-dir", help="Cache of fitted preprocessing and CV folds (default .training_cache/)")
+    train.add_argument("--no-cache", action="store_true", help="Always refit the preprocessing")
+    train.add_argument("--warm-start", type=int, metavar="N",
+                       help="Grow the current forest by N trees on this data instead of searching")
+    train.add_argument("--output-dir", help="Base directory of Trained_Models/ (and of the installed pickles)")
+    train.add_argument("--install", action="store_true", help="Also replace the Models/ pickles the app loads")
+    train.add_argument("--report", "-o", default="-", help="JSON training report ('-' = stdout, the default)")
+    train.set_defaults(handler=run_train)
+
+    loadtest = commands.add_parser("loadtest", help="Concurrent-session load test of Analyze Usage to JSON")
+    loadtest.add_argument("--users", "-u", type=int, nargs="+", help="Concurrent sessions per level (default: 1 2 4 8)")
+    loadtest.add_argument("--segment", "-s", action="append", help="Segment the sessions use (default: all, round robin)")
+    loadtest.add_argument("--duration", "-d", type=float, default=None, help="Seconds per level (default 10)")
+    loadtest.add_argument("--think-ms", type=float, default=0.0, help="Pause of each session between analyses")
+    loadtest.add_argument("--driver", choices=["headless", "apptest"], default="headless",
+                          help="Score through the core (default) or run App.py with Streamlit's AppTest")
+    loadtest.add_argument("--interval", type=float, default=None, help="Timeline sample interval in seconds")
+    loadtest.add_argument("--seed", type=int, default=None, help="Seed of the synthetic profiles")
+    loadtest.add_argument("--cache", action="store_true",
+                          help="Headless: score through the shared prediction cache (default: every analysis scored)")
+    loadtest.add_argument("--output", "-o", default="-", help="JSON report file ('-' = stdout, the default)")
+    loadtest.set_defaults(handler=run_loadtest)
+
+    compact = commands.add_parser("compact", help="Smaller model variants within an accuracy tolerance")
+    compact.add_argument("--segment", "-s", action="append", help="Segment to compact (repeatable, default: all)")
+    compact.add_argument("--tolerance", "-t", type=float, default=None,
+                         help="Allowed held-out MAE increase, relative (default 0.02)")
+    compact.add_argument("--data", help="Labelled training table for the held-out split (default: synthetic profiles)")
+    compact.add_argument("--seed", type=int, default=None, help="Seed of the synthetic profiles")
+    compact.add_argument("--dry-run", action="store_true", help="Only report, write no pickles")
+    compact.add_argument("--output-dir", help="Base directory of Trained_Models/ (and of the installed pickles)")
+    compact.add_argument("--install", action="store_true", help="Also replace the Models/ pickles the app loads")
+    compact.add_argument("--output", "-o", default="-", help="JSON report file ('-' = stdout, the default)")
+    compact.set_defaults(handler=run_compact)
+
+    history = commands.add_parser("history", help="Trends and leaderboards from the assessment history (CSV)")
+    history.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    history.add_argument("--site", help="Every assessment of this Site ID")
+    history.add_argument("--leaderboard", choices=["site", "city", "state"], help="Top sites / cities / states by kWh")
+    history.add_argument("--lowest", action="store_true", help="Rank the leaderboard from the lowest kWh")
+    history.add_argument("--top", "-n", type=int, default=10, help="Leaderboard length (default 10)")
+    history.add_argument("--state", help="Area trend of one State")
+    history.add_argument("--city", help="Area trend of one City")
+    history.add_argument("--days", type=float, help="Only the last N days")
+    history.add_argument("--db", help="History database (default ECOWATT_HISTORY_DB or History/assessments.db)")
+    history.set_defaults(handler=run_history)
+
+    annual = commands.add_parser("annual", help="Twelve-month bill projection of every row (CSV)")
+    annual.add_argument("input", help="CSV or Parquet file with the module's input columns (weekly values)")
+    annual.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    annual.add_argument("--multiplier", "-m", action="append", default=[], metavar="SEASON=FACTOR",
+                        help="Scale every appliance usage input in that season (repeatable)")
+    annual.add_argument("--monthly", action="store_true", help="One row per site and month instead of per site")
+    annual.add_argument("--input-format", choices=["csv", "parquet"], help="Override input format detection")
+    annual.add_argument("--output", "-o", default="-", help="Output CSV file ('-' = stdout, the default)")
+    annual.set_defaults(handler=run_annual)
+
+    optimize = commands.add_parser("optimize", help="Top bill-cutting appliance changes of every row (CSV)")
+    optimize.add_argument("input", help="CSV or Parquet file with the module's input columns (weekly values)")
+    optimize.add_argument("--segment", "-s", required=True, help="homes, shops or offices")
+    optimize.add_argument("--top", "-k", type=int, default=None, help="Suggestions per row (default 5)")
+    optimize.add_argument("--max-cut", type=float, default=None, help="Largest usage cut as a fraction (default 0.3)")
+    optimize.add_argument("--limit", action="append", default=[], metavar="COLUMN=FRACTION",
+                          help="Largest cut of one usage column (0 = keep as is, repeatable)")
+    optimize.add_argument("--floor", action="append", default=[], metavar="COLUMN=VALUE",
+                          help="Lowest weekly value of one usage column (repeatable)")
+    optimize.add_argument("--no-switches", action="store_true", help="Only cut usage, never change appliance types")
+    optimize.add_argument("--input-format", choices=["csv", "parquet"], help="Override input format detection")
+    optimize.add_argument("--output", "-o", default="-", help="Output CSV file ('-' = stdout, the default)")
+    optimize.set_defaults(handler=run_optimize)
+
+    return parser
+
+
+def run_score(args):
+    from ecowatt.batch import DEFAULT_CHUNKSIZE, score_file
+
+    summary = score_file(
+        args.input,
+        args.segment,
+        output=args.output,
+        fmt=args.input_format,
+        output_fmt=args.output_format,
+        chunksize=args.chunksize or DEFAULT_CHUNKSIZE,
+        recommendations=not args.no_recommendations,
+        workers=args.workers or None,
+        intervals=args.intervals,
+        history=history_store() if args.history else None,
+    )
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+def history_store(path=None):
+    from ecowatt.history import HistoryStore, history
+
+    return HistoryStore(path) if path else history
+
+
+def run_history(args):
+    import time
+
+    store = history_store(args.db)
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.site:
+        table = store.site_trend(args.site, args.segment, since=since)
+    elif args.leaderboard:
+        table = store.leaderboard(args.segment, by=args.leaderboard, n=args.top, since=since, lowest=args.lowest)
+    else:
+        # Without --site or --leaderboard: assessments and average kWh / bill per day
+        table = store.area_trend(args.segment, state=args.state, city=args.city, since=since)
+    table.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def run_annual(args):
+    import pandas as pd
+
+    from ecowatt.annual import annual_summary, project_annual
+    from ecowatt.batch import read_chunks
+
+    multipliers = {}
+    for item in args.multiplier:
+        season, _, factor = item.partition("=")
+        if not factor:
+            raise ValueError(f"--multiplier takes SEASON=FACTOR, not {item!r}")
+        multipliers[season.strip().title()] = float(factor)
+
+    frame = pd.concat(list(read_chunks(args.input, fmt=args.input_format)), ignore_index=True)
+    monthly = project_annual(frame, args.segment, multipliers=multipliers)
+    table = monthly if args.monthly else annual_summary(monthly).reset_index()
+    if "Site_ID" in frame.columns:
+        # Profile is the row number; show the file's own IDs where it has them
+        table.insert(0, "Site_ID", frame["Site_ID"].to_numpy()[table["Profile"].to_numpy()])
+    table.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    return 0
+
+
+def _assignments(items, option):
+    values = {}
+    for item in items:
+        column, _, value = item.partition("=")
+        if not value:
+            raise ValueError(f"{option} takes COLUMN=VALUE, not {item!r}")
+        values[column.strip()] = float(value)
+    return values
+
+
+def run_optimize(args):
+    import pandas as pd
+
+    from ecowatt.batch import read_chunks
+    from ecowatt.optimizer import DEFAULT_MAX_REDUCTION, DEFAULT_TOP_K, optimize_savings
+
+    frame = pd.concat(list(read_chunks(args.input, fmt=args.input_format)), ignore_index=True)
+    limits, floors = _assignments(args.limit, "--limit"), _assignments(args.floor, "--floor")
+    rows, seconds = [], 0.0
+    for i, profile in enumerate(frame.to_dict("records")):
+        result = optimize_savings(profile, args.segment, k=args.top or DEFAULT_TOP_K,
+                                  max_reduction=args.max_cut or DEFAULT_MAX_REDUCTION, limits=limits,
+                                  floors=floors, switches=not args.no_switches)
+        seconds += result["seconds"]
+        for rank, suggestion in enumerate(result["suggestions"], 1):
+            rows.append({"Site_ID": profile.get("Site_ID", i), "Rank": rank, "Change": suggestion["description"],
+                         "Rupees_Saved": suggestion["rupees_saved"], "kWh_Saved": suggestion["kwh_saved"],
+                         "Estimated_Cost": suggestion["Estimated_Cost"], "Current_Cost": result["base_cost"]})
+    pd.DataFrame(rows).to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    print(json.dumps({"rows": len(frame), "suggestions": len(rows),
+                      "seconds_per_row": seconds / len(frame) if len(frame) else 0.0}), file=sys.stderr)
+    return 0
+
+
+def run_serve(args):
+    from ecowatt.service import serve
+
+    print(f"EcoWatt scoring service on http://{args.host}:{args.port}", file=sys.stderr)
+    serve(args.host, args.port, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    return 0
+
+
+def run_compile_artifacts(args):
+    from ecowatt.registry import registry
+
+    for path in registry.compile_artifacts(args.segment, float32=args.float32):
+        print(path, file=sys.stderr)
+    return 0
+
+
+def run_check_encoder(args):
+    from ecowatt.encoder import check_encoder
+    from ecowatt.registry import SEGMENT_ARTIFACTS
+
+    for segment in args.segment or SEGMENT_ARTIFACTS:
+        print(json.dumps(check_encoder(segment), ensure_ascii=False))
+    return 0
+
+
+def run_ingest(args):
+    import time
+
+    from ecowatt.batch import DEFAULT_CHUNKSIZE, _ResultWriter
+    from ecowatt.ingest import ingest, score_monthly
+
+    started = time.perf_counter()
+    rows = 0
+    writer = _ResultWriter(args.output, args.output_format)
+    try:
+        for frame in ingest(args.log, args.sites, args.segment, fmt=args.input_format,
+                            chunksize=args.chunksize or DEFAULT_CHUNKSIZE, ordered=args.ordered,
+                            ignore_unknown=args.ignore_unknown):
+            if args.score:
+                frame = score_monthly(frame, args.segment)
+            writer.write(frame)
+            rows += len(frame)
+    finally:
+        writer.close()
+
+    print(json.dumps({"segment": args.segment, "site_months": rows,
+                      "seconds": time.perf_counter() - started, "output": args.output}), file=sys.stderr)
+    return 0
+
+
+def run_bench(args):
+    from ecowatt.bench import DEFAULT_REPEAT, DEFAULT_SEED, DEFAULT_SIZES, run_benchmarks, write_report
+
+    report = run_benchmarks(
+        args.segment,
+        sizes=args.sizes or DEFAULT_SIZES,
+        repeat=args.repeat or DEFAULT_REPEAT,
+        seed=DEFAULT_SEED if args.seed is None else args.seed,
+        isolate=not args.no_isolate,
+    )
+    write_report(report, args.output)
+    return 0
+
+
+def run_portfolio(args):
+    from ecowatt.portfolio import Portfolio
+
+    portfolio = Portfolio.from_file(args.input, args.segment, fmt=args.input_format)
+    for column in args.by or portfolio.group_columns:
+        print(f"# {column}")
+        portfolio.rollup(column).to_csv(sys.stdout)
+    print(json.dumps({"segment": portfolio.segment, "sites": len(portfolio), **portfolio.total()}), file=sys.stderr)
+    return 0
+
+
+def run_train(args):
+    from ecowatt.bench import write_report
+    from ecowatt.training import CACHE_DIR, DEFAULT_CV, train, warm_start
+
+    if args.warm_start:
+        report = warm_start(args.segment, args.data, args.warm_start, base_dir=args.output_dir, install=args.install)
+    else:
+        report = train(
+            args.segment,
+            args.data,
+            estimator=args.estimator,
+            param_grid=json.loads(args.grid) if args.grid else None,
+            cv=args.cv or DEFAULT_CV,
+            n_jobs=args.jobs,
+            cache_dir=None if args.no_cache else (args.cache_dir or CACHE_DIR),
+            base_dir=args.output_dir,
+            install=args.install,
+        )
+    write_report(report, args.report)
+    return 0
+
+
+def run_loadtest(args):
+    from ecowatt.bench import DEFAULT_SEED, write_report
+    from ecowatt.loadtest import DEFAULT_DURATION, DEFAULT_SAMPLE_INTERVAL, DEFAULT_USERS, run_load_test
+
+    report = run_load_test(
+        users=args.users or DEFAULT_USERS,
+        segments=args.segment,
+        duration=args.duration or DEFAULT_DURATION,
+        driver=args.driver,
+        think_time=args.think_ms / 1000,
+        sample_interval=args.interval or DEFAULT_SAMPLE_INTERVAL,
+        seed=DEFAULT_SEED if args.seed is None else args.seed,
+        cache=args.cache,
+    )
+    for level in report["levels"]:
+        hit_rate = level["prediction_cache"]["hit_rate"]
+        print(f"users={level['users']:<4} rps={level['throughput_rps']:<9.1f} p50={level['p50_ms'] or 0:.2f}ms "
+              f"p99={level['p99_ms'] or 0:.2f}ms cpu={level['cpu_percent']:.0f}% rss={level['rss_mb_max']:.0f}MB "
+              f"cache_hits={'off' if hit_rate is None else f'{hit_rate:.0%}'} errors={level['errors']}",
+              file=sys.stderr)
+    write_report(report, args.output)
+    return 0
+
+
+def run_compact(args):
+    from ecowatt.bench import DEFAULT_SEED, write_report
+    from ecowatt.compaction import DEFAULT_TOLERANCE, run_compaction
+
+    report = run_compaction(
+        segments=args.segment,
+        tolerance=DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance,
+        data=args.data,
+        seed=DEFAULT_SEED if args.seed is None else args.seed,
+        write=not args.dry_run,
+        base_dir=args.output_dir,
+        install=args.install,
+    )
+    for segment, result in report["segments"].items():
+        chosen = result["chosen"]
+        if chosen is None:
+            print(f"{segment}: no variant within MAE {result['mae_limit']:.2f}", file=sys.stderr)
+            continue
+        print(f"{segment}: {chosen['kind']}={chosen['setting']} size x{chosen['size_ratio']:.2f} "
+              f"10k-row latency x{chosen['latency_ratio_10k']:.2f} MAE {chosen['mae']:.2f} "
+              f"(limit {result['mae_limit']:.2f}) float32 {'ok' if result['float32_ok'] else 'rejected'}",
+              file=sys.stderr)
+    write_report(report, args.output)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (ValueError, FileNotFoundError) as exc:
+        print(f"ecowatt: error: {exc}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # stdout was piped into head & co. and closed early
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
@@ -0,0 +1,288 @@
+"""
+Columnar (Arrow) results for batch scoring.
+
+score_record_batch() scores a chunk like score_frame() but builds a
+pyarrow.RecordBatch straight from the NumPy arrays instead of a copy of the
+DataFrame. Columns:
+- the input columns as given;
+- `monthly.<column>` for every numeric model feature after weekly -> monthly
+  aggregation;
+- Predicted_kWh, Estimated_Cost (and the interval columns);
+- Usage_Category and Usage_Recommendation;
+- Recommendation_Bits, plus Recommendation_IDs as text (e.g. "H-AC,H-TV").
+
+Every batch of one file has the same schema, built once by result_schema()
+from the segment's feature spec and the first chunk's extra columns: numeric
+inputs are float64 (a blank cell in an int column is null, not a new type),
+text is dictionary<int32, string> (int8 for the fixed usage labels). The
+schema metadata records the segment, model version and rule IDs in bit
+order. score_record_batches() scores a stream of chunks against one schema;
+ArrowResultWriter casts anything else it is handed to the first schema.
+
+ArrowResultWriter streams the batches to a Parquet file (zstd, one row group
+per chunk) or to an Arrow IPC stream (.arrow), so a multi-million-row file is
+written chunk by chunk and never held in memory. read_results() memory-maps
+them back. to_pandas() hands a batch or table to pandas: numeric columns are
+views of the Arrow buffers, dictionaries become Categoricals, and
+arrow_dtypes=True keeps every column in Arrow memory (pd.ArrowDtype). Other
+Arrow consumers (Polars, DuckDB ...) take the batches as they are.
+
+Needs pyarrow (installed with Streamlit).
+"""
+
+import json
+
+import numpy as np
+
+from ecowatt.core import classify_usage_batch, estimate_cost_batch, monthly_features
+from ecowatt.recommendations import RECOMMENDATION_RULES, USAGE_MESSAGES, rule_bits, rule_ids
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+USAGE_LABELS = list(USAGE_MESSAGES)
+
+MONTHLY_PREFIX = "monthly."
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def _dictionary(codes, categories, index_type=np.int32):
+    """DictionaryArray of pandas-style codes (-1 = null) and their categories."""
+    import pyarrow as pa
+
+    codes = np.asarray(codes)
+    mask = codes < 0
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes.astype(index_type, copy=False), mask=mask if mask.any() else None),
+        pa.array(list(categories), type=pa.string()),
+    )
+
+
+def _text_column(values):
+    """Dictionary array of a text column; blanks are null."""
+    import pandas as pd
+
+    categorical = pd.Categorical(values.astype(str).where(values.notna()))
+    return _dictionary(categorical.codes, categorical.categories)
+
+
+def _numeric_column(values):
+    """float64 array of a numeric column (NaN is null); float64 columns are not copied."""
+    import pandas as pd
+    import pyarrow as pa
+
+    return pa.array(pd.to_numeric(values).to_numpy(dtype=np.float64), from_pandas=True)
+
+
+def _is_text(values):
+    import pandas as pd
+
+    return isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object
+
+
+def result_schema(frame, segment, registry=None, recommendations=True, intervals=False):
+    """
+    Output schema of score_record_batch() for chunks shaped like `frame`.
+
+    Model inputs take their type from the feature spec (SELECT_OPTIONS
+    columns are text, the rest float64); other columns (Site_ID ...) are text
+    unless numeric in `frame`.
+    """
+    import pyarrow as pa
+
+    from ecowatt.options import SELECT_OPTIONS
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    text = pa.dictionary(pa.int32(), pa.string())
+    label = pa.dictionary(pa.int8(), pa.string())
+
+    fields = []
+    for name in frame.columns:
+        if name in pipeline.feature_names:
+            is_text = name in SELECT_OPTIONS[segment]
+        else:
+            is_text = _is_text(frame[name])
+        fields.append(pa.field(name, text if is_text else pa.float64()))
+    # The aggregators keep the feature dtypes, so the numeric features are the numeric inputs
+    fields += [pa.field(MONTHLY_PREFIX + name, pa.float64())
+               for name in pipeline.feature_names if name not in SELECT_OPTIONS[segment]]
+    fields += [pa.field("Predicted_kWh", pa.float64()), pa.field("Estimated_Cost", pa.float64()),
+               pa.field("Usage_Category", label)]
+    if intervals:
+        fields += [pa.field(name, pa.float64()) for name in
+                   ("Predicted_kWh_Low", "Predicted_kWh_High", "Estimated_Cost_Low", "Estimated_Cost_High")]
+    if recommendations:
+        fields += [pa.field("Usage_Recommendation", label), pa.field("Recommendation_Bits", pa.uint16()),
+                   pa.field("Recommendation_IDs", text)]
+
+    metadata = {
+        "ecowatt.segment": segment,
+        "ecowatt.model_version": pipeline.version,
+        "ecowatt.rule_ids": json.dumps([rule[0] for rule in RECOMMENDATION_RULES[segment]]),
+    }
+    return pa.schema(fields, metadata=metadata)
+
+
+def score_record_batch(frame, segment, registry=None, recommendations=True, intervals=False, schema=None):
+    """
+    Score every row of a DataFrame of weekly inputs into one pyarrow.RecordBatch
+    with `schema` (result_schema() of this chunk by default).
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    if schema is None:
+        schema = result_schema(frame, segment, registry=registry, recommendations=recommendations,
+                               intervals=intervals)
+
+    # Step 1: Aggregate Weekly -> Monthly
+    monthly_data = monthly_features(frame, segment, pipeline)
+
+    # Step 2: Predict kWh for the whole chunk at once
+    if intervals:
+        kwh_pred, kwh_low, kwh_high = pipeline.predict_interval(monthly_data)
+    else:
+        kwh_pred = pipeline.predict(monthly_data)
+
+    # Step 3: Cost Calculation
+    states = frame["State"].to_numpy()
+    costs = estimate_cost_batch(kwh_pred, states, segment)
+
+    # Step 4: Classification (Usage Type), as codes into USAGE_LABELS
+    usage_codes = pd.Categorical(classify_usage_batch(kwh_pred, segment), categories=USAGE_LABELS).codes
+
+    columns = {}
+    for field in schema:
+        if field.name in frame.columns:
+            values = frame[field.name]
+            columns[field.name] = (_numeric_column(values) if pa.types.is_floating(field.type)
+                                   else _text_column(values))
+        elif field.name.startswith(MONTHLY_PREFIX):
+            columns[field.name] = _numeric_column(monthly_data[field.name[len(MONTHLY_PREFIX):]])
+    columns["Predicted_kWh"] = pa.array(np.asarray(kwh_pred, dtype=np.float64))
+    columns["Estimated_Cost"] = pa.array(np.asarray(costs, dtype=np.float64))
+    columns["Usage_Category"] = _dictionary(usage_codes, USAGE_LABELS, np.int8)
+
+    if intervals:
+        columns["Predicted_kWh_Low"] = pa.array(np.asarray(kwh_low, dtype=np.float64))
+        columns["Predicted_kWh_High"] = pa.array(np.asarray(kwh_high, dtype=np.float64))
+        columns["Estimated_Cost_Low"] = pa.array(np.asarray(estimate_cost_batch(kwh_low, states, segment),
+                                                            dtype=np.float64))
+        columns["Estimated_Cost_High"] = pa.array(np.asarray(estimate_cost_batch(kwh_high, states, segment),
+                                                             dtype=np.float64))
+
+    # Step 5: Recommendations, as rule IDs; each distinct bitset is spelled out once
+    if recommendations:
+        bits = rule_bits(frame, segment)
+        unique_bits, codes = np.unique(bits, return_inverse=True)
+        columns["Usage_Recommendation"] = _dictionary(usage_codes, [USAGE_MESSAGES[label] for label in USAGE_LABELS],
+                                                      np.int8)
+        columns["Recommendation_Bits"] = pa.array(bits)
+        columns["Recommendation_IDs"] = _dictionary(codes.reshape(-1),
+                                                    [",".join(rule_ids(b, segment)) for b in unique_bits])
+
+    return pa.RecordBatch.from_arrays([columns[field.name] for field in schema], schema=schema)
+
+
+def score_record_batches(chunks, segment, registry=None, recommendations=True, intervals=False):
+    """Yield one RecordBatch per DataFrame chunk, all with the first chunk's result_schema()."""
+    schema = None
+    for chunk in chunks:
+        if schema is None:
+            schema = result_schema(chunk, segment, registry=registry, recommendations=recommendations,
+                                   intervals=intervals)
+        yield score_record_batch(chunk, segment, registry=registry, recommendations=recommendations,
+                                 intervals=intervals, schema=schema)
+
+
+def record_batches(source, segment, fmt=None, chunksize=None, registry=None, recommendations=True,
+                   intervals=False):
+    """Yield one scored RecordBatch per chunk of a CSV/Parquet file."""
+    from ecowatt.batch import DEFAULT_CHUNKSIZE, read_chunks
+
+    yield from score_record_batches(read_chunks(source, fmt=fmt, chunksize=chunksize or DEFAULT_CHUNKSIZE),
+                                    segment, registry=registry, recommendations=recommendations,
+                                    intervals=intervals)
+
+
+class ArrowResultWriter:
+    """Streams RecordBatches (or DataFrames) to a Parquet file or an Arrow IPC stream."""
+
+    def __init__(self, path, fmt="parquet", compression=PARQUET_COMPRESSION):
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.rows = 0
+        self.schema = None
+        self._writer = None
+
+    def write(self, batch):
+        import pyarrow as pa
+
+        if not isinstance(batch, (pa.RecordBatch, pa.Table)):
+            batch = pa.Table.from_pandas(batch, preserve_index=False)
+        if self._writer is None:
+            self.schema = batch.schema
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+            else:
+                # Stream format: each batch may carry its own dictionaries
+                self._writer = pa.ipc.new_stream(self.path, self.schema)
+        elif not batch.schema.equals(self.schema, check_metadata=True):
+            # e.g. an int column that has a blank cell in this chunk only
+            if isinstance(batch, pa.RecordBatch):
+                batch = pa.Table.from_batches([batch])
+            batch = batch.cast(self.schema)
+        if isinstance(batch, pa.Table):
+            self._writer.write_table(batch)
+        else:
+            self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def scored_frame(batch):
+    """
+    DataFrame of a result batch with the columns score_frame() gives (no
+    monthly.* features or Recommendation_IDs), e.g. for HistoryStore.record_frame().
+    """
+    names = [name for name in batch.schema.names
+             if not name.startswith(MONTHLY_PREFIX) and name != "Recommendation_IDs"]
+    return to_pandas(batch.select(names))
+
+
+def read_results(path, fmt=None):
+    """Memory-mapped pyarrow.Table of a Parquet or Arrow IPC stream result file."""
+    import pyarrow as pa
+
+    from ecowatt.batch import _file_format
+
+    if _file_format(path, fmt) == "arrow":
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_stream(source).read_all()
+
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, memory_map=True)
+
+
+def to_pandas(data, arrow_dtypes=False):
+    """
+    DataFrame over a RecordBatch or Table without copying the numeric buffers
+    (split_blocks keeps pandas from consolidating them); arrow_dtypes=True
+    keeps every column, text included, in Arrow memory.
+    """
+    if arrow_dtypes:
+        import pandas as pd
+
+        return data.to_pandas(types_mapper=pd.ArrowDtype)
+    return data.to_pandas(split_blocks=True)
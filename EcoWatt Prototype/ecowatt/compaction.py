@@ -0,0 +1,257 @@
+"""
+Smaller variants of the segment forests, accepted only under an accuracy gate.
+
+    python -m ecowatt compact --segment homes --tolerance 0.02 -o compact.json
+    python -m ecowatt compact --segment shops --data EcoWatt_Shops_Realistic_v2.xlsx --install
+
+Variants tried for each segment:
+- trees: the k best trees, picked greedily by how much each one brings the
+  subset's mean closer to the full forest on a calibration set;
+- depth: every tree cut at depth d (nodes at depth d become leaves with the
+  mean they already store);
+- distilled: one DecisionTreeRegressor of depth d fitted to the forest's
+  predictions on calibration rows (no per-tree interval any more);
+- float32: the packed arrays narrowed (PackedForest.compact), which is a
+  compile-artifacts --float32 option rather than a new pickle.
+
+The gate is the held-out MAE. With a labelled table (--data, as for `train`)
+rows are split like the notebook; a variant passes if its MAE against the
+labels is at most (1 + tolerance) x the original's. Without labels the
+held-out rows are synthetic profiles and a variant passes if its MAE against
+the original predictions is at most tolerance x their mean. Of the variants
+that pass, the one with the fewest packed bytes is chosen and written like a
+retrained model (Trained_Models/..., --install to put it live). The report
+lists size, node count, single-row and 10k-row latency of every variant.
+"""
+
+import copy
+import pickle
+import time
+
+import numpy as np
+
+from ecowatt.bench import DEFAULT_SEED, _timed, synthetic_profiles
+from ecowatt.forest import compile_model
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+DEFAULT_TOLERANCE = 0.02
+
+CALIBRATION_ROWS = 20_000
+HOLDOUT_ROWS = 10_000
+DISTILL_DEPTHS = (4, 6, 8, 10, 12)
+
+COMPACTION_FORMAT_VERSION = 1
+
+
+def _leaf(nodes, i):
+    nodes["left_child"][i] = nodes["right_child"][i] = -1
+    nodes["feature"][i] = -2
+    nodes["threshold"][i] = -2.0
+
+
+def prune_tree(estimator, max_depth):
+    """Copy of a fitted regression tree cut at max_depth, unreachable nodes dropped."""
+    state = estimator.tree_.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+
+    # Depth-first preorder like sklearn's builder: old node ids and their depths
+    old_ids, depths, stack = [], [], [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        old_ids.append(node)
+        depths.append(depth)
+        if nodes["left_child"][node] != -1 and depth < max_depth:
+            stack.append((nodes["right_child"][node], depth + 1))
+            stack.append((nodes["left_child"][node], depth + 1))
+
+    new_id = {old: new for new, old in enumerate(old_ids)}
+    pruned = nodes[old_ids].copy()
+    for i, (old, depth) in enumerate(zip(old_ids, depths)):
+        if nodes["left_child"][old] == -1 or depth >= max_depth:
+            _leaf(pruned, i)
+        else:
+            pruned["left_child"][i] = new_id[nodes["left_child"][old]]
+            pruned["right_child"][i] = new_id[nodes["right_child"][old]]
+
+    estimator = copy.deepcopy(estimator)
+    estimator.tree_.__setstate__({
+        "max_depth": min(state["max_depth"], max_depth),
+        "node_count": len(old_ids),
+        "nodes": pruned,
+        "values": values[old_ids].copy(),
+    })
+    estimator.max_depth = max_depth
+    return estimator
+
+
+def prune_forest(model, max_depth):
+    model = copy.deepcopy(model)
+    model.estimators_ = [prune_tree(estimator, max_depth) for estimator in model.estimators_]
+    model.max_depth = max_depth
+    return model
+
+
+def tree_order(forest, X, target):
+    """Tree indices in greedy order: each step adds the tree that lowers the subset-mean MAE most."""
+    per_tree = forest.tree_predictions(X)
+    n_trees = per_tree.shape[1]
+    order, total = [], np.zeros(len(X))
+    remaining = list(range(n_trees))
+    while remaining:
+        k = len(order) + 1
+        errors = [np.abs((total + per_tree[:, t]) / k - target).mean() for t in remaining]
+        best = remaining.pop(int(np.argmin(errors)))
+        order.append(best)
+        total += per_tree[:, best]
+    return order
+
+
+def subset_forest(model, trees):
+    model = copy.deepcopy(model)
+    model.estimators_ = [model.estimators_[t] for t in trees]
+    model.n_estimators = len(trees)
+    return model
+
+
+def distill(X, target, max_depth, seed=DEFAULT_SEED):
+    from sklearn.tree import DecisionTreeRegressor
+
+    return DecisionTreeRegressor(max_depth=max_depth, random_state=seed).fit(X, target)
+
+
+def _holdout(segment, pipeline, data, seed):
+    """(X_calibration, y_calibration, X_holdout, y_holdout or None)."""
+    from ecowatt.core import monthly_features
+
+    if data is None:
+        rows = synthetic_profiles(segment, CALIBRATION_ROWS + HOLDOUT_ROWS, seed)
+        X = pipeline.transform(monthly_features(rows, segment, pipeline))
+        return X[:CALIBRATION_ROWS], None, X[CALIBRATION_ROWS:], None
+
+    from sklearn.model_selection import train_test_split
+
+    from ecowatt.training import TRAINING_SPECS, clean, read_training_data
+
+    spec = TRAINING_SPECS[segment]
+    frame = clean(read_training_data(data), segment)
+    X_train, X_test, y_train, y_test = train_test_split(
+        frame[pipeline.feature_names], frame[spec["target"]], **spec["split"]
+    )
+    return (pipeline.transform(X_train), y_train.to_numpy(dtype=np.float64),
+            pipeline.transform(X_test), y_test.to_numpy(dtype=np.float64))
+
+
+def measure(forest, X, truth, repeat=100, pickled=None):
+    """Size, accuracy and latency of one (packed) variant."""
+    pred = forest.predict(X)
+    batch = X[:HOLDOUT_ROWS]
+    return {
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "max_depth": forest.max_depth,
+        "packed_bytes": forest.nbytes,
+        "pickle_bytes": pickled,
+        "mae": float(np.abs(pred - truth).mean()),
+        "predict_1row": _timed(lambda: forest.predict(X[:1]), repeat),
+        "predict_10k_ms": _timed(lambda: forest.predict(batch), 5)["median_ms"] * HOLDOUT_ROWS / len(batch),
+    }
+
+
+def compact_segment(segment, tolerance=DEFAULT_TOLERANCE, data=None, seed=DEFAULT_SEED, registry=None,
+                    repeat=100):
+    """Try every variant of one segment's model; returns (report, chosen model or None)."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    model = pipeline.model
+    forest = compile_model(model)
+    if forest is None or not hasattr(model, "estimators_"):
+        raise ValueError(f"{segment}: only forest models can be compacted, not {type(model).__name__}")
+
+    X_cal, y_cal, X_eval, y_eval = _holdout(segment, pipeline, data, seed)
+    reference_cal = forest.predict(X_cal)
+    reference = forest.predict(X_eval)
+    labelled = y_eval is not None
+    truth = y_eval if labelled else reference
+
+    original = measure(forest, X_eval, truth, repeat, len(pickle.dumps(model)))
+    limit = (original["mae"] * (1 + tolerance) if labelled
+             else tolerance * float(np.abs(reference).mean()))
+
+    candidates = []
+    order = tree_order(forest, X_cal, reference_cal)
+    for k in range(1, forest.n_trees):
+        candidates.append(("trees", k, subset_forest(model, order[:k])))
+    for depth in range(1, forest.max_depth):
+        candidates.append(("depth", depth, prune_forest(model, depth)))
+    for depth in DISTILL_DEPTHS:
+        candidates.append(("distilled", depth, distill(X_cal, reference_cal, depth, seed)))
+
+    variants, chosen = [], None
+    for kind, setting, variant in candidates:
+        result = {"kind": kind, "setting": setting,
+                  **measure(compile_model(variant), X_eval, truth, repeat, len(pickle.dumps(variant)))}
+        result["accepted"] = result["mae"] <= limit
+        variants.append(result)
+        if result["accepted"] and (chosen is None or result["packed_bytes"] < chosen[0]["packed_bytes"]):
+            chosen = (result, variant)
+
+    narrow = {"kind": "float32", "setting": None, **measure(forest.compact(), X_eval, truth, repeat)}
+    narrow["accepted"] = narrow["mae"] <= limit
+    variants.append(narrow)
+
+    report = {
+        "segment": segment,
+        "model_version": pipeline.version,
+        "holdout": "labelled" if labelled else "synthetic (original predictions as truth)",
+        "holdout_rows": int(len(X_eval)),
+        "tolerance": tolerance,
+        "mae_limit": limit,
+        "original": original,
+        "variants": variants,
+        "chosen": None,
+        "float32_ok": narrow["accepted"],
+    }
+    if chosen is None:
+        return report, None
+
+    result = chosen[0]
+    report["chosen"] = {
+        **result,
+        "size_ratio": result["packed_bytes"] / original["packed_bytes"],
+        "latency_ratio_1row": result["predict_1row"]["median_ms"] / original["predict_1row"]["median_ms"],
+        "latency_ratio_10k": result["predict_10k_ms"] / original["predict_10k_ms"],
+    }
+    return report, chosen[1]
+
+
+def run_compaction(segments=None, tolerance=DEFAULT_TOLERANCE, data=None, seed=DEFAULT_SEED, write=True,
+                   base_dir=None, install=False, registry=None):
+    """Compact each segment, write the chosen variants; returns the JSON-ready report."""
+    import sklearn
+
+    from ecowatt.registry import SEGMENT_ARTIFACTS
+    from ecowatt.training import write_artifacts
+
+    registry = registry or default_registry
+    results = {}
+    for segment in segments or SEGMENT_ARTIFACTS:
+        segment = normalize_segment(segment)
+        report, model = compact_segment(segment, tolerance=tolerance, data=data, seed=seed, registry=registry)
+        if model is not None and write:
+            pipeline = registry.get(segment)
+            summary = {key: report[key] for key in ("segment", "model_version", "tolerance", "mae_limit", "chosen")}
+            summary.update({"format_version": COMPACTION_FORMAT_VERSION, "mode": "compaction",
+                            "sklearn_version": sklearn.__version__})
+            report["directory"] = str(write_artifacts(segment, model, pipeline.preprocessor, summary,
+                                                      base_dir=base_dir, install=install))
+            report["version"] = summary["version"]
+        results[segment] = report
+
+    return {
+        "format_version": COMPACTION_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {"tolerance": tolerance, "data": None if data is None else str(data), "seed": seed,
+                     "installed": bool(install and write)},
+        "segments": results,
+    }
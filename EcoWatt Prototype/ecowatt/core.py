@@ -0,0 +1,275 @@
+"""
+Scoring logic shared by the Streamlit modules, the batch scorer and the CLI.
+
+Everything here works on plain values or DataFrames and never touches
+Streamlit, so it can run for one hand-typed row or for a whole portfolio.
+pandas and the pickled models are only imported once something is scored.
+"""
+
+import numpy as np
+
+from ecowatt.recommendations import (
+    EFFICIENT_MESSAGE,
+    RECOMMENDATION_FIELDS,
+    USAGE_MESSAGES,
+    expand,
+    rule_bits_one,
+)
+from ecowatt.registry import normalize_segment, registry as default_registry
+from ecowatt.tariffs import bill, bill_one
+
+
+WEEKS_PER_MONTH = 4.3
+
+MODULE_LABELS = {
+    "Homes": "🏠 EcoWatt Homes",
+    "Shops": "🏬 EcoWatt Shops",
+    "Offices": "🏢 EcoWatt Offices",
+}
+MODULE_SEGMENTS = {label: segment for segment, label in MODULE_LABELS.items()}
+
+# kWh limits for Low / Medium usage, anything above is High
+USAGE_THRESHOLDS = {
+    "Homes": (180, 300),
+    "Shops": (350, 600),
+    "Offices": (800, 1600),
+}
+
+# Usage columns the app asks for per week; only these are scaled to a month
+MONTHLY_SCALED_COLUMNS = {
+    "Homes": [
+        "Monthly_AC_Usage_Hours",
+        "Monthly_Fan_Usage_Hours",
+        "Refrigerator_Usage_Hrs_Monthly",
+        "Monthly_TV_Usage_Hours",
+        "Monthly_Geyser_Usage_Minutes",
+        "Monthly_Washing_Machine_Usage_Cycles",
+    ],
+    "Shops": [
+        "Avg_Working_Hours_Monthly",
+        "Monthly_AC_Usage_Hours",
+        "Monthly_Fan_Usage_Hours",
+        "Monthly_Refrigerator_Usage_Hours_Type_1",
+        "Monthly_Refrigerator_Usage_Hours_Type_2",
+        "Monthly_Lights_Usage_Hours",
+        "Monthly_PC_Usage_Hours",
+    ],
+    "Offices": [
+        "Avg_Working_Hours_Monthly",
+        "Monthly_AC_Usage_Hours",
+        "Monthly_Fan_Usage_Hours",
+        "Monthly_Lights_Usage_Hours",
+        "Monthly_PC_Usage_Hours",
+        "Monthly_Refrigerator_Usage_Hours",
+        "Monthly_Printer_Usage_Minutes",
+        "Monthly_Projector_Usage_Hours",
+    ],
+}
+
+
+def get_appliance_recommendations(module, user_inputs):
+    """Generate appliance-specific recommendations based on usage patterns."""
+    segment = MODULE_SEGMENTS.get(module)
+    if segment is None:
+        return [EFFICIENT_MESSAGE]
+    return expand(rule_bits_one(user_inputs, segment), segment)
+
+
+def aggregate_weekly_to_monthly_Homes(df):
+    """
+    Convert weekly data to monthly data by multiplying selected columns by 4.3
+    This avoids affecting non-relevant numeric columns.
+    """
+    df_monthly = df.copy()
+
+    cols_to_multiply = MONTHLY_SCALED_COLUMNS["Homes"]
+
+    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * WEEKS_PER_MONTH
+
+    return df_monthly
+
+
+def aggregate_weekly_to_monthly_Shops(df):
+    """
+    Convert weekly data to monthly data by multiplying selected columns by 4.3
+    This avoids affecting non-relevant numeric columns.
+    """
+    df_monthly = df.copy()
+
+    cols_to_multiply = MONTHLY_SCALED_COLUMNS["Shops"]
+
+    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * WEEKS_PER_MONTH
+
+    return df_monthly
+
+
+def aggregate_weekly_to_monthly_Offices(df):
+    """
+    Convert weekly data to monthly data by multiplying selected columns by 4.3
+    This avoids affecting non-relevant numeric columns.
+    """
+    df_monthly = df.copy()
+
+    cols_to_multiply = MONTHLY_SCALED_COLUMNS["Offices"]
+
+    df_monthly[cols_to_multiply] = df_monthly[cols_to_multiply] * WEEKS_PER_MONTH
+
+    return df_monthly
+
+
+AGGREGATORS = {
+    "Homes": aggregate_weekly_to_monthly_Homes,
+    "Shops": aggregate_weekly_to_monthly_Shops,
+    "Offices": aggregate_weekly_to_monthly_Offices,
+}
+
+
+def aggregate_weekly_to_monthly_row(row, segment):
+    """aggregate_weekly_to_monthly_* for a single row given as a dict."""
+    scaled = MONTHLY_SCALED_COLUMNS[segment]
+    return {column: value * WEEKS_PER_MONTH if column in scaled else value for column, value in row.items()}
+
+
+def rule_based_cost_calculator(kwh, State, telescopic=False):
+    """Monthly bill (₹) on the domestic LT-1 tariff of the given state."""
+    return bill_one(kwh, State, "LT-1", telescopic=telescopic)
+
+
+def rule_based_cost_calculator_LT_2(kwh, State, telescopic=False):
+    """Monthly bill (₹) on the commercial LT-2 tariff of the given state."""
+    return bill_one(kwh, State, "LT-2", telescopic=telescopic)
+
+
+# Homes are billed on LT-1, shops and offices on LT-2 (commercial)
+SEGMENT_TARIFFS = {
+    "Homes": "LT-1",
+    "Shops": "LT-2",
+    "Offices": "LT-2",
+}
+
+
+def estimate_cost(kwh, State, segment, telescopic=False):
+    """Monthly bill (₹) for one predicted kWh value of a segment."""
+    return bill_one(kwh, State, SEGMENT_TARIFFS[segment], telescopic=telescopic)
+
+
+def estimate_cost_batch(kwh, states, segment, telescopic=False):
+    """Vectorized estimate_cost(); `states` is one state or an array of them."""
+    return bill(kwh, states, SEGMENT_TARIFFS[segment], telescopic=telescopic)
+
+
+def classify_usage(kwh, segment):
+    """Low / Medium / High usage label for one predicted kWh value."""
+    low, medium = USAGE_THRESHOLDS[segment]
+    if kwh < low:
+        return "Low Usage"
+    elif kwh < medium:
+        return "Medium Usage"
+    else:
+        return "High Usage"
+
+
+def classify_usage_batch(kwh, segment):
+    """Vectorized classify_usage() for an array of kWh values."""
+    low, medium = USAGE_THRESHOLDS[segment]
+    kwh = np.asarray(kwh, dtype=float)
+    return np.select(
+        [kwh < low, kwh < medium],
+        ["Low Usage", "Medium Usage"],
+        default="High Usage",
+    ).astype(object)
+
+
+def show_recommendations(usage_type):
+    """Provide personalized recommendations."""
+    return USAGE_MESSAGES.get(usage_type, USAGE_MESSAGES["High Usage"])
+
+
+def to_frame(user_inputs):
+    """One site (dict), several sites (list of dicts) or a DataFrame -> DataFrame."""
+    import pandas as pd
+
+    if isinstance(user_inputs, pd.DataFrame):
+        return user_inputs
+    if isinstance(user_inputs, dict):
+        user_inputs = [user_inputs]
+    return pd.DataFrame.from_records(list(user_inputs))
+
+
+def monthly_features(frame, segment, pipeline):
+    """Weekly input rows -> the monthly feature frame the preprocessor expects."""
+    feature_names = pipeline.feature_names
+    missing = [name for name in feature_names if name not in frame.columns]
+    if missing:
+        raise ValueError(f"{segment} input is missing columns: {missing}")
+
+    return AGGREGATORS[segment](frame[feature_names])
+
+
+def predict_kwh(user_inputs, segment, registry=None):
+    """Predicted monthly kWh for weekly inputs (dict, list of dicts or DataFrame)."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    if isinstance(user_inputs, dict) and pipeline.encoder is not None:
+        # Single site: stay on plain dicts, no DataFrame round trip
+        missing = [name for name in pipeline.encoder.feature_names if name not in user_inputs]
+        if missing:
+            raise ValueError(f"{segment} input is missing columns: {missing}")
+        return pipeline.predict(aggregate_weekly_to_monthly_row(user_inputs, segment))
+
+    monthly_data = monthly_features(to_frame(user_inputs), segment, pipeline)
+    return pipeline.predict(monthly_data)
+
+
+def predict_kwh_interval(user_inputs, segment, registry=None):
+    """(kWh, low, high) arrays for weekly inputs, see SegmentPipeline.predict_interval()."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    if isinstance(user_inputs, dict) and pipeline.encoder is not None:
+        missing = [name for name in pipeline.encoder.feature_names if name not in user_inputs]
+        if missing:
+            raise ValueError(f"{segment} input is missing columns: {missing}")
+        return pipeline.predict_interval(aggregate_weekly_to_monthly_row(user_inputs, segment))
+
+    return pipeline.predict_interval(monthly_features(to_frame(user_inputs), segment, pipeline))
+
+
+def score_one(user_inputs, segment, registry=None, telescopic=False, interval=True):
+    """
+    Full assessment of one site, the headless version of "Analyze Usage".
+
+    `user_inputs` uses the same column names (and weekly values) as the
+    DataFrame the Streamlit modules build. With `interval` the result also
+    holds the 10th-90th percentile kWh range of the forest and its bill range.
+    """
+    segment = normalize_segment(segment)
+
+    if interval:
+        kwh_pred, kwh_low, kwh_high = (float(values[0]) for values in
+                                       predict_kwh_interval(user_inputs, segment, registry=registry))
+    else:
+        kwh_pred = float(predict_kwh(user_inputs, segment, registry=registry)[0])
+    cost_est = estimate_cost(kwh_pred, user_inputs["State"], segment, telescopic=telescopic)
+    usage_type = classify_usage(kwh_pred, segment)
+
+    rec_inputs = {key: user_inputs[column] for key, column in RECOMMENDATION_FIELDS[segment].items()}
+
+    result = {
+        "Segment": segment,
+        "Predicted_kWh": kwh_pred,
+        "Estimated_Cost": cost_est,
+        "Usage_Category": usage_type,
+        "Usage_Recommendation": show_recommendations(usage_type),
+        "Appliance_Recommendations": get_appliance_recommendations(MODULE_LABELS[segment], rec_inputs),
+    }
+    if interval:
+        # Slab tariffs only grow with kWh, so the bill range is the bill of each end
+        result.update({
+            "Predicted_kWh_Low": kwh_low,
+            "Predicted_kWh_High": kwh_high,
+            "Estimated_Cost_Low": estimate_cost(kwh_low, user_inputs["State"], segment, telescopic=telescopic),
+            "Estimated_Cost_High": estimate_cost(kwh_high, user_inputs["State"], segment, telescopic=telescopic),
+        })
+    return result
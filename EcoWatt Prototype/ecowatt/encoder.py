@@ -0,0 +1,333 @@
+"""
+Fast-path replacement for the pickled ColumnTransformer preprocessors.
+
+FastEncoder is compiled from a fitted Preprocessing_EcoWatt_*.pkl pipeline:
+one-hot / ordinal categories become plain {category: column} dicts and the
+scalers become (scale, offset) vectors, written straight into a preallocated
+float64 array. That skips the DataFrame validation and per-transformer joblib
+dispatch that dominate ColumnTransformer.transform on small inputs.
+
+The output is identical to preprocessor.transform(); unknown categories raise
+ValueError just like the fitted encoders (handle_unknown='error') do.
+check_encoder() compares both for every st.selectbox option of a segment;
+tests/test_encoder.py does the same under pytest, batch paths included.
+"""
+
+import numpy as np
+
+
+# Below this many rows plain dict lookups beat pandas.factorize
+SMALL_BATCH_ROWS = 64
+
+
+class UnsupportedPreprocessor(TypeError):
+    """The fitted pipeline uses a transformer the fast encoder cannot mirror."""
+
+
+def _column_transformer(preprocessor):
+    steps = getattr(preprocessor, "steps", None)
+    if steps is not None:
+        if len(steps) != 1:
+            raise UnsupportedPreprocessor("Only single-step preprocessing pipelines are supported")
+        preprocessor = steps[0][1]
+    if not hasattr(preprocessor, "transformers_"):
+        raise UnsupportedPreprocessor(f"{type(preprocessor).__name__} is not a ColumnTransformer")
+    return preprocessor
+
+
+class FastEncoder:
+    """
+    Encodes monthly feature rows (dicts, lists of dicts, record arrays or
+    DataFrames) exactly like the fitted ColumnTransformer.
+    """
+
+    def __init__(self, preprocessor):
+        ct = _column_transformer(preprocessor)
+        if ct.sparse_output_:
+            raise UnsupportedPreprocessor("Sparse ColumnTransformer output is not supported")
+
+        self.feature_names = list(ct.feature_names_in_)
+        self.n_features_out = sum(
+            s.stop - s.start for s in ct.output_indices_.values()
+        )
+
+        # (column, {category: output column or -1 if dropped})
+        self.onehot = []
+        # (column, {category: code}, output column)
+        self.ordinal = []
+        # numeric columns: output index, scale, offset -> out = x * scale + offset
+        numeric_columns, numeric_out, scales, offsets = [], [], [], []
+        # StandardScaler: out = (x - mean) / scale
+        standard_columns, standard_out, means, stds = [], [], [], []
+
+        for name, transformer, columns in ct.transformers_:
+            out = ct.output_indices_[name]
+            if transformer == "drop" or out.stop == out.start:
+                continue
+            # a fitted remainder may list its columns by position
+            columns = [self.feature_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+
+            kind = type(transformer).__name__
+            if transformer == "passthrough":
+                numeric_columns += columns
+                numeric_out += range(out.start, out.stop)
+                scales += [1.0] * len(columns)
+                offsets += [0.0] * len(columns)
+
+            elif kind == "OneHotEncoder":
+                if transformer.handle_unknown != "error" or getattr(transformer, "_infrequent_enabled", False):
+                    raise UnsupportedPreprocessor("OneHotEncoder must use handle_unknown='error' and no infrequent categories")
+                drop_idx = transformer.drop_idx_
+                position = out.start
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    dropped = None if drop_idx is None else drop_idx[i]
+                    mapping = {}
+                    for j, category in enumerate(categories):
+                        if dropped is not None and j == dropped:
+                            mapping[category] = -1
+                        else:
+                            mapping[category] = position
+                            position += 1
+                    self.onehot.append((column, mapping))
+
+            elif kind == "OrdinalEncoder":
+                if transformer.handle_unknown != "error":
+                    raise UnsupportedPreprocessor("OrdinalEncoder must use handle_unknown='error'")
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    mapping = {category: float(code) for code, category in enumerate(categories)}
+                    self.ordinal.append((column, mapping, out.start + i))
+
+            elif kind == "MinMaxScaler":
+                if transformer.clip:
+                    raise UnsupportedPreprocessor("MinMaxScaler(clip=True) is not supported")
+                numeric_columns += columns
+                numeric_out += range(out.start, out.stop)
+                scales += list(transformer.scale_)
+                offsets += list(transformer.min_)
+
+            elif kind == "StandardScaler":
+                standard_columns += columns
+                standard_out += range(out.start, out.stop)
+                n = len(columns)
+                means += list(transformer.mean_) if transformer.with_mean else [0.0] * n
+                stds += list(transformer.scale_) if transformer.with_std else [1.0] * n
+
+            else:
+                raise UnsupportedPreprocessor(f"{kind} is not supported by the fast encoder")
+
+        self.numeric_columns = numeric_columns
+        self.numeric_out = np.asarray(numeric_out, dtype=np.intp)
+        self.scale = np.asarray(scales, dtype=np.float64)
+        self.offset = np.asarray(offsets, dtype=np.float64)
+
+        self.standard_columns = standard_columns
+        self.standard_out = np.asarray(standard_out, dtype=np.intp)
+        self.mean = np.asarray(means, dtype=np.float64)
+        self.std = np.asarray(stds, dtype=np.float64)
+
+    def to_state(self):
+        """Plain lists/dicts (JSON-safe) describing the encoder; see from_state()."""
+        def plain(value):
+            return value.item() if isinstance(value, np.generic) else value
+
+        return {
+            "feature_names": [str(name) for name in self.feature_names],
+            "n_features_out": int(self.n_features_out),
+            # categories as [value, column] pairs so non-string categories survive JSON
+            "onehot": [[column, [[plain(k), int(v)] for k, v in mapping.items()]] for column, mapping in self.onehot],
+            "ordinal": [[column, [[plain(k), float(v)] for k, v in mapping.items()], int(position)]
+                        for column, mapping, position in self.ordinal],
+            "numeric_columns": list(self.numeric_columns),
+            "numeric_out": self.numeric_out.tolist(),
+            "scale": self.scale.tolist(),
+            "offset": self.offset.tolist(),
+            "standard_columns": list(self.standard_columns),
+            "standard_out": self.standard_out.tolist(),
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an encoder from to_state() output without the fitted preprocessor."""
+        encoder = cls.__new__(cls)
+        encoder.feature_names = list(state["feature_names"])
+        encoder.n_features_out = int(state["n_features_out"])
+        encoder.onehot = [(column, {k: v for k, v in pairs}) for column, pairs in state["onehot"]]
+        encoder.ordinal = [(column, {k: v for k, v in pairs}, position) for column, pairs, position in state["ordinal"]]
+        encoder.numeric_columns = list(state["numeric_columns"])
+        encoder.numeric_out = np.asarray(state["numeric_out"], dtype=np.intp)
+        encoder.scale = np.asarray(state["scale"], dtype=np.float64)
+        encoder.offset = np.asarray(state["offset"], dtype=np.float64)
+        encoder.standard_columns = list(state["standard_columns"])
+        encoder.standard_out = np.asarray(state["standard_out"], dtype=np.intp)
+        encoder.mean = np.asarray(state["mean"], dtype=np.float64)
+        encoder.std = np.asarray(state["std"], dtype=np.float64)
+        return encoder
+
+    @staticmethod
+    def _unknown(column, value):
+        return ValueError(f"Found unknown categories [{value!r}] in column {column!r} during transform")
+
+    def transform_one(self, row):
+        """Encode one row given as a dict; returns a (1, n_features_out) array."""
+        out = np.zeros((1, self.n_features_out), dtype=np.float64)
+        target = out[0]
+
+        for column, mapping in self.onehot:
+            position = mapping.get(row[column])
+            if position is None:
+                raise self._unknown(column, row[column])
+            if position >= 0:
+                target[position] = 1.0
+
+        for column, mapping, position in self.ordinal:
+            code = mapping.get(row[column])
+            if code is None:
+                raise self._unknown(column, row[column])
+            target[position] = code
+
+        if self.numeric_columns:
+            values = np.array([row[column] for column in self.numeric_columns], dtype=np.float64)
+            values *= self.scale
+            values += self.offset
+            target[self.numeric_out] = values
+
+        if self.standard_columns:
+            values = np.array([row[column] for column in self.standard_columns], dtype=np.float64)
+            values -= self.mean
+            values /= self.std
+            target[self.standard_out] = values
+
+        return out
+
+    def transform(self, rows):
+        """Encode many rows (DataFrame, record array or list of dicts); a dict is one row."""
+        if isinstance(rows, dict):
+            return self.transform_one(rows)
+        if isinstance(rows, list):
+            import pandas as pd
+
+            rows = pd.DataFrame.from_records(rows)
+
+        n_rows = len(rows)
+        out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+        row_index = np.arange(n_rows)
+
+        for column, mapping in self.onehot:
+            positions = self._lookup(rows[column], column, mapping, np.intp)
+            keep = positions >= 0
+            out[row_index[keep], positions[keep]] = 1.0
+
+        for column, mapping, position in self.ordinal:
+            out[:, position] = self._lookup(rows[column], column, mapping, np.float64)
+
+        if self.numeric_columns:
+            values = np.column_stack([np.asarray(rows[c], dtype=np.float64) for c in self.numeric_columns])
+            values *= self.scale
+            values += self.offset
+            out[:, self.numeric_out] = values
+
+        if self.standard_columns:
+            values = np.column_stack([np.asarray(rows[c], dtype=np.float64) for c in self.standard_columns])
+            values -= self.mean
+            values /= self.std
+            out[:, self.standard_out] = values
+
+        return out
+
+    def _lookup(self, values, column, mapping, dtype):
+        values = np.asarray(values, dtype=object)
+        if len(values) <= SMALL_BATCH_ROWS:
+            try:
+                return np.array([mapping[value] for value in values], dtype=dtype)
+            except KeyError as exc:
+                raise self._unknown(column, exc.args[0]) from None
+
+        import pandas as pd
+
+        # factorize touches each distinct category once, not once per row
+        codes, uniques = pd.factorize(values)
+        if (codes < 0).any():
+            raise self._unknown(column, None)
+        table = []
+        for value in uniques:
+            if value not in mapping:
+                raise self._unknown(column, value)
+            table.append(mapping[value])
+        return np.asarray(table, dtype=dtype)[codes]
+
+
+def compile_encoder(preprocessor):
+    """FastEncoder for a fitted preprocessor, or None if it cannot be mirrored."""
+    try:
+        return FastEncoder(preprocessor)
+    except UnsupportedPreprocessor:
+        return None
+
+
+def check_encoder(segment, registry=None, numeric_values=(0, 1, 7, 40, 168)):
+    """
+    Compare FastEncoder with preprocessor.transform for every st.selectbox
+    option of a segment (one option varied at a time, numeric columns swept
+    over `numeric_values`).
+
+    Returns a dict with the number of rows compared and the options both
+    paths reject as unknown; raises AssertionError on the first mismatch.
+    """
+    import pandas as pd
+
+    from ecowatt.core import AGGREGATORS
+    from ecowatt.options import SELECT_OPTIONS
+    from ecowatt.registry import normalize_segment, registry as default_registry
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    encoder = FastEncoder(pipeline.preprocessor)
+    options = SELECT_OPTIONS[segment]
+
+    # Baseline row: first option every encoder accepts, zeros for numbers
+    base = {}
+    fitted = {column: set(mapping) for column, mapping in encoder.onehot}
+    fitted.update({column: set(mapping) for column, mapping, _ in encoder.ordinal})
+    for column in encoder.feature_names:
+        if column in options:
+            base[column] = next(v for v in options[column] if v in fitted.get(column, {v}))
+        else:
+            base[column] = 0
+
+    rows = []
+    for column, values in options.items():
+        for value in values:
+            rows.append(dict(base, **{column: value}))
+    for column in encoder.feature_names:
+        if column not in options:
+            for value in numeric_values:
+                rows.append(dict(base, **{column: value}))
+
+    rejected = []
+    compared = 0
+    for row in rows:
+        monthly = AGGREGATORS[segment](pd.DataFrame([row]))
+        try:
+            expected = pipeline.preprocessor.transform(monthly)
+        except ValueError:
+            expected = None
+
+        try:
+            single = encoder.transform_one(monthly.iloc[0].to_dict())
+            batch = encoder.transform(monthly)
+        except ValueError:
+            single = batch = None
+
+        if expected is None or single is None:
+            if (expected is None) != (single is None):
+                raise AssertionError(f"{segment}: only one path rejected {row}")
+            rejected.append({c: row[c] for c in options if row[c] != base[c]})
+            continue
+
+        if not (np.array_equal(expected, single) and np.array_equal(expected, batch)):
+            raise AssertionError(f"{segment}: fast encoder differs from preprocessor for {row}")
+        compared += 1
+
+    return {"segment": segment, "rows_compared": compared, "rejected_options": rejected}
@@ -0,0 +1,217 @@
+"""
+Array-based evaluator for the fitted RandomForest / DecisionTree regressors.
+
+sklearn's predict() spends most of a single-row (or small batch) call on input
+validation and joblib dispatch over the estimators. PackedForest flattens every tree into a
+few packed NumPy arrays (feature, threshold, children, value) and walks all
+trees for all rows at once, one tree level per step.
+
+Predictions are bit-identical to model.predict():
+- X is cast to float32 first, like sklearn's trees do,
+- tree outputs are summed in estimator order and then divided by n_trees,
+  exactly as RandomForestRegressor accumulates them.
+
+compact() narrows the arrays to int32 / float32 (about half the bytes).
+Thresholds are rounded down to the nearest float32, which decides every
+float32 sample exactly like the float64 threshold did; only the leaf values
+lose precision (~1e-7 relative), so compact forests are no longer
+bit-identical.
+
+The same (rows x trees) matrix of tree outputs gives a prediction interval
+for free: predict_interval() returns the mean plus low/high percentiles
+across the trees from one pass.
+"""
+
+import numpy as np
+
+
+# Rows traversed together; keeps the (rows x trees) index arrays in cache
+BLOCK_ROWS = 8192
+
+# Up to here the packed walk beats sklearn (~20x for a single row); for big
+# chunks sklearn's Cython traversal is faster, so large batches stay on it
+FOREST_MAX_ROWS = 2048
+
+# Default prediction interval: 10th and 90th percentile of the tree outputs
+INTERVAL_PERCENTILES = (10, 90)
+
+
+def _keep(array, dtypes, default):
+    # Already narrow arrays (e.g. memory-mapped float32 bundles) are used as they are
+    array = np.asarray(array)
+    return array if array.dtype in dtypes else array.astype(default)
+
+
+def _unwrap(model):
+    # GridSearchCV / Pipeline-free wrappers keep the fitted model here
+    return getattr(model, "best_estimator_", model)
+
+
+def _estimators(model):
+    model = _unwrap(model)
+    if hasattr(model, "estimators_"):
+        return list(model.estimators_)
+    if hasattr(model, "tree_"):
+        return [model]
+    return None
+
+
+class PackedForest:
+    """
+    All trees of a forest packed into flat arrays.
+
+    Leaves point to themselves (threshold +inf, both children = self), so
+    after `max_depth` steps every (row, tree) cursor sits on its leaf and no
+    per-step leaf mask is needed.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features):
+        index_types = (np.dtype(np.intp), np.dtype(np.int32))
+        float_types = (np.dtype(np.float64), np.dtype(np.float32))
+        self.feature = _keep(feature, index_types, np.intp)
+        self.threshold = _keep(threshold, float_types, np.float64)
+        self.children = _keep(children, index_types, np.intp)   # (2, n_nodes): left, right
+        self.value = _keep(value, float_types, np.float64)
+        self.roots = _keep(roots, index_types, np.intp)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    @property
+    def compact_dtypes(self):
+        return self.threshold.dtype == np.float32
+
+    def compact(self):
+        """Copy with int32 indices and float32 thresholds / leaf values."""
+        threshold = self.threshold.astype(np.float32)
+        # Round down: for float32 x, x > t64 <=> x > largest float32 <= t64
+        up = threshold.astype(np.float64) > self.threshold
+        threshold[up] = np.nextafter(threshold[up], np.float32(-np.inf))
+        return PackedForest(
+            feature=self.feature.astype(np.int32),
+            threshold=threshold,
+            children=self.children.astype(np.int32),
+            value=self.value.astype(np.float32),
+            roots=self.roots.astype(np.int32),
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+        )
+
+    @classmethod
+    def from_model(cls, model):
+        """Pack a fitted RandomForestRegressor / DecisionTreeRegressor."""
+        estimators = _estimators(model)
+        if not estimators:
+            raise TypeError(f"{type(_unwrap(model)).__name__} is not a tree model")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Only single-output regression trees can be packed")
+
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.stack([np.concatenate(lefts), np.concatenate(rights)]),
+            value=np.concatenate(values),
+            roots=roots,
+            max_depth=max_depth,
+            n_features=_unwrap(model).n_features_in_,
+        )
+
+    def leaves(self, X):
+        """Leaf node index of every (row, tree) pair, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+
+        n_rows = X.shape[0]
+        out = np.empty((n_rows, self.n_trees), dtype=np.intp)
+        flat = X.ravel()
+
+        for start in range(0, n_rows, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n_rows)
+            row_offsets = (np.arange(start, stop, dtype=np.intp) * self.n_features)[:, None]
+            node = np.broadcast_to(self.roots, (stop - start, self.n_trees)).copy()
+
+            for _ in range(self.max_depth):
+                # float32 sample promoted to float64 for the compare, as sklearn does
+                go_right = flat[row_offsets + self.feature[node]] > self.threshold[node]
+                node = self.children[go_right.view(np.int8), node]
+
+            out[start:stop] = node
+
+        return out
+
+    def tree_predictions(self, X):
+        """Output of every tree for every row, shape (n_rows, n_trees)."""
+        return self.value[self.leaves(X)]
+
+    @staticmethod
+    def _mean(per_tree):
+        y_hat = np.zeros(per_tree.shape[0], dtype=np.float64)
+        for t in range(per_tree.shape[1]):
+            y_hat += per_tree[:, t]
+        y_hat /= per_tree.shape[1]
+        return y_hat
+
+    def predict(self, X):
+        """Same result as model.predict(X), bit for bit."""
+        return self._mean(self.tree_predictions(X))
+
+    def predict_interval(self, X, percentiles=INTERVAL_PERCENTILES):
+        """
+        (prediction, low, high) per row: predict(X) plus the given percentiles
+        of the individual tree outputs, all from one traversal.
+        """
+        per_tree = self.tree_predictions(X)
+        low, high = np.percentile(per_tree, percentiles, axis=1)
+        return self._mean(per_tree), low, high
+
+    # Array fields stored by ecowatt.artifacts, in constructor order
+    ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, max_depth, n_features):
+        """Wrap existing arrays (e.g. read-only memory maps) without copying them."""
+        return cls(max_depth=max_depth, n_features=n_features, **{name: arrays[name] for name in cls.ARRAYS})
+
+
+def compile_model(model):
+    """PackedForest for tree models, None for anything else (e.g. LinearRegression)."""
+    if not _estimators(model):
+        return None
+    try:
+        return PackedForest.from_model(model)
+    except ValueError:
+        return None
@@ -0,0 +1,341 @@
+"""
+Assessment history: every analysis appended to a local SQLite database.
+
+Each assessment keeps the segment, an optional site ID, State/City, the
+weekly inputs and monthly features (JSON), kWh, bill, usage category and the
+model version. The database runs in WAL mode, so the app reads trends while
+other sessions write. Writes are batched: record() only appends to a buffer,
+which goes to disk in one transaction once it holds `batch_size` rows or
+`flush_seconds` after its first row (also before every query and at exit).
+
+Trend and leaderboard queries must stay fast with millions of rows, so the
+same transaction keeps two small tables up to date, as Portfolio does with
+its rollups:
+- daily: assessments, kWh and cost per segment, State, City and UTC day;
+- latest: the newest assessment of every site.
+Site trends read `assessments` through its (site_id, created) index; State /
+City and time range queries have their own indexes. Assessments recorded with
+model_version DEMO_VERSION (a random demo kWh, not a prediction) are kept but
+left out of both tables and of site trends.
+
+    python -m ecowatt score --segment shops sites.csv -o scored.csv --history
+    python -m ecowatt history --segment shops --site S-0042
+    python -m ecowatt history --segment shops --leaderboard city --days 30
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from ecowatt.registry import BASE_DIR, normalize_segment
+
+
+HISTORY_DB = Path(os.environ.get("ECOWATT_HISTORY_DB", BASE_DIR / "History" / "assessments.db"))
+
+HISTORY_BATCH_SIZE = 256
+HISTORY_FLUSH_SECONDS = 2.0
+
+LEADERBOARDS = ("site", "city", "state")
+
+# model_version of assessments whose kWh is a demo draw rather than a prediction
+DEMO_VERSION = "demo"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    segment TEXT NOT NULL,
+    site_id TEXT,
+    state TEXT,
+    city TEXT,
+    predicted_kwh REAL NOT NULL,
+    estimated_cost REAL NOT NULL,
+    usage_category TEXT,
+    model_version TEXT,
+    inputs TEXT,
+    features TEXT
+);
+CREATE INDEX IF NOT EXISTS assessments_site ON assessments (site_id, created);
+CREATE INDEX IF NOT EXISTS assessments_area ON assessments (state, city, created);
+CREATE INDEX IF NOT EXISTS assessments_created ON assessments (created);
+
+CREATE TABLE IF NOT EXISTS daily (
+    segment TEXT NOT NULL,
+    state TEXT NOT NULL,
+    city TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    assessments INTEGER NOT NULL,
+    predicted_kwh REAL NOT NULL,
+    estimated_cost REAL NOT NULL,
+    PRIMARY KEY (segment, state, city, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_day ON daily (segment, day);
+
+CREATE TABLE IF NOT EXISTS latest (
+    segment TEXT NOT NULL,
+    site_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    state TEXT,
+    city TEXT,
+    predicted_kwh REAL NOT NULL,
+    estimated_cost REAL NOT NULL,
+    usage_category TEXT,
+    PRIMARY KEY (segment, site_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS latest_kwh ON latest (segment, predicted_kwh);
+"""
+
+INSERT_ASSESSMENT = """
+INSERT INTO assessments (created, segment, site_id, state, city, predicted_kwh, estimated_cost,
+                         usage_category, model_version, inputs, features)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_DAILY = """
+INSERT INTO daily VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (segment, state, city, day) DO UPDATE SET
+    assessments = assessments + excluded.assessments,
+    predicted_kwh = predicted_kwh + excluded.predicted_kwh,
+    estimated_cost = estimated_cost + excluded.estimated_cost
+"""
+
+UPSERT_LATEST = """
+INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (segment, site_id) DO UPDATE SET
+    created = excluded.created, state = excluded.state, city = excluded.city,
+    predicted_kwh = excluded.predicted_kwh, estimated_cost = excluded.estimated_cost,
+    usage_category = excluded.usage_category
+WHERE excluded.created >= latest.created
+"""
+
+
+def _json(values):
+    # NumPy scalars from DataFrames are not JSON serializable as such
+    return json.dumps(values, separators=(",", ":"),
+                      default=lambda value: value.item() if hasattr(value, "item") else str(value))
+
+
+class HistoryStore:
+    """Buffered, thread-safe writer and query helper for one history database."""
+
+    def __init__(self, path=HISTORY_DB, batch_size=HISTORY_BATCH_SIZE, flush_seconds=HISTORY_FLUSH_SECONDS,
+                 clock=time.time):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self.written = 0
+        self.flushes = 0
+        self._pending = []
+        self._timer = None
+        self._connection = None
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self):
+        """Opened on first use, so importing the module never creates the database."""
+        with self._lock:
+            if self._connection is None:
+                if os.fspath(self.path) != ":memory:":
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(os.fspath(self.path), check_same_thread=False, isolation_level=None)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(SCHEMA)
+                self._connection = connection
+                atexit.register(self.close)
+            return self._connection
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+
+    # Writing
+
+    def record(self, segment, predicted_kwh, estimated_cost, usage_category, inputs=None, features=None,
+               site_id=None, model_version=None, created=None):
+        """Queue one assessment; written with the next batch."""
+        inputs = inputs or {}
+        self._queue([(
+            self.clock() if created is None else created,
+            normalize_segment(segment),
+            None if site_id in (None, "") else str(site_id),
+            inputs.get("State"),
+            inputs.get("City"),
+            float(predicted_kwh),
+            float(estimated_cost),
+            usage_category,
+            model_version,
+            _json(inputs),
+            None if features is None else _json(features),
+        )])
+
+    def record_frame(self, scored, segment, model_version=None, registry=None, created=None):
+        """
+        Queue every row of score_frame() output (Site_ID column optional);
+        the monthly features are recomputed from the input columns in one pass.
+        """
+        from ecowatt.batch import INTERVAL_COLUMNS, RESULT_COLUMNS
+        from ecowatt.core import monthly_features
+        from ecowatt.registry import registry as default_registry
+
+        segment = normalize_segment(segment)
+        pipeline = (registry or default_registry).get(segment)
+        created = self.clock() if created is None else created
+        inputs = scored.drop(columns=[c for c in RESULT_COLUMNS + INTERVAL_COLUMNS + ["Site_ID"] if c in scored.columns])
+        features = monthly_features(inputs, segment, pipeline)
+        site_ids = scored["Site_ID"].astype(str).tolist() if "Site_ID" in scored.columns else [None] * len(scored)
+
+        self._queue(list(zip(
+            [created] * len(scored),
+            [segment] * len(scored),
+            site_ids,
+            inputs["State"].tolist(),
+            inputs["City"].tolist(),
+            scored["Predicted_kWh"].astype(float).tolist(),
+            scored["Estimated_Cost"].astype(float).tolist(),
+            scored["Usage_Category"].tolist(),
+            [model_version or pipeline.version] * len(scored),
+            [_json(row) for row in inputs.to_dict("records")],
+            [_json(row) for row in features.to_dict("records")],
+        )))
+        return len(scored)
+
+    def _queue(self, rows):
+        with self._lock:
+            self._pending.extend(rows)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None and self.flush_seconds:
+                # A lone assessment is still on disk within flush_seconds
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered assessments and their daily/latest updates in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+
+            daily, latest = {}, {}
+            for created, segment, site_id, state, city, kwh, cost, category, model_version, *_ in rows:
+                if model_version == DEMO_VERSION:
+                    continue
+                totals = daily.setdefault((segment, state or "", city or "", int(created // 86400)), [0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += kwh
+                totals[2] += cost
+                if site_id is not None and created >= latest.get((segment, site_id), (float("-inf"),))[0]:
+                    latest[segment, site_id] = (created, state, city, kwh, cost, category)
+
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(INSERT_ASSESSMENT, rows)
+                connection.executemany(UPSERT_DAILY, [(*key, *totals) for key, totals in daily.items()])
+                connection.executemany(UPSERT_LATEST, [(*key, *row) for key, row in latest.items()])
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self._pending[:0] = rows
+                raise
+            self.written += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._connection is None:
+                self._pending.clear()
+                return
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    # Queries (buffered rows are flushed first, so a result is never missing)
+
+    def _query(self, sql, params):
+        import pandas as pd
+
+        self.flush()
+        with self._lock:
+            return pd.read_sql_query(sql, self.connection, params=params)
+
+    def recent_sites(self, segment, limit=500):
+        """Site IDs of a segment, most recently assessed first."""
+        self.flush()
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT site_id FROM latest WHERE segment = ? ORDER BY created DESC LIMIT ?",
+                (normalize_segment(segment), limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def site_trend(self, site_id, segment=None, since=None):
+        """Every assessment of one site, oldest first."""
+        import pandas as pd
+
+        sql = ("SELECT created, predicted_kwh, estimated_cost, usage_category, model_version "
+               "FROM assessments WHERE site_id = ? AND created >= ? AND model_version IS NOT ?")
+        params = [str(site_id), since or 0, DEMO_VERSION]
+        if segment is not None:
+            sql += " AND segment = ?"
+            params.append(normalize_segment(segment))
+        trend = self._query(sql + " ORDER BY created", params)
+        trend["created"] = pd.to_datetime(trend["created"], unit="s")
+        return trend
+
+    def area_trend(self, segment, state=None, city=None, since=None):
+        """Assessments and average kWh / bill per day for a segment, optionally one State / City."""
+        import pandas as pd
+
+        sql = ("SELECT day, SUM(assessments) AS assessments, SUM(predicted_kwh) / SUM(assessments) AS avg_kwh, "
+               "SUM(estimated_cost) / SUM(assessments) AS avg_cost FROM daily WHERE segment = ? AND day >= ?")
+        params = [normalize_segment(segment), int((since or 0) // 86400)]
+        for column, value in (("state", state), ("city", city)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        trend = self._query(sql + " GROUP BY day ORDER BY day", params)
+        trend["day"] = pd.to_datetime(trend["day"], unit="D")
+        return trend
+
+    def leaderboard(self, segment, by="site", n=10, since=None, lowest=False):
+        """
+        Top `n` sites by their latest kWh, or States / Cities by average kWh
+        per assessment since `since` (unix seconds); `lowest` ranks from the bottom.
+        """
+        if by not in LEADERBOARDS:
+            raise ValueError(f"Leaderboards rank by {' / '.join(LEADERBOARDS)}, not {by!r}")
+        order = "ASC" if lowest else "DESC"
+        segment = normalize_segment(segment)
+
+        if by == "site":
+            return self._query(
+                "SELECT site_id, state, city, predicted_kwh, estimated_cost, usage_category, "
+                "datetime(created, 'unixepoch') AS assessed FROM latest "
+                f"WHERE segment = ? AND created >= ? ORDER BY predicted_kwh {order} LIMIT ?",
+                [segment, since or 0, n],
+            )
+
+        keys = "state, city" if by == "city" else "state"
+        return self._query(
+            f"SELECT {keys}, SUM(assessments) AS assessments, SUM(predicted_kwh) / SUM(assessments) AS avg_kwh, "
+            "SUM(estimated_cost) / SUM(assessments) AS avg_cost FROM daily WHERE segment = ? AND day >= ? "
+            f"GROUP BY {keys} ORDER BY avg_kwh {order} LIMIT ?",
+            [segment, int((since or 0) // 86400), n],
+        )
+
+
+# Shared by every session of the app process
+history = HistoryStore()
@@ -0,0 +1,217 @@
+"""
+Streaming ingestion of appliance-level smart-meter logs.
+
+A usage log is a CSV/Parquet file in long format, one reading per line:
+
+    Site_ID, Timestamp, Appliance, Usage
+
+where Usage is the amount used in that reading, in the unit of the matching
+monthly feature (hours, geyser/printer minutes or washing-machine cycles) and
+Appliance is a short name from APPLIANCE_COLUMNS ('AC', 'Fan', 'Lights' ...)
+or the feature column itself. A site table (one row per Site_ID) holds
+everything that does not come from the meter: State, City, appliance types
+and counts, and optionally Weather/Season.
+
+The log is read chunk by chunk and summed per site and calendar month, so
+months are exact instead of weeks x 4.3. Only the per-(site, month) totals
+are kept; when the log is ordered by time (ordered=True) every month is
+emitted and dropped as soon as a later month shows up, so memory stays flat
+however long the log is. The rows coming out are already monthly: they go
+straight to pipeline.predict, not through aggregate_weekly_to_monthly_*.
+
+    python -m ecowatt ingest --segment homes usage.csv sites.csv -o features.csv --score
+"""
+
+import numpy as np
+
+from ecowatt.batch import DEFAULT_CHUNKSIZE, read_chunks
+from ecowatt.core import MONTHLY_SCALED_COLUMNS, classify_usage_batch, estimate_cost_batch
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+LOG_COLUMNS = ("Site_ID", "Timestamp", "Appliance", "Usage")
+
+# Short appliance names in the logs -> monthly feature column
+APPLIANCE_COLUMNS = {
+    "Homes": {
+        "AC": "Monthly_AC_Usage_Hours",
+        "Fan": "Monthly_Fan_Usage_Hours",
+        "Refrigerator": "Refrigerator_Usage_Hrs_Monthly",
+        "TV": "Monthly_TV_Usage_Hours",
+        "Geyser": "Monthly_Geyser_Usage_Minutes",
+        "Washing_Machine": "Monthly_Washing_Machine_Usage_Cycles",
+    },
+    "Shops": {
+        "Working_Hours": "Avg_Working_Hours_Monthly",
+        "AC": "Monthly_AC_Usage_Hours",
+        "Fan": "Monthly_Fan_Usage_Hours",
+        "Refrigerator_Type_1": "Monthly_Refrigerator_Usage_Hours_Type_1",
+        "Refrigerator_Type_2": "Monthly_Refrigerator_Usage_Hours_Type_2",
+        "Lights": "Monthly_Lights_Usage_Hours",
+        "PC": "Monthly_PC_Usage_Hours",
+    },
+    "Offices": {
+        "Working_Hours": "Avg_Working_Hours_Monthly",
+        "AC": "Monthly_AC_Usage_Hours",
+        "Fan": "Monthly_Fan_Usage_Hours",
+        "Lights": "Monthly_Lights_Usage_Hours",
+        "PC": "Monthly_PC_Usage_Hours",
+        "Refrigerator": "Monthly_Refrigerator_Usage_Hours",
+        "Printer": "Monthly_Printer_Usage_Minutes",
+        "Projector": "Monthly_Projector_Usage_Hours",
+    },
+}
+
+# Used when the site table has no Weather/Season column
+MONTH_SEASONS = {
+    1: "Winter", 2: "Winter", 3: "Summer", 4: "Summer", 5: "Summer", 6: "Monsoon",
+    7: "Monsoon", 8: "Monsoon", 9: "Monsoon", 10: "Winter", 11: "Winter", 12: "Winter",
+}
+
+
+def _appliance_index(segment):
+    """{appliance name or feature column: position in MONTHLY_SCALED_COLUMNS[segment]}."""
+    usage_columns = MONTHLY_SCALED_COLUMNS[segment]
+    index = {column: i for i, column in enumerate(usage_columns)}
+    for name, column in APPLIANCE_COLUMNS[segment].items():
+        index[name] = usage_columns.index(column)
+    return index
+
+
+def monthly_usage(chunks, segment, ordered=False, ignore_unknown=False):
+    """
+    Sum log chunks per (Site_ID, Month) and appliance.
+
+    Yields DataFrames indexed by (Site_ID, Month) with one column per usage
+    feature. With ordered=True a month is yielded once a later one appears in
+    the log; otherwise everything is yielded after the last chunk.
+    """
+    import pandas as pd
+
+    segment = normalize_segment(segment)
+    usage_columns = MONTHLY_SCALED_COLUMNS[segment]
+    appliance_index = _appliance_index(segment)
+
+    totals = None
+    for chunk in chunks:
+        missing = [c for c in LOG_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Usage log is missing columns: {missing}")
+        if chunk.empty:
+            continue
+
+        codes = chunk["Appliance"].map(appliance_index)
+        unknown = codes.isna()
+        if unknown.any():
+            if not ignore_unknown:
+                names = sorted(chunk.loc[unknown, "Appliance"].astype(str).unique())
+                raise ValueError(f"Unknown {segment} appliances in usage log: {names}")
+            chunk, codes = chunk[~unknown], codes[~unknown]
+
+        months = pd.to_datetime(chunk["Timestamp"]).dt.to_period("M")
+        part = (
+            pd.DataFrame({
+                "Site_ID": chunk["Site_ID"].to_numpy(),
+                "Month": months.to_numpy(),
+                "Appliance": codes.to_numpy(dtype=np.intp),
+                "Usage": pd.to_numeric(chunk["Usage"]).to_numpy(dtype=np.float64),
+            })
+            .groupby(["Site_ID", "Month", "Appliance"], sort=False)["Usage"].sum()
+            .unstack("Appliance", fill_value=0.0)
+            .reindex(columns=range(len(usage_columns)), fill_value=0.0)
+        )
+        part.columns = usage_columns
+
+        totals = part if totals is None else totals.add(part, fill_value=0.0)
+
+        if ordered:
+            # Everything before the newest month of this chunk is complete
+            latest = months.max()
+            done = totals.index.get_level_values("Month") < latest
+            if done.any():
+                yield totals[done]
+                totals = totals[~done]
+
+    if totals is not None and len(totals):
+        yield totals
+
+
+def read_sites(source, segment, fmt=None, registry=None):
+    """Site table (CSV/Parquet or DataFrame) indexed by Site_ID, checked against the model's columns."""
+    import pandas as pd
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    if isinstance(source, pd.DataFrame):
+        sites = source
+    else:
+        sites = pd.concat(list(read_chunks(source, fmt=fmt)), ignore_index=True)
+
+    needed = [c for c in pipeline.feature_names if c not in MONTHLY_SCALED_COLUMNS[segment] and c != "Weather/Season"]
+    missing = [c for c in ["Site_ID"] + needed if c not in sites.columns]
+    if missing:
+        raise ValueError(f"{segment} site table is missing columns: {missing}")
+    if sites["Site_ID"].duplicated().any():
+        raise ValueError("Site table has duplicate Site_ID values")
+
+    return sites.set_index("Site_ID")
+
+
+def feature_rows(monthly, sites, segment, registry=None):
+    """
+    Join monthly usage totals with the site table into the exact monthly
+    feature rows the preprocessor expects (plus Site_ID and Month up front).
+    """
+    import pandas as pd
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    for totals in monthly:
+        site_ids = totals.index.get_level_values("Site_ID")
+        months = totals.index.get_level_values("Month")
+
+        unknown = ~site_ids.isin(sites.index)
+        if unknown.any():
+            raise ValueError(f"Usage log has sites missing from the site table: {sorted(set(site_ids[unknown]))[:10]}")
+
+        site_rows = sites.loc[site_ids]
+        columns = {"Site_ID": site_ids.to_numpy(), "Month": months.astype(str).to_numpy()}
+        for column in pipeline.feature_names:
+            if column in totals.columns:
+                columns[column] = totals[column].to_numpy()
+            elif column == "Weather/Season" and column not in sites.columns:
+                columns[column] = np.asarray([MONTH_SEASONS[m] for m in months.month], dtype=object)
+            else:
+                columns[column] = site_rows[column].to_numpy()
+        yield pd.DataFrame(columns)
+
+
+def ingest(log_source, sites, segment, fmt=None, chunksize=DEFAULT_CHUNKSIZE, ordered=False,
+           ignore_unknown=False, registry=None):
+    """Generator of monthly feature frames for a usage log (the whole pipeline above)."""
+    segment = normalize_segment(segment)
+    if getattr(getattr(sites, "index", None), "name", None) != "Site_ID":
+        sites = read_sites(sites, segment, registry=registry)
+
+    chunks = read_chunks(log_source, fmt=fmt, chunksize=chunksize)
+    monthly = monthly_usage(chunks, segment, ordered=ordered, ignore_unknown=ignore_unknown)
+    yield from feature_rows(monthly, sites, segment, registry=registry)
+
+
+# Exported from the package under this name; `ecowatt.ingest` is this module
+ingest_readings = ingest
+
+
+def score_monthly(frame, segment, registry=None):
+    """Predicted kWh, bill and usage category for monthly feature rows (no weekly scaling)."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    kwh_pred = pipeline.predict(frame[pipeline.feature_names])
+    result = frame.copy()
+    result["Predicted_kWh"] = kwh_pred
+    result["Estimated_Cost"] = estimate_cost_batch(kwh_pred, frame["State"].to_numpy(), segment)
+    result["Usage_Category"] = classify_usage_batch(kwh_pred, segment)
+    return result
@@ -0,0 +1,336 @@
+"""
+Concurrent-user load test of the "Analyze Usage" path.
+
+    python -m ecowatt loadtest --users 1 4 16 --duration 20 -o load.json
+    python -m ecowatt loadtest --driver apptest --users 2 4 --duration 30
+
+Every simulated session is a thread, as Streamlit runs each browser session
+in a thread of one server process, looping: pick a random realistic profile,
+run one analysis, record its latency, optionally wait `think_time`. Two drivers:
+
+- headless (default): score_one(), i.e. aggregate, encode, predict with
+  interval, bill, classify and recommendations, on a registry of its own with
+  the prediction cache off (cache=True scores through the shared registry and
+  its cache instead);
+- apptest: Streamlit's AppTest runs App.py itself per session, fills the
+  module's form with random options/values and submits it, so script
+  reruns and widget handling are included (needs streamlit). The app's
+  history store is pointed at a throwaway database for the run.
+
+Profiles come from ecowatt.bench.synthetic_profiles (app options, simulator
+ranges, seeded). Each concurrency level runs for `duration` seconds after the
+models are loaded; the report holds throughput, p50/p95/p99/max latency per
+level and per segment, the prediction cache hit rate, and a timeline sampled
+every `sample_interval` seconds: requests, throughput, window p50/p99, process
+CPU % and RSS.
+"""
+
+import contextlib
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+
+from ecowatt.bench import DEFAULT_SEED, peak_rss_mb, synthetic_profiles
+
+
+DEFAULT_USERS = (1, 2, 4, 8)
+DEFAULT_DURATION = 10.0
+DEFAULT_SAMPLE_INTERVAL = 1.0
+
+# Random profiles drawn per segment before a run; sessions sample from these
+PROFILE_POOL = 2000
+
+LOADTEST_FORMAT_VERSION = 1
+
+
+def current_rss_mb():
+    """Resident set size of this process now, in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def _cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+def _latency_summary(seconds):
+    if not len(seconds):
+        return {"requests": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"requests": int(len(ms)), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "max_ms": float(ms.max())}
+
+
+class HeadlessDriver:
+    """One analysis = score_one() with the prediction interval, as the modules do."""
+
+    def __init__(self, segment, registry=None):
+        from ecowatt.registry import ModelRegistry
+
+        self.segment = segment
+        # Without the cache, so every analysis is scored rather than looked up
+        self.registry = registry or ModelRegistry(cache=False)
+        self.registry.get(segment)
+
+    def __call__(self, profile, rng):
+        from ecowatt.core import score_one
+
+        return score_one(profile, self.segment, registry=self.registry)
+
+
+class AppTestDriver:
+    """One analysis = fill in App.py's form for the segment and submit it."""
+
+    def __init__(self, segment, app_path=None, timeout=30.0):
+        from streamlit.testing.v1 import AppTest
+
+        from ecowatt.core import MODULE_LABELS
+        from ecowatt.registry import BASE_DIR
+
+        self.segment = segment
+        self.app = AppTest.from_file(os.fspath(app_path or BASE_DIR / "App.py"), default_timeout=timeout)
+        self.app.run()
+        self.app.sidebar.radio[0].set_value(MODULE_LABELS[segment]).run()
+        self._check()
+
+    def _check(self):
+        if len(self.app.exception):
+            raise RuntimeError(f"App.py raised: {self.app.exception[0].value}")
+
+    def __call__(self, profile, rng):
+        # Widget labels are not the column names, so the form is randomized directly
+        for selectbox in self.app.main.selectbox:
+            selectbox.set_value(selectbox.options[rng.integers(len(selectbox.options))])
+        for number_input in self.app.main.number_input:
+            number_input.set_value(int(rng.integers(0, 120)))
+        self.app.button[0].click().run()
+        self._check()
+
+
+@contextlib.contextmanager
+def _scratch_history():
+    """Point the app's history store at a temporary database, so sessions never reach History/."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="ecowatt-loadtest-") as directory:
+        path = os.path.join(directory, "assessments.db")
+        saved_path = os.environ.get("ECOWATT_HISTORY_DB")
+        os.environ["ECOWATT_HISTORY_DB"] = path
+        # App.py takes ecowatt.history.history on every run; it may already exist for the real database
+        from ecowatt import history as history_module
+
+        saved_store = history_module.history
+        history_module.history = history_module.HistoryStore(path)
+        try:
+            yield path
+        finally:
+            history_module.history.close()
+            history_module.history = saved_store
+            if saved_path is None:
+                os.environ.pop("ECOWATT_HISTORY_DB", None)
+            else:
+                os.environ["ECOWATT_HISTORY_DB"] = saved_path
+
+
+def _cache_counts(registry):
+    cache = getattr(registry, "cache", None)
+    return (cache.hits, cache.misses) if cache is not None else None
+
+
+class _Recorder:
+    """Thread-safe list of (finished at, seconds, segment, ok)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def add(self, finished, seconds, segment, ok):
+        with self.lock:
+            self.samples.append((finished, seconds, segment, ok))
+
+    def since(self, start):
+        with self.lock:
+            return self.samples[start:], len(self.samples)
+
+
+def _session(driver, profiles, stop, recorder, think_time, seed):
+    rng = np.random.default_rng(seed)
+    while not stop.is_set():
+        profile = profiles[rng.integers(len(profiles))]
+        started = time.perf_counter()
+        try:
+            driver(profile, rng)
+            ok = True
+        except Exception:
+            ok = False
+        finished = time.perf_counter()
+        recorder.add(finished, finished - started, driver.segment, ok)
+        if think_time:
+            stop.wait(think_time)
+
+
+def run_level(users, segments, duration=DEFAULT_DURATION, driver="headless", think_time=0.0,
+              sample_interval=DEFAULT_SAMPLE_INTERVAL, seed=DEFAULT_SEED, app_path=None, registry=None,
+              cache=False):
+    """
+    Run `users` concurrent sessions for `duration` seconds; returns one level of the report.
+
+    The headless sessions share `registry`; by default one without a
+    prediction cache, or the shared registry (with its cache) if `cache`.
+    """
+    from ecowatt.registry import ModelRegistry, registry as default_registry
+
+    if driver == "headless" and registry is None:
+        registry = default_registry if cache else ModelRegistry(cache=False)
+    # AppTest runs the app as deployed, on the shared registry
+    cache_registry = registry if driver == "headless" else default_registry
+
+    profiles = {
+        segment: synthetic_profiles(segment, PROFILE_POOL, seed, registry).to_dict("records")
+        for segment in segments
+    }
+
+    # Drivers (model load, first AppTest run) are built before the clock starts
+    drivers = []
+    for i in range(users):
+        segment = segments[i % len(segments)]
+        if driver == "apptest":
+            drivers.append(AppTestDriver(segment, app_path=app_path))
+        else:
+            drivers.append(HeadlessDriver(segment, registry=registry))
+
+    recorder = _Recorder()
+    cache_started = _cache_counts(cache_registry)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_session, name=f"ecowatt-load-{i}", daemon=True,
+                         args=(d, profiles[d.segment], stop, recorder, think_time, seed + i))
+        for i, d in enumerate(drivers)
+    ]
+
+    timeline = []
+    started = time.perf_counter()
+    cpu_started = _cpu_seconds()
+    for thread in threads:
+        thread.start()
+
+    seen = 0
+    window_start, cpu_window = started, cpu_started
+    while True:
+        now = time.perf_counter()
+        if now - started >= duration:
+            break
+        stop.wait(min(sample_interval, duration - (now - started)))
+        now, cpu_now = time.perf_counter(), _cpu_seconds()
+        window, seen = recorder.since(seen)
+        summary = _latency_summary([seconds for _, seconds, _, _ in window])
+        timeline.append({
+            "t": now - started,
+            "requests": summary["requests"],
+            "throughput_rps": summary["requests"] / (now - window_start),
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"],
+            "cpu_percent": 100 * (cpu_now - cpu_window) / (now - window_start),
+            "rss_mb": current_rss_mb(),
+        })
+        window_start, cpu_window = now, cpu_now
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cpu_used = _cpu_seconds() - cpu_started
+    cache_counts = _cache_counts(cache_registry)
+    if cache_started is None or cache_counts is None:
+        cache_report = {"enabled": False, "hits": 0, "misses": 0, "hit_rate": None}
+    else:
+        hits, misses = (now - before for now, before in zip(cache_counts, cache_started))
+        cache_report = {"enabled": True, "hits": hits, "misses": misses,
+                        "hit_rate": hits / (hits + misses) if hits + misses else None}
+
+    # Requests still running at the deadline finish late; only count what ended in time
+    samples = [s for s in recorder.samples if s[0] - started <= duration]
+    ok = [seconds for _, seconds, _, good in samples if good]
+    level = {
+        "users": users,
+        "seconds": elapsed,
+        "errors": sum(1 for *_, good in samples if not good),
+        "throughput_rps": len(ok) / duration,
+        **_latency_summary(ok),
+        "cpu_percent": 100 * cpu_used / elapsed,
+        "rss_mb_max": max([point["rss_mb"] for point in timeline if point["rss_mb"]] or [current_rss_mb()]),
+        "prediction_cache": cache_report,
+        "segments": {
+            segment: _latency_summary([seconds for _, seconds, seg, good in samples if good and seg == segment])
+            for segment in segments
+        },
+        "timeline": timeline,
+    }
+    return level
+
+
+def run_load_test(users=DEFAULT_USERS, segments=None, duration=DEFAULT_DURATION, driver="headless",
+                  think_time=0.0, sample_interval=DEFAULT_SAMPLE_INTERVAL, seed=DEFAULT_SEED, app_path=None,
+                  registry=None, cache=False):
+    """
+    Run every concurrency level in turn and return the JSON-ready report.
+
+    `cache` lets headless sessions hit the shared prediction cache (off by
+    default, so the numbers are scoring capacity).
+    """
+    import pandas as pd
+    import sklearn
+
+    from ecowatt.bench import _git_commit
+    from ecowatt.registry import SEGMENT_ARTIFACTS, normalize_segment
+
+    if driver not in ("headless", "apptest"):
+        raise ValueError(f"Unknown load test driver: {driver!r} (use headless or apptest)")
+    segments = [normalize_segment(s) for s in (segments or SEGMENT_ARTIFACTS)]
+    if driver == "headless" and registry is None and not cache:
+        from ecowatt.registry import ModelRegistry
+
+        # One uncached registry for every level, loaded once
+        registry = ModelRegistry(cache=False)
+
+    with _scratch_history() if driver == "apptest" else contextlib.nullcontext():
+        levels = [
+            run_level(n, segments, duration=duration, driver=driver, think_time=think_time,
+                      sample_interval=sample_interval, seed=seed, app_path=app_path, registry=registry,
+                      cache=cache)
+            for n in users
+        ]
+
+    return {
+        "format_version": LOADTEST_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "settings": {
+            "driver": driver,
+            "segments": segments,
+            "users": list(users),
+            "duration": duration,
+            "think_time": think_time,
+            "sample_interval": sample_interval,
+            "seed": seed,
+            "prediction_cache": bool(cache) if driver == "headless" else "app default",
+        },
+        "levels": levels,
+    }
@@ -0,0 +1,214 @@
+"""
+Savings optimizer: which appliance changes cut a profile's bill the most.
+
+The recommendation rules only say "AC > 150 hours". This searches concrete
+changes with the segment model and the tariff instead. The changes are the
+actions in SAVING_ACTIONS:
+- cut a usage input by 10%, 20%, ... up to the comfort limit;
+- switch an appliance type, e.g. AC to Inverter AC or lights to LED.
+
+Comfort constraints:
+- max_reduction: largest cut of any usage input, as a fraction;
+- limits: per-column cuts ({column: fraction}, 0 keeps the column as is);
+- floors: minimum weekly values ({column: value});
+- switches: False or a set of the type columns that may change.
+
+The search is a beam search, one batch per stage. Stage 1 scores every
+single change. Each later stage adds one more action to the best
+`beam` combinations. A combination is kept only if it saves more than each
+of its subsets with one action fewer, and actions that saved nothing on their own are not tried
+again. Every stage is
+one monthly_features/predict/bill call, so a profile costs a few batch calls
+whatever the number of candidates. The top `k` action sets by rupees saved
+come back, each with the best cut levels found for it.
+
+    optimize_savings(profile, "homes", k=5, max_reduction=0.3, floors={"Monthly_AC_Usage_Hours": 40})
+"""
+
+import time
+
+import numpy as np
+
+from ecowatt.core import estimate_cost_batch, monthly_features
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_REDUCTION = 0.3
+DEFAULT_MAX_CHANGES = 3
+DEFAULT_BEAM = 32
+REDUCTION_STEP = 0.1
+
+
+def _five_star(value):
+    """Same refrigerator form factor, 5★ rating."""
+    return value.replace("3★", "5★").replace("4★", "5★")
+
+
+# Per segment: (label, column, target). A target of None is a usage cut;
+# otherwise the new type (a value or a function of the current one)
+SAVING_ACTIONS = {
+    "Homes": [
+        ("AC hours", "Monthly_AC_Usage_Hours", None),
+        ("Fan hours", "Monthly_Fan_Usage_Hours", None),
+        ("Refrigerator hours", "Refrigerator_Usage_Hrs_Monthly", None),
+        ("TV hours", "Monthly_TV_Usage_Hours", None),
+        ("Geyser minutes", "Monthly_Geyser_Usage_Minutes", None),
+        ("Washing machine cycles", "Monthly_Washing_Machine_Usage_Cycles", None),
+        ("Inverter AC", "AC_Type", "Inverter AC"),
+        ("5★ refrigerator", "Refrigerator_Type", _five_star),
+        ("LED TV", "TV_Type", "LED"),
+    ],
+    "Shops": [
+        ("AC hours", "Monthly_AC_Usage_Hours", None),
+        ("Fan hours", "Monthly_Fan_Usage_Hours", None),
+        ("Display cooler hours", "Monthly_Refrigerator_Usage_Hours_Type_1", None),
+        ("Deep freezer hours", "Monthly_Refrigerator_Usage_Hours_Type_2", None),
+        ("Light hours", "Monthly_Lights_Usage_Hours", None),
+        ("PC hours", "Monthly_PC_Usage_Hours", None),
+        ("Inverter AC", "AC_Type", "Inverter AC"),
+        ("LED lights", "Lights_Type", "LED"),
+    ],
+    "Offices": [
+        ("AC hours", "Monthly_AC_Usage_Hours", None),
+        ("Fan hours", "Monthly_Fan_Usage_Hours", None),
+        ("Light hours", "Monthly_Lights_Usage_Hours", None),
+        ("PC hours", "Monthly_PC_Usage_Hours", None),
+        ("Refrigerator hours", "Monthly_Refrigerator_Usage_Hours", None),
+        ("Printer minutes", "Monthly_Printer_Usage_Minutes", None),
+        ("Projector hours", "Monthly_Projector_Usage_Hours", None),
+        ("Inverter AC", "AC_Type", "Inverter AC"),
+        ("LED lights", "Lights_Type", "LED"),
+        ("5★ refrigerator", "Refrigerator_Type", _five_star),
+    ],
+}
+
+
+def action_options(profile, segment, max_reduction=DEFAULT_MAX_REDUCTION, limits=None, floors=None,
+                   switches=True):
+    """
+    Allowed (label, column, new value, description) changes per action, as a
+    list of lists; an action with no allowed change is left out.
+    """
+    limits, floors = limits or {}, floors or {}
+    options = []
+    for label, column, target in SAVING_ACTIONS[normalize_segment(segment)]:
+        current = profile[column]
+        if target is None:
+            limit = limits.get(column, max_reduction)
+            floor = floors.get(column, 0)
+            levels = np.arange(1, int(round(limit / REDUCTION_STEP)) + 1) * REDUCTION_STEP
+            choices = [
+                (label, column, float(current) * (1 - cut),
+                 f"{label} −{cut:.0%} ({current:g} → {float(current) * (1 - cut):g} a week)")
+                for cut in levels
+                if current > 0 and float(current) * (1 - cut) >= floor
+            ]
+        else:
+            allowed = switches is True or (switches and column in switches)
+            new = target(current) if callable(target) else target
+            choices = ([(label, column, new, f"{label}: {current} → {new}")]
+                       if allowed and current != "None" and new != current else [])
+        if choices:
+            options.append(choices)
+    return options
+
+
+class _Scorer:
+    """Scores lists of change sets against one profile, one batch per call."""
+
+    def __init__(self, profile, segment, pipeline, telescopic):
+        import pandas as pd
+
+        self.segment = segment
+        self.pipeline = pipeline
+        self.telescopic = telescopic
+        self.base = pd.DataFrame([{c: profile[c] for c in pipeline.feature_names}])
+        self.scored = 0
+
+    def __call__(self, change_sets):
+        frame = self.base.iloc[np.zeros(len(change_sets), dtype=np.intp)].reset_index(drop=True)
+        for column in {change[1] for changes in change_sets for change in changes}:
+            values = frame[column].to_numpy(dtype=object).copy()
+            for i, changes in enumerate(change_sets):
+                for _, changed, value, _ in changes:
+                    if changed == column:
+                        values[i] = value
+            frame[column] = values if frame[column].dtype == object else values.astype(np.float64)
+
+        kwh = np.asarray(self.pipeline.predict(monthly_features(frame, self.segment, self.pipeline)))
+        cost = np.asarray(estimate_cost_batch(kwh, frame["State"].to_numpy(), self.segment,
+                                              telescopic=self.telescopic), dtype=np.float64)
+        self.scored += len(change_sets)
+        return kwh, cost
+
+
+def optimize_savings(profile, segment, k=DEFAULT_TOP_K, max_reduction=DEFAULT_MAX_REDUCTION, limits=None,
+                     floors=None, switches=True, max_changes=DEFAULT_MAX_CHANGES, beam=DEFAULT_BEAM,
+                     registry=None, telescopic=False):
+    """
+    Top `k` appliance change sets for one profile (weekly inputs, as the
+    module builds it), ranked by rupees saved on the monthly bill.
+    """
+    started = time.perf_counter()
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    scorer = _Scorer(profile, segment, pipeline, telescopic)
+
+    options = action_options(profile, segment, max_reduction=max_reduction, limits=limits, floors=floors,
+                             switches=switches)
+
+    # Stage 1: the unchanged profile plus every single change
+    singles = [(a, (choice,)) for a, choices in enumerate(options) for choice in choices]
+    kwh, cost = scorer([()] + [changes for _, changes in singles])
+    base_kwh, base_cost = float(kwh[0]), float(cost[0])
+
+    best = {}   # frozenset of action indices -> (saving, kWh, cost, changes)
+
+    def keep(keys, change_sets, kwh, cost):
+        for key, changes, k_kwh, k_cost in zip(keys, change_sets, kwh, cost):
+            saving = base_cost - k_cost
+            # A combination has to save more than any set it contains one action fewer of
+            floor = max(best.get(key - {a}, (0.0,))[0] for a in key) if len(key) > 1 else 0.0
+            if saving > max(floor, best.get(key, (0.0,))[0]):
+                best[key] = (saving, float(k_kwh), float(k_cost), changes)
+
+    keep([frozenset([a]) for a, _ in singles], [c for _, c in singles], kwh[1:], cost[1:])
+    # Actions that save nothing alone are not combined further (pruned)
+    useful = {next(iter(key)) for key in best}
+    frontier = list(best)
+
+    for _ in range(max_changes - 1):
+        frontier = sorted(frontier, key=lambda key: best[key][0], reverse=True)[:beam]
+        keys, change_sets = [], []
+        for key in frontier:
+            for a in sorted(useful - key):
+                for choice in options[a]:
+                    keys.append(key | {a})
+                    change_sets.append(best[key][3] + (choice,))
+        if not change_sets:
+            break
+        before = set(best)
+        keep(keys, change_sets, *scorer(change_sets))
+        frontier = [key for key in set(keys) if key in best and key not in before]
+
+    ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)[:k]
+    return {
+        "segment": segment,
+        "base_kwh": base_kwh,
+        "base_cost": base_cost,
+        "candidates_scored": scorer.scored,
+        "seconds": time.perf_counter() - started,
+        "suggestions": [
+            {
+                "changes": [{"label": label, "column": column, "from": profile[column], "to": value}
+                            for label, column, value, _ in changes],
+                "description": "; ".join(text for *_, text in changes),
+                "Predicted_kWh": k_kwh,
+                "Estimated_Cost": k_cost,
+                "kwh_saved": base_kwh - k_kwh,
+                "rupees_saved": saving,
+            }
+            for saving, k_kwh, k_cost, changes in ranked
+        ],
+    }
@@ -0,0 +1,53 @@
+"""
+Choices offered by the st.selectbox widgets of each module.
+
+Keyed by the DataFrame column each widget feeds, so the app, the fast
+encoder checks and the benchmarks all use the same lists.
+"""
+
+
+SELECT_OPTIONS = {
+    "Homes": {
+        "State": ['Delhi', 'Gujarat', 'Maharashtra', 'Karnataka', 'Tamil Nadu', 'West Bengal', 'Others'],
+        "City": ['Mumbai', 'Bengaluru', 'Ahmedabad', 'Chennai', 'Delhi', 'Pune', 'Kolkata', 'Others'],
+        "Weather/Season": ['Monsoon', 'Summer', 'Winter'],
+        "Home_Type": ['Apartment', 'Row House', 'Bungalow'],
+        "Electricity_Tariff_Type": ['LT-1'],
+        "AC_Type": ['None', 'Split AC', 'Window AC', 'Inverter AC'],
+        "Fan_Type": ['Crompton', 'Bajaj', 'Polycab', 'Havells', 'None'],
+        "Refrigerator_Type": ['Double Door 3★', 'Double Door 4★', 'Side-by-Side 5★', 'None', 'Single Door 5★', 'Side-by-Side 4★', 'Single Door 4★', 'Single Door 3★', 'Double Door 5★'],
+        "TV_Type": ['LCD', 'SmartTV', 'LED', 'None'],
+        "Geyser_Type": ['15-25L', '30+L', 'None', '6-10L'],
+        "Washing_Machine_Type": ['12kg', '6kg', '7kg', '8kg', 'None', '10kg'],
+        "Washing_Machine_Age": ['Mid', 'New', 'Old', 'None'],
+    },
+    "Shops": {
+        "State": ['Maharashtra', 'Others', 'Delhi', 'West Bengal', 'Karnataka', 'Tamil Nadu', 'Gujarat'],
+        "City": ['Kolhapur', 'Others', 'Mumbai', 'Pune', 'Bengaluru', 'Aurangabad', 'Nagpur', 'Chennai', 'Solapur', 'Delhi', 'Ahmedabad', 'Kolkata', 'Nashik'],
+        "Weather/Season": ['Monsoon', 'Summer', 'Winter'],
+        "Shop_Type": ['Bakery/SweetShop', 'Medicals', 'Clothing/Footwear', 'Grocery'],
+        "Shop_Scale": ['Large', 'Small', 'Medium'],
+        "Electricity_Tariff_Type": ['LT-2'],
+        "AC_Type": ['Split AC', 'None', 'Window AC', 'Inverter AC'],
+        "Fan_Type": ['Crompton', 'Bajaj', 'Havells', 'None', 'Polycab'],
+        "Refrigerator_Type_1": ['Display Cooler (Double Door)', 'None', 'Display Cooler (Single Door)'],
+        "Refrigerator_Type_2": ['Deep Freezer (Single Lid)', 'Deep Freezer (Double Lid)', 'None'],
+        "Lights_Type": ['Tube Light', 'LED', 'CFL'],
+        "Billing_System/PC_Type": ['HP', 'Dell', 'None', 'Lenovo'],
+    },
+    "Offices": {
+        "State": ['Delhi', 'Karnataka', 'Gujarat', 'Maharashtra', 'Others', 'Tamil Nadu', 'West Bengal'],
+        "City": ['New Delhi', 'Mysuru', 'Surat', 'Pune', 'Others', 'Ahmedabad', 'Bengaluru', 'Nagpur', 'Mumbai', 'Coimbatore', 'Chennai', 'Kolkata'],
+        "Weather/Season": ['Winter', 'Summer', 'Monsoon'],
+        "Office_Type": ['Startup', 'IT/Corporate', 'Government_Office'],
+        "Office_Scale": ['Medium', 'Small', 'Large'],
+        "Electricity_Tariff_Type": ['LT-2 (Commercial)'],
+        "AC_Type": ['Split AC', 'Inverter AC', 'Window AC', 'None'],
+        "Fan_Type": ['Bajaj', 'Crompton', 'Havells', 'None', 'Polycab'],
+        "Lights_Type": ['CFL', 'LED', 'Tube Light'],
+        "PC_Type": ['Laptop', 'Desktop'],
+        "Refrigerator_Type": ['Double Door 3★', 'Double Door 4★', 'Side-by-Side 5★', 'None', 'Single Door 5★', 'Side-by-Side 4★', 'Single Door 4★', 'Single Door 3★', 'Double Door 5★'],
+        "Printer_Type": ['Sony', 'HP', 'Canon'],
+        "Projector_Type": ['Sony', 'Epson'],
+    },
+}
@@ -0,0 +1,85 @@
+"""
+Multi-core batch scoring on a process pool.
+
+The segment pipeline is loaded in the parent before the pool starts. On
+platforms with fork the workers inherit it, sharing the model's array pages
+copy-on-write instead of unpickling one copy per worker; elsewhere (spawn)
+each worker loads it once in its initializer.
+
+Chunks are scored in parallel but handed back strictly in input order, and
+at most `max_pending` chunks are in flight at any time: the reader blocks
+on the oldest result before reading further, so a 10M-row file never has
+more than a few chunks in memory.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+def default_workers():
+    """Worker processes used when none are asked for: one per CPU."""
+    return os.cpu_count() or 1
+
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def _init_worker(segment):
+    # Already loaded when forked; a stat() of the artifacts confirms it
+    default_registry.get(segment)
+
+
+def _score_chunk(chunk, segment, recommendations, intervals, schema=None):
+    if schema is not None:
+        from ecowatt.columnar import score_record_batch
+
+        return score_record_batch(chunk, segment, recommendations=recommendations, intervals=intervals,
+                                  schema=schema)
+
+    from ecowatt.batch import score_frame
+
+    return score_frame(chunk, segment, recommendations=recommendations, intervals=intervals)
+
+
+def score_chunks_parallel(chunks, segment, workers=None, max_pending=None, recommendations=True, intervals=False,
+                          columnar=False):
+    """
+    Score an iterable of DataFrames on `workers` processes.
+
+    Yields the scored chunks in the same order as `chunks`; at most
+    `max_pending` (default 2 x workers) are read ahead. With `columnar` the
+    workers return Arrow record batches, all with the first chunk's
+    ecowatt.columnar.result_schema().
+    """
+    segment = normalize_segment(segment)
+    workers = workers or default_workers()
+    max_pending = max_pending or 2 * workers
+
+    # Load before the pool forks so every worker shares these pages
+    default_registry.get(segment)
+
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_pool_context(),
+        initializer=_init_worker,
+        initargs=(segment,),
+    ) as pool:
+        schema = None
+        for chunk in chunks:
+            if columnar and schema is None:
+                from ecowatt.columnar import result_schema
+
+                schema = result_schema(chunk, segment, recommendations=recommendations, intervals=intervals)
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_score_chunk, chunk, segment, recommendations, intervals, schema))
+
+        while pending:
+            yield pending.popleft().result()
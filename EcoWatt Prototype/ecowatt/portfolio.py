@@ -0,0 +1,235 @@
+"""
+Multi-site portfolios of shops or offices with running rollups.
+
+A Portfolio keeps every site's weekly inputs and its latest Predicted_kWh,
+Estimated_Cost and Usage_Category, plus running totals per State, City,
+Shop_Type/Office_Type and Shop_Scale/Office_Scale: sites, kWh, cost and the
+number of sites in each usage category.
+
+Loading a portfolio scores it once and builds the totals with one groupby.
+After that, update_sites() only re-scores the sites it is given (one batch
+predict for all of them) and moves each one's old contribution out of its
+groups and the new one in, so a site whose City changed leaves the old city's
+totals and joins the new one's. Nothing else is re-scored or re-grouped.
+
+    portfolio = Portfolio.from_file("shops.csv", "shops")
+    portfolio.update_site("S-0042", {"Monthly_AC_Usage_Hours": 60})
+    portfolio.rollup("City")
+"""
+
+import numpy as np
+
+from ecowatt.batch import read_chunks, score_frame
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+GROUP_COLUMNS = {
+    "Shops": ("State", "City", "Shop_Type", "Shop_Scale"),
+    "Offices": ("State", "City", "Office_Type", "Office_Scale"),
+}
+
+USAGE_CATEGORIES = ("Low Usage", "Medium Usage", "High Usage")
+
+# Columns of a rollup, in the order of the running total vectors
+ROLLUP_COLUMNS = ("Sites", "Predicted_kWh", "Estimated_Cost") + USAGE_CATEGORIES
+
+SCORE_COLUMNS = ("Predicted_kWh", "Estimated_Cost", "Usage_Category")
+
+
+def _measures(rows):
+    """(n, len(ROLLUP_COLUMNS)) contribution of each scored row to its groups."""
+    category = rows["Usage_Category"].to_numpy()
+    return np.column_stack(
+        [np.ones(len(rows)), rows["Predicted_kWh"].to_numpy(dtype=np.float64),
+         rows["Estimated_Cost"].to_numpy(dtype=np.float64)]
+        + [(category == label).astype(np.float64) for label in USAGE_CATEGORIES]
+    )
+
+
+class Portfolio:
+    """Scored sites of one segment, indexed by Site_ID, with incremental rollups."""
+
+    def __init__(self, segment, registry=None):
+        segment = normalize_segment(segment)
+        if segment not in GROUP_COLUMNS:
+            raise ValueError(f"Portfolios are for {' and '.join(GROUP_COLUMNS)}, not {segment}")
+
+        self.segment = segment
+        self.group_columns = GROUP_COLUMNS[segment]
+        self.registry = registry or default_registry
+        self.sites = None
+        self.version = None
+        self.rescored = 0
+        self._totals = {column: {} for column in self.group_columns}
+
+    @classmethod
+    def from_frame(cls, frame, segment, registry=None):
+        """Portfolio of a DataFrame of weekly inputs; without a Site_ID column the row number is used."""
+        portfolio = cls(segment, registry=registry)
+        portfolio.load(frame)
+        return portfolio
+
+    @classmethod
+    def from_scored(cls, scored, segment, registry=None):
+        """Portfolio of score_frame() output, without scoring it again."""
+        from ecowatt.batch import RESULT_COLUMNS
+
+        portfolio = cls(segment, registry=registry)
+        extra = [c for c in RESULT_COLUMNS if c not in SCORE_COLUMNS and c in scored.columns]
+        portfolio.sites = portfolio._site_index(scored.drop(columns=extra))
+        portfolio.version = portfolio.registry.get(portfolio.segment).version
+        portfolio._rebuild()
+        return portfolio
+
+    @classmethod
+    def from_file(cls, source, segment, fmt=None, registry=None):
+        import pandas as pd
+
+        return cls.from_frame(pd.concat(list(read_chunks(source, fmt=fmt)), ignore_index=True),
+                              segment, registry=registry)
+
+    def __len__(self):
+        return 0 if self.sites is None else len(self.sites)
+
+    def _score(self, frame):
+        pipeline = self.registry.get(self.segment)
+        scored = score_frame(frame, self.segment, registry=self.registry, recommendations=False)
+        self.version = pipeline.version
+        self.rescored += len(frame)
+        return scored
+
+    @staticmethod
+    def _float_inputs(frame):
+        """Numeric input columns as float64: an update of 61.7 hours must not be stored as 61."""
+        numeric = [c for c in frame.columns
+                   if c not in SCORE_COLUMNS and frame[c].dtype.kind in "iuf" and frame[c].dtype != np.float64]
+        return frame.astype(dict.fromkeys(numeric, np.float64)) if numeric else frame
+
+    @classmethod
+    def _site_index(cls, frame):
+        frame = frame.copy()
+        if "Site_ID" in frame.columns:
+            frame = frame.set_index("Site_ID")
+        else:
+            frame.index = frame.index.rename("Site_ID")
+        if frame.index.duplicated().any():
+            raise ValueError("Portfolio has duplicate Site_ID values")
+        return cls._float_inputs(frame)
+
+    def load(self, frame):
+        """Score every site and rebuild the totals from scratch."""
+        self.sites = self._score(self._site_index(frame))
+        self._rebuild()
+        return self
+
+    def _rebuild(self):
+        measures = _measures(self.sites)
+        for column in self.group_columns:
+            sums = (
+                self.sites[[column]]
+                .assign(**{name: measures[:, i] for i, name in enumerate(ROLLUP_COLUMNS)})
+                .groupby(column, sort=False)[list(ROLLUP_COLUMNS)].sum()
+            )
+            self._totals[column] = dict(zip(sums.index, sums.to_numpy()))
+
+    def _apply(self, rows, sign):
+        """Add (sign=1) or remove (sign=-1) scored rows' contributions to the running totals."""
+        measures = sign * _measures(rows)
+        for column in self.group_columns:
+            totals = self._totals[column]
+            for value, contribution in zip(rows[column].to_numpy(), measures):
+                total = totals.get(value)
+                if total is None:
+                    totals[value] = contribution.copy()
+                    continue
+                total += contribution
+                if total[0] <= 0:
+                    # Last site left the group; drop it with any float residue
+                    del totals[value]
+
+    @property
+    def stale(self):
+        """True when the models changed since the stored predictions were made."""
+        return self.sites is not None and self.registry.get(self.segment).version != self.version
+
+    def update_sites(self, changes):
+        """
+        Apply input changes for some sites and re-score only those.
+
+        `changes` is a DataFrame indexed by Site_ID (or with a Site_ID column),
+        or a dict {site_id: {column: value}}. Known sites may give only the
+        columns that changed; new sites need every input column. Returns the
+        re-scored rows.
+        """
+        import pandas as pd
+
+        if self.sites is None:
+            raise ValueError("Load the portfolio before updating it")
+        if self.stale:
+            # Every stored prediction is from the old models
+            self.load(self.sites.drop(columns=list(SCORE_COLUMNS)))
+
+        if isinstance(changes, dict):
+            changes = pd.DataFrame.from_dict(changes, orient="index")
+            changes.index.name = "Site_ID"
+        elif "Site_ID" in changes.columns:
+            changes = changes.set_index("Site_ID")
+        if changes.empty:
+            return self.sites.iloc[:0]
+
+        input_columns = self.sites.columns.drop(list(SCORE_COLUMNS))
+        unknown = [c for c in changes.columns if c not in input_columns]
+        if unknown:
+            raise ValueError(f"Unknown {self.segment} input columns: {unknown}")
+
+        known = changes.index.isin(self.sites.index)
+        # Given values win, the stored ones fill the rest; nothing is cast down to the stored dtypes
+        updated = changes[known].combine_first(self.sites.loc[changes.index[known], input_columns])
+        updated = updated.reindex(columns=input_columns)
+        new_sites = changes[~known].reindex(columns=input_columns)
+        missing = new_sites.columns[new_sites.isna().any()].tolist()
+        if missing:
+            raise ValueError(f"New sites are missing input columns: {missing}")
+
+        frame = pd.concat([updated, new_sites]) if len(new_sites) else updated
+        scored = self._score(self._float_inputs(frame))
+
+        self._apply(self.sites.loc[changes.index[known]], -1)
+        self._apply(scored, 1)
+
+        # Rows stay in place; new sites go to the end
+        self.sites.loc[changes.index[known]] = scored.loc[changes.index[known]]
+        if len(new_sites):
+            self.sites = pd.concat([self.sites, scored.loc[new_sites.index]])
+        return scored
+
+    def update_site(self, site_id, inputs):
+        """update_sites() for one site; returns its re-scored row as a dict."""
+        return self.update_sites({site_id: inputs}).iloc[0].to_dict()
+
+    def remove_sites(self, site_ids):
+        site_ids = [site_id for site_id in site_ids if site_id in self.sites.index]
+        self._apply(self.sites.loc[site_ids], -1)
+        self.sites = self.sites.drop(index=site_ids)
+
+    def rollup(self, column):
+        """Running totals per value of one group column, largest kWh first."""
+        import pandas as pd
+
+        if column not in self._totals:
+            raise ValueError(f"{self.segment} portfolios roll up by {list(self.group_columns)}, not {column!r}")
+
+        totals = self._totals[column]
+        table = pd.DataFrame(
+            np.array(list(totals.values())).reshape(-1, len(ROLLUP_COLUMNS)),
+            index=pd.Index(list(totals), name=column),
+            columns=list(ROLLUP_COLUMNS),
+        )
+        counts = ["Sites", *USAGE_CATEGORIES]
+        table[counts] = table[counts].round().astype(np.int64)
+        return table.sort_values("Predicted_kWh", ascending=False)
+
+    def total(self):
+        """Portfolio-wide totals (the sum of any one rollup)."""
+        table = self.rollup(self.group_columns[0])
+        return {column: table[column].sum().item() for column in ROLLUP_COLUMNS}
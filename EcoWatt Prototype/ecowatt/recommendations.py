@@ -0,0 +1,145 @@
+"""
+Appliance recommendations as a declarative rule table.
+
+Every rule fires when one usage input is above a threshold (optionally
+unless an appliance type is 'None'). A batch is evaluated as one NumPy mask
+per rule over whole columns and each row keeps only a small integer bitset
+(bit i = rule i of its segment fired); the text is looked up once per
+distinct bitset when it is displayed or written out.
+"""
+
+import numpy as np
+
+
+# get_appliance_recommendations() key -> input column holding that value
+RECOMMENDATION_FIELDS = {
+    "Homes": {
+        "Monthly_AC_Usage_Hours": "Monthly_AC_Usage_Hours",
+        "Refrigerator_Type": "Refrigerator_Type",
+        "Monthly_Refrigerator_Usage_Hours": "Refrigerator_Usage_Hrs_Monthly",
+        "Monthly_TV_Usage_Hours": "Monthly_TV_Usage_Hours",
+        "Monthly_Geyser_Usage_Minutes": "Monthly_Geyser_Usage_Minutes",
+        "Monthly_Washing_Machine_Usage_Cycles": "Monthly_Washing_Machine_Usage_Cycles",
+    },
+    "Shops": {
+        "Monthly_AC_Usage_Hours": "Monthly_AC_Usage_Hours",
+        "Monthly_Refrigerator_Usage_Hours_Type_1": "Monthly_Refrigerator_Usage_Hours_Type_1",
+        "Monthly_Refrigerator_Usage_Hours_Type_2": "Monthly_Refrigerator_Usage_Hours_Type_2",
+        "Monthly_Light_Usage_Hours": "Monthly_Lights_Usage_Hours",
+        "Monthly_PC_Usage_Hours": "Monthly_PC_Usage_Hours",
+    },
+    "Offices": {
+        "Monthly_AC_Usage_Hours": "Monthly_AC_Usage_Hours",
+        "Monthly_Lights_Usage_Hours": "Monthly_Lights_Usage_Hours",
+        "Monthly_PC_Usage_Hours": "Monthly_PC_Usage_Hours",
+        "Monthly_Printer_Usage_Minutes": "Monthly_Printer_Usage_Minutes",
+        "Monthly_Projector_Usage_Hours": "Monthly_Projector_Usage_Hours",
+    },
+}
+
+# Per segment, in display order: (rule ID, input key, fires above, skip if this key is 'None', text)
+RECOMMENDATION_RULES = {
+    "Homes": [
+        ("H-AC", "Monthly_AC_Usage_Hours", 150, None,
+         "❄️ **AC:** Clean filters regularly and maintain 24°C for better efficiency."),
+        ("H-FRIDGE", "Monthly_Refrigerator_Usage_Hours", 160, "Refrigerator_Type",
+         "🧊 **Refrigerator:** Ensure good ventilation and avoid frequent door openings."),
+        ("H-TV", "Monthly_TV_Usage_Hours", 100, None,
+         "📺 **TV:** Turn off completely instead of standby to save energy."),
+        ("H-GEYSER", "Monthly_Geyser_Usage_Minutes", 300, None,
+         "🚿 **Geyser:** Install a timer to limit unnecessary heating time."),
+        ("H-WASHER", "Monthly_Washing_Machine_Usage_Cycles", 20, None,
+         "👕 **Washing Machine:** Use full loads and prefer cold water cycles."),
+    ],
+    "Shops": [
+        ("S-AC", "Monthly_AC_Usage_Hours", 200, None,
+         "❄️ **AC:** Maintain 24–26°C and clean filters weekly for optimal performance."),
+        ("S-FRIDGE-1", "Monthly_Refrigerator_Usage_Hours_Type_1", 250, None,
+         "🧊 **Refrigerator_Type_1:** Defrost regularly and keep 6 inches away from walls."),
+        ("S-FRIDGE-2", "Monthly_Refrigerator_Usage_Hours_Type_2", 250, None,
+         "🧊 **Refrigerator_Type_2:** Defrost regularly and keep 6 inches away from walls."),
+        ("S-LIGHTS", "Monthly_Light_Usage_Hours", 250, None,
+         "💡 **Lighting:** Replace old bulbs with LEDs or motion sensors."),
+        ("S-PC", "Monthly_PC_Usage_Hours", 200, None,
+         "🖥️ **Billing PC:** Enable sleep mode and shut down after hours."),
+    ],
+    "Offices": [
+        ("O-AC", "Monthly_AC_Usage_Hours", 300, None,
+         "❄️ **AC:** Use centralized scheduling or smart thermostats."),
+        ("O-LIGHTS", "Monthly_Lights_Usage_Hours", 300, None,
+         "💡 **Lighting:** Utilize daylight and motion-based lighting."),
+        ("O-PC", "Monthly_PC_Usage_Hours", 400, None,
+         "💻 **Computers:** Enable sleep mode after 10 minutes of inactivity."),
+        ("O-PRINTER", "Monthly_Printer_Usage_Minutes", 500, None,
+         "🖨️ **Printer:** Use duplex printing and turn off when idle."),
+        ("O-PROJECTOR", "Monthly_Projector_Usage_Hours", 100, None,
+         "📽️ **Projector:** Use Eco Mode and power off when not needed."),
+    ],
+}
+
+# Shown when no rule fires (bitset 0)
+EFFICIENT_MESSAGE = "🌿 Your energy usage looks efficient across all appliances. Great job!"
+
+USAGE_MESSAGES = {
+    "Low Usage": "✅ Great job! Keep maintaining your efficient energy usage.",
+    "Medium Usage": "⚠️ Moderate consumption. Try using appliances more efficiently.",
+    "High Usage": "🚨 High energy consumption! Consider using power-saving devices or scheduling usage.",
+}
+
+# Rule bitsets fit in this dtype (up to 16 rules per segment)
+BITS_DTYPE = np.uint16
+
+
+def rule_bits_one(user_inputs, segment):
+    """Bitset of the rules that fire for one row given by recommendation keys."""
+    bits = 0
+    for i, (_, key, above, unless_none, _) in enumerate(RECOMMENDATION_RULES[segment]):
+        if unless_none is not None and user_inputs[unless_none] == "None":
+            continue
+        if user_inputs[key] > above:
+            bits |= 1 << i
+    return bits
+
+
+def rule_bits(frame, segment):
+    """Bitset per row of a DataFrame of input columns, one mask per rule."""
+    fields = RECOMMENDATION_FIELDS[segment]
+    bits = np.zeros(len(frame), dtype=BITS_DTYPE)
+    for i, (_, key, above, unless_none, _) in enumerate(RECOMMENDATION_RULES[segment]):
+        fired = np.asarray(frame[fields[key]], dtype=np.float64) > above
+        if unless_none is not None:
+            fired &= np.asarray(frame[fields[unless_none]], dtype=object) != "None"
+        bits |= fired.astype(BITS_DTYPE) << BITS_DTYPE(i)
+    return bits
+
+
+def rule_ids(bits, segment):
+    """Rule IDs set in one bitset, e.g. ['H-AC', 'H-TV']."""
+    return [rule[0] for i, rule in enumerate(RECOMMENDATION_RULES[segment]) if int(bits) >> i & 1]
+
+
+def expand(bits, segment):
+    """Recommendation texts for one bitset (the efficient message for 0)."""
+    texts = [rule[4] for i, rule in enumerate(RECOMMENDATION_RULES[segment]) if int(bits) >> i & 1]
+    return texts or [EFFICIENT_MESSAGE]
+
+
+def expand_batch(bits, segment, separator):
+    """
+    Joined texts for an array of bitsets as a pandas Categorical: each
+    distinct bitset is expanded once and rows only hold a small code.
+    """
+    import pandas as pd
+
+    unique_bits, codes = np.unique(np.asarray(bits), return_inverse=True)
+    texts = [separator.join(expand(b, segment)) for b in unique_bits]
+    return pd.Categorical.from_codes(codes.reshape(-1), categories=texts)
+
+
+def usage_messages_batch(usage_types):
+    """USAGE_MESSAGES for an array of usage labels, as a pandas Categorical."""
+    import pandas as pd
+
+    labels = list(USAGE_MESSAGES)
+    categories = pd.Categorical(usage_types, categories=labels)
+    return pd.Categorical.from_codes(categories.codes, categories=[USAGE_MESSAGES[label] for label in labels])
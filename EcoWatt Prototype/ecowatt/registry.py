@@ -0,0 +1,386 @@
+"""
+Process-wide registry for the EcoWatt segment models.
+
+Each segment (Homes / Shops / Offices) is unpickled the first time it is asked
+for and then shared by every Streamlit session running in the process.
+Artifacts are read again only when one of the pickles actually changes on disk.
+
+If `python -m ecowatt compile-artifacts` has written a matching bundle to
+Compiled_Models/, the segment is served from its memory-mapped arrays and
+the pickles are only unpickled if something asks for the sklearn objects.
+"""
+
+import hashlib
+import os
+import threading
+import warnings
+from pathlib import Path
+
+from ecowatt.timing import stage
+
+
+# Artifacts live next to App.py; ECOWATT_ARTIFACT_DIR overrides that for deployments
+BASE_DIR = Path(os.environ.get("ECOWATT_ARTIFACT_DIR", Path(__file__).resolve().parent.parent))
+
+SEGMENT_ARTIFACTS = {
+    "Homes": (
+        "Models/Best_Model_EcoWatt_Homes (1).pkl",
+        "Preprocessing_Models/Preprocessing_EcoWatt_Homes (1).pkl",
+    ),
+    "Shops": (
+        "Models/Best_Model_EcoWatt_Shops.pkl",
+        "Preprocessing_Models/Preprocessing_EcoWatt_Shops.pkl",
+    ),
+    "Offices": (
+        "Models/Best_Model_EcoWatt_Office.pkl",
+        "Preprocessing_Models/Preprocessing_EcoWatt_Office.pkl",
+    ),
+}
+
+SEGMENT_ALIASES = {
+    "home": "Homes",
+    "homes": "Homes",
+    "shop": "Shops",
+    "shops": "Shops",
+    "office": "Offices",
+    "offices": "Offices",
+}
+
+
+def normalize_segment(segment):
+    """
+    Map 'homes', 'Shop', '🏢 EcoWatt Offices' ... to the canonical segment name.
+    """
+    if segment in SEGMENT_ARTIFACTS:
+        return segment
+
+    words = str(segment).strip().split()
+    key = words[-1].lower() if words else ""
+    if key not in SEGMENT_ALIASES:
+        raise ValueError(f"Unknown EcoWatt segment: {segment!r}")
+
+    return SEGMENT_ALIASES[key]
+
+
+def file_signature(paths):
+    """Cheap change detector: (mtime, size) of every artifact file."""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def file_digest(paths):
+    """Content hash of the artifact files, used as the model version."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class SegmentPipeline:
+    """
+    Loaded model + preprocessor for one segment.
+
+    `forest` is the PackedForest version of the model (None for non-tree
+    models); small batches are predicted through it. `encoder` is the
+    FastEncoder compiled from the preprocessor (None if it cannot be
+    mirrored), used in place of preprocessor.transform. With a `cache`
+    (PredictionCache) single sites and micro-batches reuse earlier
+    predictions for identical feature rows.
+
+    When built from a compiled bundle, model and preprocessor are None and
+    `load_pickles` is called the first time either attribute is used;
+    until then every batch size goes through the memory-mapped forest.
+    """
+
+    def __init__(self, segment, model, preprocessor, version, signature, forest=None, encoder=None,
+                 cache=None, load_pickles=None):
+        self.segment = segment
+        self._model = model
+        self._preprocessor = preprocessor
+        self._load_pickles = load_pickles
+        self._pickle_lock = threading.Lock()
+        self.version = version
+        self.signature = signature
+        self.forest = forest
+        self.encoder = encoder
+        self.cache = cache
+        if encoder is not None:
+            self.feature_names = list(encoder.feature_names)
+        else:
+            self.feature_names = list(preprocessor.feature_names_in_)
+
+    def _ensure_pickles(self):
+        if self._model is None:
+            with self._pickle_lock:
+                if self._model is None:
+                    model, self._preprocessor = self._load_pickles()
+                    self._model = model
+
+    @property
+    def model(self):
+        self._ensure_pickles()
+        return self._model
+
+    @property
+    def preprocessor(self):
+        self._ensure_pickles()
+        return self._preprocessor
+
+    @property
+    def pickles_loaded(self):
+        return self._model is not None
+
+    def transform(self, monthly_data):
+        """Encode monthly rows (DataFrame, or a dict for one row) for the model."""
+        with stage("transform", self.segment):
+            if self.encoder is not None:
+                return self.encoder.transform(monthly_data)
+            if isinstance(monthly_data, dict):
+                import pandas as pd
+
+                monthly_data = pd.DataFrame([monthly_data])
+            return self.preprocessor.transform(monthly_data)
+
+    def predict_transformed(self, X):
+        """Predict monthly kWh for rows that already went through the preprocessor."""
+        from ecowatt.forest import FOREST_MAX_ROWS
+
+        with stage("predict", self.segment):
+            if self.forest is not None and (len(X) <= FOREST_MAX_ROWS or self._model is None):
+                return self.forest.predict(X)
+            return self.model.predict(X)
+
+    def _predict_interval(self, monthly_data, percentiles=None):
+        from ecowatt.forest import INTERVAL_PERCENTILES
+
+        X = self.transform(monthly_data)
+        with stage("predict_interval", self.segment):
+            if self.forest is None:
+                kwh_pred = self.model.predict(X)
+                return kwh_pred, kwh_pred, kwh_pred
+            return self.forest.predict_interval(X, percentiles or INTERVAL_PERCENTILES)
+
+    def predict_interval(self, monthly_data, percentiles=None):
+        """
+        (kWh, low, high) arrays for monthly rows, low/high being percentiles of
+        the per-tree predictions (INTERVAL_PERCENTILES by default). Models
+        without trees get a zero-width interval. Default intervals of single
+        sites and micro-batches go through the cache like predict().
+        """
+        from ecowatt.cache import CACHE_MAX_ROWS, row_keys
+
+        n_rows = 1 if isinstance(monthly_data, dict) else len(monthly_data)
+        if self.cache is None or n_rows > CACHE_MAX_ROWS or percentiles is not None:
+            return self._predict_interval(monthly_data, percentiles)
+
+        import numpy as np
+
+        keys = [(self.segment, self.version, row) for row in row_keys(monthly_data, self.feature_names)]
+        values = [self.cache.get(key) for key in keys]
+        # An entry holds the kWh alone until an interval is asked for, then the (kWh, low, high) triple
+        missing = [i for i, value in enumerate(values) if not isinstance(value, tuple)]
+        if missing:
+            rows = monthly_data if len(missing) == n_rows else monthly_data.iloc[missing]
+            for i, triple in zip(missing, zip(*self._predict_interval(rows))):
+                values[i] = tuple(float(value) for value in triple)
+                self.cache.put(keys[i], values[i])
+        kwh_pred, low, high = (np.asarray(column, dtype=np.float64) for column in zip(*values))
+        return kwh_pred, low, high
+
+    def predict(self, monthly_data):
+        """Predict monthly kWh for already aggregated (monthly) rows."""
+        from ecowatt.cache import CACHE_MAX_ROWS, row_keys
+
+        n_rows = 1 if isinstance(monthly_data, dict) else len(monthly_data)
+        if self.cache is None or n_rows > CACHE_MAX_ROWS:
+            return self.predict_transformed(self.transform(monthly_data))
+
+        import numpy as np
+
+        keys = [(self.segment, self.version, row) for row in row_keys(monthly_data, self.feature_names)]
+        values = [self.cache.get(key) for key in keys]
+        values = [value[0] if isinstance(value, tuple) else value for value in values]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            rows = monthly_data if len(missing) == n_rows else monthly_data.iloc[missing]
+            for i, value in zip(missing, self.predict_transformed(self.transform(rows))):
+                values[i] = value
+                self.cache.put(keys[i], value)
+        return np.asarray(values, dtype=np.float64)
+
+    def __repr__(self):
+        return f"SegmentPipeline({self.segment!r}, version={self.version!r})"
+
+
+class ModelRegistry:
+    """
+    Lazily loads each segment once and hands the same objects to every caller.
+
+    `get` is thread safe. A stat() of the two artifact files is done on every
+    call; if mtime/size moved, the files are hashed and only reloaded when the
+    content is really different.
+    """
+
+    def __init__(self, base_dir=None, artifacts=None, cache=None, use_compiled=True):
+        from ecowatt.cache import make_cache
+
+        self.base_dir = Path(base_dir) if base_dir is not None else BASE_DIR
+        self.artifacts = dict(artifacts or SEGMENT_ARTIFACTS)
+        # Prefer Compiled_Models/ bundles (memory-mapped) when they match the pickles
+        self.use_compiled = use_compiled
+        # Prediction cache shared by all sessions; pass cache=False to disable
+        self.cache = make_cache() if cache is None else (cache or None)
+        self._pipelines = {}
+        self._locks = {segment: threading.Lock() for segment in self.artifacts}
+        self._prewarm_thread = None
+        self._prewarm_lock = threading.Lock()
+
+    def paths(self, segment):
+        """Absolute (model, preprocessor) paths for a segment."""
+        segment = normalize_segment(segment)
+        return tuple(self.base_dir / name for name in self.artifacts[segment])
+
+    def get(self, segment):
+        """Return the SegmentPipeline for a segment, loading it if needed."""
+        segment = normalize_segment(segment)
+        paths = self.paths(segment)
+
+        pipeline = self._pipelines.get(segment)
+        if pipeline is not None and pipeline.signature == file_signature(paths):
+            return pipeline
+
+        with self._locks[segment]:
+            # Another thread may have finished the load while we waited
+            pipeline = self._pipelines.get(segment)
+            signature = file_signature(paths)
+            if pipeline is not None and pipeline.signature == signature:
+                return pipeline
+
+            version = file_digest(paths)
+            if pipeline is not None and pipeline.version == version:
+                # Touched but not changed, no need to unpickle again
+                pipeline.signature = signature
+                return pipeline
+
+            with stage("load", segment):
+                pipeline = self._load_compiled(segment, paths, version, signature)
+                if pipeline is None:
+                    model, preprocessor = self._load_pickles(paths)
+                    forest, encoder = self._compile(model, preprocessor)
+                    pipeline = SegmentPipeline(segment, model, preprocessor, version, signature, forest, encoder,
+                                               self.cache)
+            self._pipelines[segment] = pipeline
+            if self.cache is not None:
+                # Entries of the old model could never hit again; free the room
+                self.cache.invalidate(segment, keep_version=version)
+
+        return pipeline
+
+    @staticmethod
+    def _load_pickles(paths):
+        # joblib (and sklearn through the pickles) only load on first use
+        import joblib
+
+        return joblib.load(paths[0]), joblib.load(paths[1])
+
+    @staticmethod
+    def _compile(model, preprocessor):
+        from ecowatt.encoder import compile_encoder
+        from ecowatt.forest import compile_model
+
+        return compile_model(model), compile_encoder(preprocessor)
+
+    def _load_compiled(self, segment, paths, version, signature):
+        """Pipeline backed by the memory-mapped bundle, or None if there is no valid one."""
+        from ecowatt.artifacts import StaleArtifact, bundle_path, load_bundle
+
+        directory = bundle_path(self.base_dir, segment)
+        if not self.use_compiled or not directory.exists():
+            return None
+        try:
+            forest, encoder, _ = load_bundle(directory, version)
+        except (OSError, ValueError, KeyError) as exc:
+            if not isinstance(exc, StaleArtifact):
+                warnings.warn(f"Ignoring unreadable compiled artifacts in {directory}: {exc}")
+            return None
+        return SegmentPipeline(segment, None, None, version, signature, forest, encoder, self.cache,
+                               load_pickles=lambda: self._load_pickles(paths))
+
+    def compile_artifacts(self, segments=None, float32=False):
+        """
+        Write Compiled_Models/EcoWatt_<segment>/ for each segment; returns the
+        directories. float32 writes the compacted (narrow) forest arrays.
+        """
+        from ecowatt.artifacts import bundle_path, write_bundle
+
+        written = []
+        for segment in segments or self.artifacts:
+            segment = normalize_segment(segment)
+            paths = self.paths(segment)
+            model, preprocessor = self._load_pickles(paths)
+            forest, encoder = self._compile(model, preprocessor)
+            if forest is None or encoder is None:
+                continue
+            if float32:
+                forest = forest.compact()
+            pipeline = SegmentPipeline(segment, model, preprocessor, file_digest(paths), file_signature(paths),
+                                       forest, encoder)
+            written.append(write_bundle(pipeline, bundle_path(self.base_dir, segment)))
+        return written
+
+    def loaded(self):
+        """Segments that are currently held in memory."""
+        return sorted(self._pipelines)
+
+    def clear(self):
+        """Drop every loaded pipeline (and cached prediction); the next get() loads from disk again."""
+        self._pipelines.clear()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def prewarm(self, segments=None, background=True):
+        """
+        Load segments ahead of the first request.
+
+        With background=True this starts (at most one) daemon thread and
+        returns it, so Streamlit can call it on every rerun for free.
+        """
+        segments = [normalize_segment(s) for s in (segments or self.artifacts)]
+
+        if not background:
+            for segment in segments:
+                self.get(segment)
+            return None
+
+        with self._prewarm_lock:
+            if self._prewarm_thread is None:
+                self._prewarm_thread = threading.Thread(
+                    target=self._prewarm_worker,
+                    args=(segments,),
+                    name="ecowatt-prewarm",
+                    daemon=True,
+                )
+                self._prewarm_thread.start()
+            return self._prewarm_thread
+
+    def _prewarm_worker(self, segments):
+        for segment in segments:
+            try:
+                self.get(segment)
+            except Exception:
+                # A broken artifact should surface on the real request, not here
+                pass
+
+
+# Shared by every session in the process
+registry = ModelRegistry()
+
+
+def get_pipeline(segment):
+    """Shortcut for registry.get(segment)."""
+    return registry.get(segment)
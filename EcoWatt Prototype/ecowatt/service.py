@@ -0,0 +1,251 @@
+"""
+Local HTTP/JSON scoring service (standard library only).
+
+    POST /predict/homes    {"State": "Delhi", "City": "Delhi", ...}
+    POST /predict/shops    [{...}, {...}]
+    GET  /metrics          latency and batch-size histograms
+    GET  /metrics/prometheus   per-stage timings (with ECOWATT_TIMING=1)
+    GET  /health
+
+Concurrent requests for a segment are collected into micro-batches that are
+flushed after `max_wait` seconds or once `max_batch_size` rows are waiting,
+so each batch pays for one preprocessor.transform + model.predict call.
+
+Run it with `python -m ecowatt serve --port 8765`.
+"""
+
+import json
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ecowatt.registry import SEGMENT_ARTIFACTS, normalize_segment, registry as default_registry
+from ecowatt.timing import stage, timings
+
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """Fixed-bucket histogram (upper bounds inclusive), safe to share between threads."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+class MicroBatcher:
+    """
+    Collects single-site requests for one segment and scores them together.
+
+    submit() returns a Future; a background thread fills batches of up to
+    `max_batch_size` rows, waiting at most `max_wait` seconds after the first
+    row of a batch arrived.
+    """
+
+    def __init__(self, segment, registry=None, max_batch_size=64, max_wait=0.005, batch_sizes=None):
+        self.segment = normalize_segment(segment)
+        self.registry = registry or default_registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes = batch_sizes or Histogram(BATCH_SIZE_BUCKETS)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"ecowatt-batcher-{self.segment}", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_inputs):
+        future = Future()
+        self._queue.put((user_inputs, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batch_sizes.observe(len(batch))
+            try:
+                results = self._score([user_inputs for user_inputs, _ in batch])
+            except Exception:
+                # One bad row must not fail its neighbours: retry them one by one
+                for user_inputs, future in batch:
+                    try:
+                        future.set_result(self._score([user_inputs])[0])
+                    except Exception as exc:
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _score(self, rows):
+        from ecowatt.batch import RECOMMENDATION_SEPARATOR, score_frame
+        from ecowatt.core import to_frame
+
+        with stage("score_batch", self.segment):
+            scored = score_frame(to_frame(rows), self.segment, registry=self.registry, intervals=True)
+        return [
+            {
+                "Segment": self.segment,
+                "Predicted_kWh": float(row.Predicted_kWh),
+                "Estimated_Cost": float(row.Estimated_Cost),
+                "Predicted_kWh_Low": float(row.Predicted_kWh_Low),
+                "Predicted_kWh_High": float(row.Predicted_kWh_High),
+                "Estimated_Cost_Low": float(row.Estimated_Cost_Low),
+                "Estimated_Cost_High": float(row.Estimated_Cost_High),
+                "Usage_Category": row.Usage_Category,
+                "Usage_Recommendation": row.Usage_Recommendation,
+                "Appliance_Recommendations": row.Appliance_Recommendations.split(RECOMMENDATION_SEPARATOR),
+            }
+            for row in scored.itertuples(index=False)
+        ]
+
+
+class ScoringService:
+    """One MicroBatcher per segment plus the request latency histogram."""
+
+    def __init__(self, registry=None, max_batch_size=64, max_wait=0.005, timeout=30.0):
+        self.registry = registry or default_registry
+        self.timeout = timeout
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.batchers = {
+            segment: MicroBatcher(segment, self.registry, max_batch_size, max_wait, self.batch_sizes)
+            for segment in SEGMENT_ARTIFACTS
+        }
+
+    def predict(self, segment, payload):
+        """Score one site (dict) or several (list of dicts)."""
+        batcher = self.batchers[normalize_segment(segment)]
+        if isinstance(payload, dict):
+            return batcher.submit(payload).result(self.timeout)
+        futures = [batcher.submit(row) for row in payload]
+        return [future.result(self.timeout) for future in futures]
+
+    def metrics(self):
+        return {
+            "request_latency_ms": self.latency_ms.snapshot(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "prediction_cache": self.registry.cache.stats() if self.registry.cache is not None else None,
+        }
+
+
+def make_handler(service):
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        server_version = "EcoWatt/1.0"
+
+        def _send_text(self, status, text):
+            data = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", "loaded": service.registry.loaded()})
+            elif self.path == "/metrics":
+                self._send_json(200, service.metrics())
+            elif self.path == "/metrics/prometheus":
+                self._send_text(200, timings.prometheus_text())
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            started = time.perf_counter()
+            parts = self.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] != "predict":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            try:
+                segment = normalize_segment(parts[1])
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+                if not isinstance(payload, (dict, list)):
+                    raise ValueError("Body must be a JSON object or a list of objects")
+                result = service.predict(segment, payload)
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            except Exception as exc:
+                self._send_json(500, {"error": str(exc)})
+                return
+            finally:
+                service.latency_ms.observe((time.perf_counter() - started) * 1000)
+
+            self._send_json(200, result)
+
+        def log_message(self, format, *args):
+            # Keep stderr quiet under load; /metrics is the place to look
+            pass
+
+    return ScoringHandler
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for bursts of concurrent clients (the socketserver default is 5)
+    request_queue_size = 256
+
+
+def serve(host="127.0.0.1", port=8765, max_batch_size=64, max_wait=0.005, registry=None, prewarm=True):
+    """Start the service and block until interrupted."""
+    service = ScoringService(registry=registry, max_batch_size=max_batch_size, max_wait=max_wait)
+    if prewarm:
+        service.registry.prewarm(background=False)
+
+    server = ScoringServer((host, port), make_handler(service))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,87 @@
+"""
+Model-driven what-if sweeps for the EcoWatt Simulator.
+
+Takes one Homes / Shops / Offices profile (weekly values, the same columns the
+modules build), varies one or two numeric inputs over a grid and scores the
+whole grid with a single predict call, billed with the profile state's tariff.
+"""
+
+import numpy as np
+
+from ecowatt.core import estimate_cost_batch, monthly_features
+from ecowatt.options import SELECT_OPTIONS
+from ecowatt.registry import normalize_segment, registry as default_registry
+
+
+# Grid points per axis offered by the app; 60 x 60 still renders interactively
+DEFAULT_STEPS = 25
+MAX_STEPS = 60
+
+
+def sweep_columns(segment, registry=None):
+    """Numeric input columns of a segment, i.e. the ones that can be swept."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    return [c for c in pipeline.feature_names if c not in SELECT_OPTIONS[segment]]
+
+
+def sweep_range(column):
+    """Default (min, max) of a sweep axis, in the weekly units the app asks for."""
+    name = column.lower()
+    if name.startswith("no_of"):
+        return 0, 10
+    if "minutes" in name:
+        return 0, 600
+    if "cycles" in name:
+        return 0, 30
+    if "working_hours" in name:
+        return 0, 100
+    return 0, 400
+
+
+def default_profile(segment, registry=None):
+    """What the module form submits untouched: first option of every selectbox, 0 elsewhere."""
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+    options = SELECT_OPTIONS[segment]
+    return {c: options[c][0] if c in options else 0 for c in pipeline.feature_names}
+
+
+def sweep(profile, segment, x_column, x_values, y_column=None, y_values=None,
+          registry=None, telescopic=False):
+    """
+    Predicted kWh and bill over a 1-D or 2-D grid around `profile`.
+
+    Returns a dict with the axis values and `kwh` / `cost` arrays of shape
+    (len(y_values), len(x_values)) (one row for a 1-D sweep).
+    """
+    import pandas as pd
+
+    segment = normalize_segment(segment)
+    pipeline = (registry or default_registry).get(segment)
+
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray([0.0] if y_column is None else y_values, dtype=np.float64)
+    grid_x, grid_y = np.meshgrid(x_values, y_values)
+
+    # One row per grid point; every other input keeps the profile's value
+    n_points = grid_x.size
+    columns = {c: np.repeat(np.asarray([profile[c]]), n_points) for c in pipeline.feature_names}
+    columns[x_column] = grid_x.ravel()
+    if y_column is not None:
+        columns[y_column] = grid_y.ravel()
+    grid = pd.DataFrame(columns)
+
+    kwh = pipeline.predict(monthly_features(grid, segment, pipeline))
+    cost = estimate_cost_batch(kwh, grid["State"].to_numpy(), segment, telescopic=telescopic)
+
+    shape = grid_x.shape
+    return {
+        "segment": segment,
+        "x_column": x_column,
+        "x": x_values,
+        "y_column": y_column,
+        "y": y_values if y_column is not None else None,
+        "kwh": np.asarray(kwh).reshape(shape),
+        "cost": np.asarray(cost, dtype=np.float64).reshape(shape),
+    }
@@ -0,0 +1,199 @@
+"""
+Table-driven electricity tariffs.
+
+The slab rates that used to live in the if/elif ladders of
+rule_based_cost_calculator / rule_based_cost_calculator_LT_2 are kept here as
+one schedule per tariff category. They are turned into NumPy arrays once, so
+a whole array of kWh values (and states) can be billed in a single call.
+
+Two billing modes are supported:
+- flat slab (default, what the app has always done): the rate of the slab the
+  total consumption falls in applies to every unit.
+- telescopic: each slab's rate only applies to the units inside that slab.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+
+DEFAULT_STATE = "Others"
+
+# Upper kWh limit of every slab except the last one, which is open ended
+SLAB_LIMITS = (100, 300)
+
+TARIFF_SCHEDULE = {
+    # Domestic connections
+    "LT-1": {
+        "fixed_charge": 120,
+        "slab_limits": SLAB_LIMITS,
+        "rates": {
+            "Maharashtra": (6.5, 8.2, 10.5),
+            "Gujarat": (6.0, 7.8, 9.8),
+            "Karnataka": (5.8, 7.5, 9.2),
+            "Tamil Nadu": (5.5, 7.0, 8.8),
+            "Delhi": (5.2, 6.8, 8.5),
+            "West Bengal": (6.0, 7.5, 9.0),
+            "Others": (6.0, 7.5, 9.5),
+        },
+    },
+    # Commercial connections generally have higher base charge
+    "LT-2": {
+        "fixed_charge": 200,
+        "slab_limits": SLAB_LIMITS,
+        "rates": {
+            "Maharashtra": (8.5, 10.0, 12.0),
+            "Gujarat": (8.0, 9.5, 11.0),
+            "Karnataka": (7.8, 9.0, 10.5),
+            "Tamil Nadu": (7.5, 8.8, 10.0),
+            "Delhi": (7.2, 8.5, 9.8),
+            "West Bengal": (7.8, 9.0, 10.8),
+            "Others": (8.0, 9.2, 11.0),
+        },
+    },
+}
+
+# Electricity_Tariff_Type values used by the app / notebooks
+CATEGORY_ALIASES = {
+    "LT-1": "LT-1",
+    "LT-2": "LT-2",
+    "LT-2 (Commercial)": "LT-2",
+}
+
+
+class TariffCategory:
+    """Slab limits, per-state rates and fixed charges of one tariff category."""
+
+    def __init__(self, name, slab_limits, rates, fixed_charge):
+        self.name = name
+        self.slab_limits = np.asarray(slab_limits, dtype=float)
+        self.rates = np.asarray(rates, dtype=float)                 # (n_states, n_slabs)
+        self.fixed_charges = np.asarray(fixed_charge, dtype=float)  # (n_states,)
+
+        # Python copies for the scalar path, so single bills stay bit-identical
+        # to the old calculators (round() vs np.round)
+        self._limits_list = [float(limit) for limit in slab_limits]
+        self._rates_list = [tuple(float(r) for r in row) for row in rates]
+        self._fixed_list = [float(f) for f in self.fixed_charges]
+
+        # Cost of all units below the start of each slab, for telescopic billing
+        lower_edges = np.concatenate(([0.0], self.slab_limits))
+        widths = np.diff(lower_edges)
+        self.lower_edges = lower_edges
+        self.cumulative = np.zeros_like(self.rates)
+        self.cumulative[:, 1:] = np.cumsum(self.rates[:, :-1] * widths, axis=1)
+
+
+class TariffTable:
+    """
+    State x tariff category lookup, built once from TARIFF_SCHEDULE.
+
+    States that are not in the schedule are billed like 'Others', exactly as
+    the else branch of the old calculators did.
+    """
+
+    def __init__(self, schedule=None, default_state=DEFAULT_STATE):
+        schedule = schedule or TARIFF_SCHEDULE
+        self.default_state = default_state
+
+        states = []
+        for spec in schedule.values():
+            for state in spec["rates"]:
+                if state not in states:
+                    states.append(state)
+        if default_state not in states:
+            raise ValueError(f"Tariff schedule has no rates for the default state {default_state!r}")
+
+        self.states = states
+        self.state_index = {state: i for i, state in enumerate(states)}
+        self.default_index = self.state_index[default_state]
+
+        self.categories = {}
+        for name, spec in schedule.items():
+            default_rates = spec["rates"][default_state]
+            rates = [spec["rates"].get(state, default_rates) for state in states]
+            fixed = spec["fixed_charge"]
+            if not isinstance(fixed, dict):
+                fixed = {state: fixed for state in states}
+            fixed_charges = [fixed.get(state, fixed[default_state]) for state in states]
+
+            if any(len(row) != len(spec["slab_limits"]) + 1 for row in rates):
+                raise ValueError(f"Tariff {name!r}: every state needs one rate per slab")
+
+            self.categories[name] = TariffCategory(name, spec["slab_limits"], rates, fixed_charges)
+
+    def category(self, category):
+        """TariffCategory for 'LT-1', 'LT-2', 'LT-2 (Commercial)' ..."""
+        name = CATEGORY_ALIASES.get(category, category)
+        try:
+            return self.categories[name]
+        except KeyError:
+            raise ValueError(f"Unknown tariff category: {category!r}") from None
+
+    def state_codes(self, states, size=None):
+        """Row index into the rate table for a state name or an array of them."""
+        if isinstance(states, str) or states is None:
+            code = self.state_index.get(states, self.default_index)
+            return np.full(size if size is not None else (), code, dtype=np.intp)
+
+        import pandas as pd
+
+        # factorize hashes each distinct state once instead of per row
+        codes, uniques = pd.factorize(np.asarray(states, dtype=object).ravel())
+        lookup = np.array(
+            [self.state_index.get(state, self.default_index) for state in uniques] + [self.default_index],
+            dtype=np.intp,
+        )
+        return lookup[codes]  # code -1 (missing state) picks the trailing default
+
+    def bill_one(self, kwh, state, category, telescopic=False):
+        """Monthly bill in ₹ for one kWh value."""
+        tariff = self.category(category)
+        row = self.state_index.get(state, self.default_index)
+        rates = tariff._rates_list[row]
+        slab = bisect_left(tariff._limits_list, kwh)
+
+        if telescopic:
+            lower = tariff.lower_edges[slab]
+            cost = float(tariff.cumulative[row, slab]) + (kwh - lower) * rates[slab]
+        else:
+            cost = kwh * rates[slab]
+
+        return round(cost + tariff._fixed_list[row], 2)
+
+    def bill(self, kwh, states, category, telescopic=False):
+        """
+        Vectorized monthly bill in ₹.
+
+        `kwh` is an array, `states` either one state name for every row or an
+        array of the same length.
+        """
+        tariff = self.category(category)
+        kwh = np.asarray(kwh, dtype=float)
+        rows = self.state_codes(states, size=kwh.shape)
+        if rows.shape != kwh.shape:
+            rows = rows.reshape(kwh.shape)
+
+        slab = np.searchsorted(tariff.slab_limits, kwh, side="left")
+        rate = tariff.rates[rows, slab]
+
+        if telescopic:
+            cost = tariff.cumulative[rows, slab] + (kwh - tariff.lower_edges[slab]) * rate
+        else:
+            cost = kwh * rate
+
+        return np.round(cost + tariff.fixed_charges[rows], 2)
+
+
+# Built once per process
+TARIFFS = TariffTable()
+
+
+def bill(kwh, states, category, telescopic=False):
+    """Shortcut for TARIFFS.bill()."""
+    return TARIFFS.bill(kwh, states, category, telescopic=telescopic)
+
+
+def bill_one(kwh, state, category, telescopic=False):
+    """Shortcut for TARIFFS.bill_one()."""
+    return TARIFFS.bill_one(kwh, state, category, telescopic=telescopic)
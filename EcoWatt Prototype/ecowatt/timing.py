@@ -0,0 +1,167 @@
+"""
+Per-stage timing hooks for the scoring pipelines and the app.
+
+    from ecowatt.timing import stage
+
+    with stage("transform", "Homes"):
+        X = pipeline.transform(monthly_data)
+
+Durations go into a rolling window per (segment, stage), summarised as
+p50/p95/p99 and exported in Prometheus text format. Recording is off unless
+ECOWATT_TIMING=1 is set or some app session has its diagnostics panel open
+(timings.enable_for(session_id, True); a session that goes quiet for
+SESSION_TTL seconds stops counting). While off, stage() hands back one shared
+no-op context manager, so a hook costs a function call and an attribute check.
+
+With ECOWATT_TIMING_FILE set, the app rewrites that file after every rerun,
+ready for a node_exporter textfile collector; the scoring service serves the
+same text on GET /metrics/prometheus.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+
+
+# Samples kept per (segment, stage) for the percentiles
+TIMING_WINDOW = 1024
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# A session that asked for timings and has not rerun for this long no longer keeps them on
+SESSION_TTL = 1800
+
+_NOOP = contextlib.nullcontext()
+
+
+class _StageTiming:
+    __slots__ = ("recorder", "key", "started")
+
+    def __init__(self, recorder, key):
+        self.recorder = recorder
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class StageTimings:
+    """
+    Rolling per-stage latency windows, shared by every thread.
+
+    Quantiles cover the last `window` samples; count and sum are totals since
+    the last reset, as Prometheus summaries expect.
+    """
+
+    def __init__(self, enabled=False, window=TIMING_WINDOW, clock=time.monotonic):
+        self.always = enabled
+        self.enabled = enabled
+        self.window = window
+        self.clock = clock
+        self._sessions = {}  # session id -> last time it asked for timings
+        self._samples = {}   # (segment, stage) -> deque of seconds
+        self._totals = {}    # (segment, stage) -> [count, sum]
+        self._lock = threading.Lock()
+
+    def enable_for(self, session_id, enabled):
+        """
+        Turn recording on or off for one session; it stays on while `always`
+        is set or any session asked for it within SESSION_TTL seconds.
+        """
+        with self._lock:
+            now = self.clock()
+            if enabled:
+                self._sessions[session_id] = now
+            else:
+                self._sessions.pop(session_id, None)
+            for other, seen in list(self._sessions.items()):
+                if now - seen > SESSION_TTL:
+                    del self._sessions[other]
+            self.enabled = self.always or bool(self._sessions)
+        return self.enabled
+
+    def stage(self, name, segment=""):
+        if not self.enabled:
+            return _NOOP
+        return _StageTiming(self, (segment, name))
+
+    def observe(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._totals[key] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def snapshot(self):
+        """[{segment, stage, count, sum_seconds, p50_ms, p95_ms, p99_ms}, ...] sorted by segment/stage."""
+        import numpy as np
+
+        with self._lock:
+            items = [(key, list(samples), list(self._totals[key])) for key, samples in self._samples.items()]
+
+        rows = []
+        for (segment, name), samples, (count, total) in sorted(items):
+            quantiles = np.quantile(samples, QUANTILES) * 1000
+            row = {"segment": segment, "stage": name, "count": count, "sum_seconds": total}
+            row.update({f"p{round(q * 100)}_ms": float(v) for q, v in zip(QUANTILES, quantiles)})
+            rows.append(row)
+        return rows
+
+    def prometheus_text(self, prefix="ecowatt_stage_seconds"):
+        """Prometheus text exposition (one summary, labelled by segment and stage)."""
+        lines = [
+            f"# HELP {prefix} Wall time of EcoWatt pipeline stages.",
+            f"# TYPE {prefix} summary",
+        ]
+        for row in self.snapshot():
+            labels = f'segment="{row["segment"]}",stage="{row["stage"]}"'
+            for q in QUANTILES:
+                seconds = row[f"p{round(q * 100)}_ms"] / 1000
+                lines.append(f'{prefix}{{{labels},quantile="{q}"}} {seconds:.9f}')
+            lines.append(f"{prefix}_sum{{{labels}}} {row['sum_seconds']:.9f}")
+            lines.append(f"{prefix}_count{{{labels}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically replace `path` with the current exposition."""
+        import tempfile
+
+        # A temp file of its own per writer: sessions and threads write concurrently
+        directory, name = os.path.split(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=f".{name}.",
+                                         suffix=".tmp", delete=False) as fh:
+            fh.write(self.prometheus_text())
+        try:
+            # mkstemp files are owner-only; the textfile collector may run as another user
+            os.chmod(fh.name, 0o644)
+            os.replace(fh.name, path)
+        except OSError:
+            os.unlink(fh.name)
+            raise
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Shared by every session in the process
+timings = StageTimings(enabled=os.environ.get("ECOWATT_TIMING", "") not in ("", "0"))
+
+TIMING_FILE = os.environ.get("ECOWATT_TIMING_FILE")
+
+
+def stage(name, segment=""):
+    """Context manager timing one stage (no-op while timings are disabled)."""
+    return timings.stage(name, segment)
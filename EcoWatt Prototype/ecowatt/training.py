@@ -0,0 +1,448 @@
+"""
+Headless retraining, the scripted version of Jupyter_Notebooks/*_Final.ipynb.
+
+    python -m ecowatt train --segment shops EcoWatt_Shops_Realistic_v2.xlsx --report train.json
+    python -m ecowatt train --segment shops new_rows.csv --warm-start 10 --install
+
+Each run cleans the data, does the notebook's train/test split and preprocessing,
+grid-searches the estimator on every core (GridSearchCV n_jobs=-1), refits the
+best parameters and writes the preprocessing Pipeline + model pickles with
+joblib, exactly the artifacts the app loads. They go to
+
+    Trained_Models/EcoWatt_<Segment>/<version>/   model, preprocessor, report.json
+
+where <version> is the same content hash the ModelRegistry uses, and with
+install=True (--install) they also replace the Models/ and
+Preprocessing_Models/ pickles; running apps pick them up on their next
+request.
+
+The fitted preprocessing and the CV folds are cached on disk with joblib.Memory
+under the data file's content hash, so searching again on the same data (other
+grids, other estimators) starts straight at the search. --warm-start N loads the
+current model instead of searching and grows its forest by N trees fitted on the
+given (new) rows, through the current preprocessor.
+"""
+
+import copy
+import json
+import os
+import platform
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ecowatt.registry import BASE_DIR, SEGMENT_ARTIFACTS, file_digest, normalize_segment, registry as default_registry
+
+
+TRAINED_DIR = "Trained_Models"
+CACHE_DIR = Path(os.environ.get("ECOWATT_TRAINING_CACHE", BASE_DIR / ".training_cache"))
+
+TRAINING_FORMAT_VERSION = 1
+
+DEFAULT_CV = 10
+
+# The search from the notebooks, shared by all three segments
+FOREST_GRID = {
+    "n_estimators": [10, 15, 20, 25],
+    "max_features": [0.75, 0.8, 0.9, 0.95],
+    "max_depth": [4, 5, 6],
+    "max_samples": [0.7, 0.8, 0.9],
+}
+
+# name -> (estimator factory, default parameter grid)
+ESTIMATORS = {
+    "random_forest": ("sklearn.ensemble.RandomForestRegressor", FOREST_GRID),
+    "decision_tree": ("sklearn.tree.DecisionTreeRegressor",
+                      {"max_depth": [4, 5, 6, 8, None], "min_samples_leaf": [1, 5, 10]}),
+    "linear": ("sklearn.linear_model.LinearRegression", {"fit_intercept": [True, False]}),
+}
+
+# Per segment, as in its notebook: target, feature columns, (type column, usage
+# column zeroed when the type is 'None'), ColumnTransformer spec and split
+TRAINING_SPECS = {
+    "Homes": {
+        "target": "Monthly_Kwh_Consumption",
+        "features": [
+            "State", "City", "Weather/Season", "Home_Type", "No_Of_Residents", "Electricity_Tariff_Type",
+            "AC_Type", "Monthly_AC_Usage_Hours", "Fan_Type", "Monthly_Fan_Usage_Hours", "Refrigerator_Type",
+            "Refrigerator_Usage_Hrs_Monthly", "TV_Type", "Monthly_TV_Usage_Hours", "Geyser_Type",
+            "Monthly_Geyser_Usage_Minutes", "Washing_Machine_Type", "Monthly_Washing_Machine_Usage_Cycles",
+            "Washing_Machine_Age",
+        ],
+        "zero_when_none": [
+            ("AC_Type", "Monthly_AC_Usage_Hours"),
+            ("Fan_Type", "Monthly_Fan_Usage_Hours"),
+            ("Refrigerator_Type", "Refrigerator_Usage_Hrs_Monthly"),
+            ("TV_Type", "Monthly_TV_Usage_Hours"),
+            ("Geyser_Type", "Monthly_Geyser_Usage_Minutes"),
+            ("Washing_Machine_Type", "Monthly_Washing_Machine_Usage_Cycles"),
+        ],
+        "transformers": [
+            ("tnf1", "onehot", ["State", "City", "Weather/Season"], None),
+            ("tnf2", "ordinal", ["AC_Type", "Fan_Type", "Refrigerator_Type", "TV_Type", "Geyser_Type",
+                                 "Washing_Machine_Age"],
+             [["None", "Split AC", "Window AC", "Inverter AC"],
+              ["Crompton", "Bajaj", "Polycab", "Havells", "None"],
+              ["Double Door 3★", "Double Door 4★", "Side-by-Side 5★", "None", "Single Door 5★",
+               "Side-by-Side 4★", "Single Door 4★", "Single Door 3★", "Double Door 5★"],
+              ["SmartTV", "LCD", "LED", "None"],
+              ["15-25L", "30+L", "None", "6-10L"],
+              ["New", "Mid", "Old", "None"]]),
+            ("tnf3", "minmax", ["No_Of_Residents", "Monthly_AC_Usage_Hours", "Monthly_Fan_Usage_Hours",
+                                "Refrigerator_Usage_Hrs_Monthly", "Monthly_TV_Usage_Hours",
+                                "Monthly_Geyser_Usage_Minutes", "Monthly_Washing_Machine_Usage_Cycles"], None),
+            ("tnf4", "ordinal", ["Home_Type", "Electricity_Tariff_Type", "Washing_Machine_Type"],
+             [["Apartment", "Row House", "Bungalow"], ["LT-1"], ["12kg", "6kg", "7kg", "8kg", "None", "10kg"]]),
+        ],
+        "pipeline_step": "tnf1",
+        "split": {"train_size": 0.8, "random_state": 42},
+    },
+    "Shops": {
+        "target": "Monthly_Total_Kwh_Consumption",
+        "features": [
+            "State", "City", "Weather/Season", "Shop_Type", "Shop_Scale", "Electricity_Tariff_Type",
+            "Avg_Working_Hours_Monthly", "No_of_AC", "AC_Type", "Monthly_AC_Usage_Hours", "No_of_Fans", "Fan_Type",
+            "Monthly_Fan_Usage_Hours", "No_of_Refrigerators_Type_1", "Refrigerator_Type_1",
+            "Monthly_Refrigerator_Usage_Hours_Type_1", "No_of_Refrigerators_Type_2", "Refrigerator_Type_2",
+            "Monthly_Refrigerator_Usage_Hours_Type_2", "No_of_Lights", "Lights_Type", "Monthly_Lights_Usage_Hours",
+            "Billing_System/PC_Type", "Monthly_PC_Usage_Hours",
+        ],
+        "zero_when_none": [
+            ("AC_Type", "Monthly_AC_Usage_Hours"),
+            ("Fan_Type", "Monthly_Fan_Usage_Hours"),
+            ("Refrigerator_Type_1", "Monthly_Refrigerator_Usage_Hours_Type_1"),
+            ("Refrigerator_Type_2", "Monthly_Refrigerator_Usage_Hours_Type_2"),
+            ("Lights_Type", "Monthly_Lights_Usage_Hours"),
+            ("Billing_System/PC_Type", "Monthly_PC_Usage_Hours"),
+        ],
+        "transformers": [
+            ("tnf1", "onehot", ["State", "City", "Weather/Season"], None),
+            ("tnf2", "ordinal", ["AC_Type", "Fan_Type", "Refrigerator_Type_1", "Refrigerator_Type_2", "Lights_Type",
+                                 "Billing_System/PC_Type"],
+             [["Window AC", "None", "Inverter AC", "Split AC"],
+              ["Havells", "Crompton", "None", "Bajaj", "Polycab"],
+              ["Display Cooler (Double Door)", "None", "Display Cooler (Single Door)"],
+              ["Deep Freezer (Single Lid)", "Deep Freezer (Double Lid)", "None"],
+              ["CFL", "LED", "Tube Light"],
+              ["Dell", "HP", "Lenovo", "None"]]),
+            ("tnf3", "minmax", ["Avg_Working_Hours_Monthly", "No_of_AC", "Monthly_AC_Usage_Hours", "No_of_Fans",
+                                "Monthly_Fan_Usage_Hours", "No_of_Refrigerators_Type_1", "No_of_Refrigerators_Type_2",
+                                "Monthly_Refrigerator_Usage_Hours_Type_1", "Monthly_Refrigerator_Usage_Hours_Type_2",
+                                "No_of_Lights", "Monthly_Lights_Usage_Hours", "Monthly_PC_Usage_Hours"], None),
+            ("tnf4", "ordinal", ["Shop_Scale", "Shop_Type", "Electricity_Tariff_Type"],
+             [["Large", "Small", "Medium"], ["Bakery/SweetShop", "Clothing/Footwear", "Medicals", "Grocery"],
+              ["LT-2"]]),
+        ],
+        "pipeline_step": "transformer1",
+        "split": {"test_size": 0.2, "random_state": 2},
+    },
+    "Offices": {
+        "target": "Monthly_Total_Kwh_Consumption",
+        "features": [
+            "State", "City", "Weather/Season", "Office_Type", "Office_Scale", "Electricity_Tariff_Type",
+            "Avg_Working_Hours_Monthly", "No_Of_ACs", "AC_Type", "Monthly_AC_Usage_Hours", "No_Of_Fans", "Fan_Type",
+            "Monthly_Fan_Usage_Hours", "No_Of_Lights", "Lights_Type", "Monthly_Lights_Usage_Hours", "No_Of_PCs",
+            "PC_Type", "Monthly_PC_Usage_Hours", "No_Of_Refrigerators", "Refrigerator_Type",
+            "Monthly_Refrigerator_Usage_Hours", "No_Of_Printers", "Printer_Type", "Monthly_Printer_Usage_Minutes",
+            "No_Of_Projectors", "Projector_Type", "Monthly_Projector_Usage_Hours",
+        ],
+        "zero_when_none": [
+            ("AC_Type", "Monthly_AC_Usage_Hours"),
+            ("Fan_Type", "Monthly_Fan_Usage_Hours"),
+            ("Refrigerator_Type", "Monthly_Refrigerator_Usage_Hours"),
+            ("Lights_Type", "Monthly_Lights_Usage_Hours"),
+            ("Printer_Type", "Monthly_Printer_Usage_Minutes"),
+            ("Projector_Type", "Monthly_Projector_Usage_Hours"),
+        ],
+        "transformers": [
+            ("tnf1", "onehot", ["State", "City", "Weather/Season"], None),
+            ("tnf2", "ordinal", ["Office_Type", "Office_Scale", "Electricity_Tariff_Type"],
+             [["IT/Corporate", "Startup", "Government_Office"], ["Medium", "Large", "Small"], ["LT-2 (Commercial)"]]),
+            ("tnf3", "ordinal", ["AC_Type", "Fan_Type", "Lights_Type", "PC_Type", "Refrigerator_Type", "Printer_Type",
+                                 "Projector_Type"],
+             [["Split AC", "Inverter AC", "Window AC", "None"],
+              ["Bajaj", "Crompton", "Havells", "None", "Polycab"],
+              ["LED", "CFL", "Tube Light"],
+              ["Laptop", "Desktop"],
+              ["None", "Side-by-Side 4★", "Double Door 4★", "Single Door 3★", "Double Door 3★",
+               "Side-by-Side 5★", "Single Door 5★", "Double Door 5★", "Single Door 4★"],
+              ["HP", "Canon", "Sony"],
+              ["Epson", "Sony"]]),
+            ("tnf4", "minmax", ["Avg_Working_Hours_Monthly", "Monthly_AC_Usage_Hours", "Monthly_Fan_Usage_Hours",
+                                "Monthly_Lights_Usage_Hours", "Monthly_PC_Usage_Hours",
+                                "Monthly_Refrigerator_Usage_Hours", "Monthly_Printer_Usage_Minutes",
+                                "Monthly_Projector_Usage_Hours"], None),
+            ("tnf5", "minmax", ["No_Of_ACs", "No_Of_Fans", "No_Of_Lights", "No_Of_PCs", "No_Of_Refrigerators",
+                                "No_Of_Printers", "No_Of_Projectors"], None),
+        ],
+        "pipeline_step": "tnf1",
+        "split": {"train_size": 0.8, "random_state": 42},
+    },
+}
+
+
+def _import(dotted):
+    import importlib
+
+    module, name = dotted.rsplit(".", 1)
+    return getattr(importlib.import_module(module), name)
+
+
+def build_preprocessor(segment):
+    """The unfitted preprocessing Pipeline of a segment's notebook."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, OrdinalEncoder
+
+    spec = TRAINING_SPECS[normalize_segment(segment)]
+    transformers = []
+    for name, kind, columns, categories in spec["transformers"]:
+        if kind == "onehot":
+            transformer = OneHotEncoder(drop="first")
+        elif kind == "ordinal":
+            transformer = OrdinalEncoder(categories=categories)
+        else:
+            transformer = MinMaxScaler()
+        transformers.append((name, transformer, columns))
+
+    return Pipeline([(spec["pipeline_step"], ColumnTransformer(transformers=transformers, remainder="passthrough"))])
+
+
+def read_training_data(source):
+    """Training table from an .xlsx (as in the notebooks), CSV or Parquet file."""
+    import pandas as pd
+
+    if isinstance(source, pd.DataFrame):
+        return source
+    if str(source).lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(source)
+    from ecowatt.batch import read_chunks
+
+    return pd.concat(list(read_chunks(source)), ignore_index=True)
+
+
+def clean(frame, segment):
+    """Notebook cleaning: missing types -> 'None' and no usage for appliances that are 'None'."""
+    spec = TRAINING_SPECS[normalize_segment(segment)]
+    missing = [c for c in spec["features"] + [spec["target"]] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"{segment} training data is missing columns: {missing}")
+
+    frame = frame.fillna("None")
+    for type_column, usage_column in spec["zero_when_none"]:
+        frame.loc[frame[type_column] == "None", usage_column] = 0
+    return frame
+
+
+def _prepare(segment, data_version, data, cv):
+    """Split, fitted preprocessing and CV folds of a training table (cached on data_version)."""
+    from sklearn.model_selection import KFold, train_test_split
+
+    spec = TRAINING_SPECS[segment]
+    frame = clean(read_training_data(data), segment)
+    X_train, X_test, y_train, y_test = train_test_split(
+        frame[spec["features"]], frame[spec["target"]], **spec["split"]
+    )
+
+    preprocessor = build_preprocessor(segment)
+    X_train_trans = preprocessor.fit_transform(X_train)
+    X_test_trans = preprocessor.transform(X_test)
+
+    # GridSearchCV's own cv=<int> folds for a regressor, materialized once
+    folds = list(KFold(n_splits=cv).split(X_train_trans))
+    return {
+        "preprocessor": preprocessor,
+        "X_train": X_train_trans,
+        "X_test": X_test_trans,
+        "y_train": y_train.to_numpy(dtype=np.float64),
+        "y_test": y_test.to_numpy(dtype=np.float64),
+        "folds": folds,
+        "rows": len(frame),
+    }
+
+
+def prepare(segment, data, cv=DEFAULT_CV, cache_dir=CACHE_DIR):
+    """
+    _prepare() through a joblib.Memory cache keyed on the data's content hash,
+    so another search over the same file skips cleaning, fitting the
+    preprocessor and building the folds. cache_dir=None turns caching off.
+    Returns (prepared dict, cache hit).
+    """
+    segment = normalize_segment(segment)
+    if cache_dir is None or not isinstance(data, (str, os.PathLike)):
+        return _prepare(segment, None, data, cv), False
+
+    from joblib import Memory
+
+    cached = Memory(os.fspath(cache_dir), verbose=0).cache(_prepare, ignore=["data"])
+    data_version = file_digest([data])
+    hit = cached.check_call_in_cache(segment, data_version, data, cv)
+    return cached(segment, data_version, data, cv), hit
+
+
+def _metrics(model, X, y):
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    pred = model.predict(X)
+    return {"r2": float(r2_score(y, pred)), "mae": float(mean_absolute_error(y, pred)), "rows": int(len(y))}
+
+
+def _dump_report(report, path):
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def write_artifacts(segment, model, preprocessor, report, base_dir=None, install=False):
+    """
+    Dump the pickles under Trained_Models/EcoWatt_<Segment>/<version>/ (with
+    report.json) and, with install, over the artifacts the app loads.
+    Returns the version directory. A report with "timings" gets write_s
+    (dumps and install) in report.json as well.
+    """
+    import joblib
+
+    started = time.perf_counter()
+    base_dir = Path(base_dir or BASE_DIR)
+    model_name, preprocessor_name = (Path(name).name for name in SEGMENT_ARTIFACTS[segment])
+
+    staging = base_dir / TRAINED_DIR / f".EcoWatt_{segment}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    joblib.dump(model, staging / model_name)
+    joblib.dump(preprocessor, staging / preprocessor_name)
+
+    version = file_digest([staging / model_name, staging / preprocessor_name])
+    report["version"] = version
+    if "timings" in report:
+        report["timings"]["write_s"] = time.perf_counter() - started
+    _dump_report(report, staging / "report.json")
+
+    directory = base_dir / TRAINED_DIR / f"EcoWatt_{segment}" / version
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    os.rename(staging, directory)
+
+    if install:
+        for name in SEGMENT_ARTIFACTS[segment]:
+            target = base_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f".{target.name}.tmp-{os.getpid()}")
+            shutil.copyfile(directory / Path(name).name, tmp)
+            # Atomic per file; the registry re-reads once the content hash changes
+            os.replace(tmp, target)
+        report["installed"] = [str(base_dir / name) for name in SEGMENT_ARTIFACTS[segment]]
+        if "timings" in report:
+            report["timings"]["write_s"] = time.perf_counter() - started
+        # Written again so the saved report has the install and its time too
+        _dump_report(report, directory / "report.json")
+
+    return directory
+
+
+def train(segment, data, estimator="random_forest", param_grid=None, cv=DEFAULT_CV, n_jobs=-1,
+          cache_dir=CACHE_DIR, base_dir=None, install=False):
+    """Grid-search, refit and write one segment's artifacts. Returns the training report."""
+    import sklearn
+    from sklearn.model_selection import GridSearchCV
+
+    segment = normalize_segment(segment)
+    factory, default_grid = ESTIMATORS[estimator]
+    param_grid = param_grid or default_grid
+    timings = {}
+
+    started = time.perf_counter()
+    prepared, cache_hit = prepare(segment, data, cv=cv, cache_dir=cache_dir)
+    timings["prepare_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    search = GridSearchCV(_import(factory)(), param_grid=param_grid, cv=prepared["folds"], n_jobs=n_jobs,
+                          refit=True)
+    search.fit(prepared["X_train"], prepared["y_train"])
+    timings["search_s"] = time.perf_counter() - started
+    timings["refit_s"] = float(search.refit_time_)
+
+    report = {
+        "format_version": TRAINING_FORMAT_VERSION,
+        "segment": segment,
+        "mode": "search",
+        "estimator": estimator,
+        "data": os.fspath(data) if isinstance(data, (str, os.PathLike)) else None,
+        "rows": prepared["rows"],
+        "cache_hit": cache_hit,
+        "cv_folds": len(prepared["folds"]),
+        "candidates": len(search.cv_results_["params"]),
+        "n_jobs": n_jobs,
+        "cpu_count": os.cpu_count(),
+        "best_params": search.best_params_,
+        "best_cv_r2": float(search.best_score_),
+        "train": _metrics(search.best_estimator_, prepared["X_train"], prepared["y_train"]),
+        "test": _metrics(search.best_estimator_, prepared["X_test"], prepared["y_test"]),
+        "timings": timings,
+        "python": platform.python_version(),
+        "sklearn_version": sklearn.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+    # write_artifacts records timings["write_s"] before it saves report.json
+    report["directory"] = str(write_artifacts(segment, search.best_estimator_, prepared["preprocessor"], report,
+                                              base_dir=base_dir, install=install))
+    return report
+
+
+def warm_start(segment, data, add_trees, registry=None, base_dir=None, install=False):
+    """
+    Grow the current forest of a segment by `add_trees` trees fitted on new
+    rows (transformed by the current preprocessor). Returns the report.
+    """
+    import sklearn
+
+    segment = normalize_segment(segment)
+    spec = TRAINING_SPECS[segment]
+    pipeline = (registry or default_registry).get(segment)
+    if not hasattr(pipeline.model, "estimators_") or not hasattr(pipeline.model, "warm_start"):
+        raise ValueError(f"{segment}: warm_start needs a forest model, not {type(pipeline.model).__name__}")
+
+    timings = {}
+    started = time.perf_counter()
+    frame = clean(read_training_data(data), segment)
+    X_new = pipeline.preprocessor.transform(frame[spec["features"]])
+    y_new = frame[spec["target"]].to_numpy(dtype=np.float64)
+    timings["prepare_s"] = time.perf_counter() - started
+
+    # The loaded model may be shared with live sessions, grow a copy
+    model = copy.deepcopy(pipeline.model)
+    before = len(model.estimators_)
+    previous = _metrics(pipeline.model, X_new, y_new)
+
+    started = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=before + add_trees)
+    model.fit(X_new, y_new)
+    model.set_params(warm_start=False)
+    timings["fit_s"] = time.perf_counter() - started
+
+    report = {
+        "format_version": TRAINING_FORMAT_VERSION,
+        "segment": segment,
+        "mode": "warm_start",
+        "estimator": type(model).__name__,
+        "data": os.fspath(data) if isinstance(data, (str, os.PathLike)) else None,
+        "rows": len(frame),
+        "base_version": pipeline.version,
+        "trees_before": before,
+        "trees_after": len(model.estimators_),
+        "new_data_before": previous,
+        "new_data_after": _metrics(model, X_new, y_new),
+        "timings": timings,
+        "python": platform.python_version(),
+        "sklearn_version": sklearn.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+    # write_artifacts records timings["write_s"] before it saves report.json
+    report["directory"] = str(write_artifacts(segment, model, pipeline.preprocessor, report,
+                                              base_dir=base_dir, install=install))
+    return report
@@ -0,0 +1,104 @@
+"""
+FastEncoder against the pickled preprocessors, for every st.selectbox option
+of every segment: one row at a time (transform_one), small batches and
+batches over SMALL_BATCH_ROWS (the pandas.factorize path of _lookup).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ecowatt.core import AGGREGATORS
+from ecowatt.encoder import SMALL_BATCH_ROWS, FastEncoder
+from ecowatt.options import SELECT_OPTIONS
+from ecowatt.registry import SEGMENT_ARTIFACTS, ModelRegistry
+
+
+NUMERIC_VALUES = (0, 1, 7, 40, 168)
+
+SEGMENTS = list(SEGMENT_ARTIFACTS)
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return ModelRegistry(cache=False)
+
+
+@pytest.fixture(scope="module", params=SEGMENTS)
+def case(request, registry):
+    """(segment, preprocessor, encoder, monthly rows the preprocessor accepts, rows it rejects)."""
+    segment = request.param
+    preprocessor = registry.get(segment).preprocessor
+    encoder = FastEncoder(preprocessor)
+    options = SELECT_OPTIONS[segment]
+
+    # Baseline: first option the fitted encoders know, zeros for numbers
+    fitted = {column: set(mapping) for column, mapping in encoder.onehot}
+    fitted.update({column: set(mapping) for column, mapping, _ in encoder.ordinal})
+    base = {
+        column: next(v for v in options[column] if v in fitted.get(column, {v})) if column in options else 0
+        for column in encoder.feature_names
+    }
+
+    rows = [dict(base, **{column: value}) for column, values in options.items() for value in values]
+    rows += [dict(base, **{column: value}) for column in encoder.feature_names if column not in options
+             for value in NUMERIC_VALUES]
+
+    accepted, rejected = [], []
+    for row in rows:
+        monthly = AGGREGATORS[segment](pd.DataFrame([row]))
+        try:
+            preprocessor.transform(monthly)
+        except ValueError:
+            rejected.append(monthly)
+        else:
+            accepted.append(monthly)
+    return segment, preprocessor, encoder, pd.concat(accepted, ignore_index=True), rejected
+
+
+def test_transform_one_matches_preprocessor(case):
+    segment, preprocessor, encoder, monthly, _ = case
+    for i in range(len(monthly)):
+        row = monthly.iloc[[i]]
+        expected = preprocessor.transform(row)
+        assert np.allclose(encoder.transform_one(row.iloc[0].to_dict()), expected), (segment, row.iloc[0].to_dict())
+
+
+def test_transform_small_batch_matches_preprocessor(case):
+    _, preprocessor, encoder, monthly, _ = case
+    batch = monthly.iloc[:SMALL_BATCH_ROWS]
+    assert np.allclose(encoder.transform(batch), preprocessor.transform(batch))
+
+
+def test_transform_large_batch_matches_preprocessor(case):
+    _, preprocessor, encoder, monthly, _ = case
+    # Shuffled copies of every option row, well past the dict-lookup cutoff
+    repeats = 4 * SMALL_BATCH_ROWS // len(monthly) + 2
+    batch = monthly.iloc[np.random.default_rng(0).permutation(np.tile(np.arange(len(monthly)), repeats))]
+    batch = batch.reset_index(drop=True)
+    assert len(batch) > SMALL_BATCH_ROWS
+    assert np.allclose(encoder.transform(batch), preprocessor.transform(batch))
+
+
+def test_options_rejected_by_both(case):
+    """Selectbox options the fitted encoders never saw fail on both paths."""
+    _, _, encoder, _, rejected = case
+    for monthly in rejected:
+        with pytest.raises(ValueError):
+            encoder.transform_one(monthly.iloc[0].to_dict())
+        with pytest.raises(ValueError):
+            encoder.transform(monthly)
+
+
+@pytest.mark.parametrize("rows", [1, SMALL_BATCH_ROWS + 36])
+def test_unknown_category_raises(case, rows):
+    _, preprocessor, encoder, monthly, _ = case
+    batch = monthly.iloc[np.arange(rows) % len(monthly)].reset_index(drop=True)
+    batch.loc[rows - 1, "State"] = "Atlantis"
+
+    with pytest.raises(ValueError):
+        preprocessor.transform(batch)
+    with pytest.raises(ValueError, match="Atlantis"):
+        encoder.transform(batch)
+    with pytest.raises(ValueError, match="Atlantis"):
+        encoder.transform_one(batch.iloc[rows - 1].to_dict())